@@ -0,0 +1 @@
+"""Micro benchmarks for hot API paths."""
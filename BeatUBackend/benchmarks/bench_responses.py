@@ -0,0 +1,114 @@
+"""
+/videos 与 /users 响应编码基准。
+
+    python -m benchmarks.bench_responses [--rounds 300]
+
+在内存 SQLite 中构造 200 个用户、200 条视频，对比：
+- stdlib：FastAPI 默认路径 jsonable_encoder + json.dumps（JSONResponse）
+- orjson：ORJSONResponse 直接编码（路由返回 Response，跳过 jsonable_encoder）
+- cached：/users 预编码片段命中缓存，只拼接响应信封
+并给出经 TestClient 的端到端请求耗时。
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core.responses import ORJSONResponse
+from database.connection import get_db
+from database.models import Base, User, Video
+from routes.users import router as user_router
+from routes.videos import router as video_router
+from schemas.api import success_response
+from services.user_service import UserService
+from services.video_service import VideoService
+
+
+def build_session(users: int = 200, videos: int = 200):
+    engine = create_engine(
+        "sqlite:///:memory:", future=True, poolclass=StaticPool, connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for index in range(users):
+        session.add(
+            User(
+                userId=f"user_{index}",
+                userName=f"用户 {index}",
+                avatarUrl=f"https://cdn.beatu.com/avatar/{index}.jpg",
+                bio="热爱生活",
+                followerCount=index,
+                followingCount=index % 10,
+            )
+        )
+    for index in range(1, videos + 1):
+        session.add(
+            Video(
+                videoId=index,
+                playUrl=f"https://cdn.beatu.com/video/{index}.mp4",
+                coverUrl=f"https://cdn.beatu.com/cover/{index}.jpg",
+                title=f"视频 {index}",
+                authorId=f"user_{index % users}",
+                orientation="PORTRAIT",
+                durationMs=15000,
+                likeCount=index,
+                commentCount=index,
+                favoriteCount=index,
+                viewCount=index * 10,
+            )
+        )
+    session.commit()
+    return session
+
+
+def measure(name: str, func: Callable[[], object], rounds: int) -> None:
+    func()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<24} {elapsed / rounds * 1000:8.3f} ms/op  {rounds / elapsed:10,.0f} ops/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding of /videos and /users.")
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+
+    session = build_session()
+    feed = VideoService(session).list_videos(page=1, limit=50, orientation=None, channel=None, user_id="user_1")
+    feed_payload = success_response(feed.to_payload())
+    users = UserService(session).get_all_users()
+    users_payload = [user.dict(by_alias=True) for user in users]
+
+    print("== 编码阶段 ==")
+    measure("videos stdlib", lambda: JSONResponse(jsonable_encoder(feed_payload)).body, args.rounds)
+    measure("videos orjson", lambda: ORJSONResponse(feed_payload).body, args.rounds)
+    measure("users stdlib", lambda: JSONResponse(jsonable_encoder(success_response(users_payload))).body, args.rounds)
+    measure("users orjson", lambda: ORJSONResponse(success_response(users_payload)).body, args.rounds)
+    service = UserService(session)
+    measure("users cached fragment", lambda: ORJSONResponse(success_response(service.get_all_users_payload())).body, args.rounds)
+
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(video_router, prefix="/api")
+    app.include_router(user_router, prefix="/api")
+    app.dependency_overrides[get_db] = lambda: session
+    client = TestClient(app)
+
+    print("== 端到端（TestClient） ==")
+    measure("GET /api/videos?limit=50", lambda: client.get("/api/videos", params={"limit": 50}), args.rounds // 3)
+    measure("GET /api/users", lambda: client.get("/api/users"), args.rounds // 3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+VideoItem 序列化微基准：50 条/页的 Feed 每秒可输出多少条视频。
+
+    python -m benchmarks.bench_video_items [--pages 200]
+
+对比两条路径（均以 FastAPI 最终写出的 JSON 字节为终点）：
+- validated：VideoItem(...) 全量校验 → .dict(by_alias=True) → jsonable_encoder → json.dumps
+- trusted：  VideoItem.trusted(...) → to_payload() → json.dumps
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Callable, List
+
+from fastapi.encoders import jsonable_encoder
+
+from schemas.api import VideoItem, VideoList, success_response
+
+PAGE_SIZE = 50
+
+
+def build_rows(count: int = PAGE_SIZE) -> List[dict]:
+    """模拟 VideoRenderer 从数据库行组装出的字段。"""
+    return [
+        dict(
+            id=index,
+            play_url=f"https://cdn.beatu.com/video/{index}.mp4",
+            cover_url=f"https://cdn.beatu.com/cover/{index}.jpg",
+            title=f"视频 {index}",
+            tags=[],
+            duration_ms=15000,
+            orientation="portrait",
+            author_id=f"author_{index % 7}",
+            author_name=f"作者 {index % 7}",
+            author_avatar=f"https://cdn.beatu.com/avatar/{index % 7}.jpg",
+            like_count=index * 3,
+            comment_count=index,
+            favorite_count=index * 2,
+            share_count=0,
+            view_count=index * 100,
+            is_liked=index % 2 == 0,
+            is_favorited=False,
+            is_followed_author=index % 3 == 0,
+            qualities=[],
+            contentType="VIDEO",
+            imageUrls=[],
+            bgmUrl=None,
+        )
+        for index in range(count)
+    ]
+
+
+def validated_page(rows: List[dict]) -> bytes:
+    items = [VideoItem(**row) for row in rows]
+    page = VideoList.create(items=items, total=1000, page=1, limit=PAGE_SIZE)
+    return json.dumps(jsonable_encoder(success_response(page.dict(by_alias=True)))).encode()
+
+
+def trusted_page(rows: List[dict]) -> bytes:
+    items = [VideoItem.trusted(**row) for row in rows]
+    page = VideoList.create(items=items, total=1000, page=1, limit=PAGE_SIZE)
+    return json.dumps(success_response(page.to_payload())).encode()
+
+
+def measure(name: str, render: Callable[[List[dict]], bytes], rows: List[dict], pages: int) -> float:
+    render(rows)  # 预热
+    started = time.perf_counter()
+    for _ in range(pages):
+        render(rows)
+    elapsed = time.perf_counter() - started
+    items_per_sec = pages * len(rows) / elapsed
+    print(f"{name:<10} {items_per_sec:>12,.0f} items/s  ({elapsed / pages * 1000:.3f} ms/page)")
+    return items_per_sec
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark VideoItem serialization for 50-item pages.")
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = build_rows()
+    baseline = measure("validated", validated_page, rows, args.pages)
+    fast = measure("trusted", trusted_page, rows, args.pages)
+    print(f"speedup    {fast / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -86,7 +86,91 @@ class Settings(BaseSettings):
     max_page_size: int = Field(default=50, ge=1, le=200, description="最大每页数量")
     default_comment_page_size: int = Field(default=20, ge=1, le=100, description="评论默认每页数量")
     max_comment_page_size: int = Field(default=100, ge=1, le=200, description="评论最大每页数量")
+    comment_reply_preview_size: int = Field(default=3, ge=0, le=20, description="评论列表中每个楼层附带的回复条数")
+    hot_comments_min_count: int = Field(default=50, ge=0, description="评论数达到该值的视频缓存评论首页")
+    hot_comments_cache_ttl_seconds: int = Field(default=10, ge=0, description="热门评论首页缓存时长（秒），0 表示不缓存")
+    hot_comments_cache_max_videos: int = Field(default=1000, ge=1, description="热门评论首页缓存的最大视频数")
     
+    # SQL 查询统计（N+1 检测）
+    query_tracking_enabled: bool = Field(default=True, description="是否按请求统计 SQL 查询条数与耗时")
+    query_repeat_threshold: int = Field(
+        default=5, ge=1, description="同一语句形状在单个请求内重复超过该次数时告警（疑似 N+1）"
+    )
+
+    # 热度排行榜（AI 推荐候选）
+    ranking_top_k: int = Field(default=200, ge=1, description="热度榜保留的视频数量")
+    ranking_refresh_seconds: int = Field(default=60, ge=1, description="热度榜后台刷新间隔（秒）")
+    ranking_half_life_hours: float = Field(default=24.0, gt=0, description="热度分衰减半衰期（小时）")
+    ranking_store: str = Field(default="memory", description="热度榜存储：memory 或 redis")
+
+    # 协同过滤推荐模型
+    item_cf_model_path: str = Field(
+        default="data/item_cf.npz", description="离线训练的视频近邻表路径（相对 BeatUBackend 目录）"
+    )
+
+    # Feed 混编
+    feed_image_posts_per_page: int = Field(default=2, ge=0, le=10, description="每页 Feed 插入的图文条数")
+    feed_filter_watched: bool = Field(default=False, description="Feed 是否过滤用户已看过的视频")
+    feed_next_page_enabled: bool = Field(default=True, description="是否在响应后后台预物化下一页")
+    feed_next_page_ttl_seconds: float = Field(default=30.0, gt=0, description="预物化页面的缓存时长（秒）")
+    feed_next_page_max_users: int = Field(default=10000, ge=1, description="预物化缓存保留的最大用户数（LRU 淘汰）")
+
+    # 关注流
+    following_feed_author_window: int = Field(default=50, ge=1, description="关注流中每位作者缓存的最新视频 ID 条数")
+    following_feed_cache_ttl_seconds: int = Field(default=60, ge=0, description="关注流作者最新视频缓存时长（秒）")
+    following_feed_cache_max_authors: int = Field(default=50000, ge=1, description="关注流作者最新视频缓存的最大作者数（LRU 淘汰）")
+
+    # AI 评论异步生成队列
+    ai_comment_workers: int = Field(default=4, ge=1, description="AI 评论生成 worker 数（同时进行的生成调用上限）")
+    ai_comment_max_pending: int = Field(default=1000, ge=1, description="排队中的 AI 评论任务上限，超过时接口返回 503")
+    ai_comment_timeout_seconds: float = Field(default=20.0, gt=0, description="单次 AI 回答生成超时（秒）")
+    ai_comment_max_retries: int = Field(default=2, ge=0, description="AI 回答生成失败/超时后的重试次数")
+    ai_comment_stream_timeout_seconds: float = Field(default=30.0, gt=0, description="/comments/{id}/stream 等待 AI 回答的最长时间（秒）")
+    ai_comment_drain_seconds: float = Field(default=10.0, ge=0, description="服务关闭时等待队列中 AI 评论任务完成的最长时间（秒）")
+
+    # 粉丝/关注计数校对
+    follow_reconcile_seconds: int = Field(default=600, ge=1, description="粉丝/关注计数后台校对间隔（秒）")
+    follow_reconcile_chunk_size: int = Field(default=1000, ge=1, description="粉丝/关注计数校对每批处理的用户数")
+
+    # 播放量统计
+    view_dedup_window_seconds: int = Field(default=1800, ge=1, description="同一用户对同一视频的播放去重窗口（秒）")
+    view_dedup_store: str = Field(default="memory", description="播放去重存储：memory 或 redis（HyperLogLog）")
+
+    # 播放 QoE 预聚合
+    playback_rollup_flush_seconds: float = Field(default=10.0, gt=0, description="播放指标预聚合增量落库间隔（秒）")
+    playback_rollup_default_buckets: int = Field(default=60, ge=1, description="播放 QoE 查询未指定起点时返回的时间桶数")
+    playback_rollup_max_buckets: int = Field(default=1440, ge=1, description="播放 QoE 单次查询的最大时间桶数")
+    playback_rollup_minute_retention_days: int = Field(default=7, ge=1, description="分钟粒度播放预聚合保留天数")
+    playback_rollup_hour_retention_days: int = Field(default=90, ge=1, description="小时粒度播放预聚合保留天数")
+
+    # 原始指标保留期
+    metrics_retention_days: int = Field(default=30, ge=1, description="原始播放/互动指标保留天数")
+    metrics_retention_interval_seconds: int = Field(default=3600, ge=1, description="原始指标保留期清理间隔（秒）")
+    metrics_retention_batch_size: int = Field(default=5000, ge=1, description="不支持分区的数据库上每批删除的过期行数")
+    metrics_partition_days_ahead: int = Field(default=3, ge=1, description="MySQL 上提前创建的未来每日分区数")
+
+    # 原始指标列式导出
+    metrics_export_enabled: bool = Field(default=False, description="是否在服务内周期性导出原始指标（也可用 python -m services.metrics_export 离线执行）")
+    metrics_export_dir: str = Field(default="data/metrics_export", description="导出目录（相对 BeatUBackend 目录），按表/日期分区")
+    metrics_export_format: str = Field(default="auto", description="导出格式：auto（有 pyarrow 用 parquet，否则 npz）、parquet 或 npz")
+    metrics_export_chunk_size: int = Field(default=50000, ge=1, description="每个 part 文件的行数（决定导出时的内存占用）")
+    metrics_export_interval_seconds: int = Field(default=3600, ge=1, description="后台导出任务执行间隔（秒）")
+    metrics_export_lookback_days: int = Field(default=7, ge=1, description="后台导出检查最近多少个已结束的自然日")
+
+    # 自适应清晰度决策（/ai/quality）
+    quality_bandwidth_ewma_alpha: float = Field(default=0.3, gt=0, le=1, description="用户带宽估计 EWMA 平滑系数（越大越跟随最新测速）")
+    quality_safety_factor: float = Field(default=0.8, gt=0, le=1, description="可用码率占估计带宽的比例")
+    quality_cache_ttl_seconds: float = Field(default=30.0, ge=0, description="按 (用户, 网络档位) 缓存可用码率的时长（秒）")
+    quality_max_users: int = Field(default=100000, ge=1, description="带宽估计与码率缓存保留的最大用户数（LRU 淘汰）")
+    rendition_cache_ttl_seconds: int = Field(default=300, ge=0, description="视频清晰度档位缓存时长（秒），/ai/quality 命中时不查库")
+    rendition_cache_max_videos: int = Field(default=10000, ge=1, description="清晰度档位缓存的最大视频数（LRU 淘汰）")
+
+    # 计数聚合写入
+    counter_flush_seconds: float = Field(default=2.0, gt=0, description="计数增量（评论点赞等）批量落库间隔（秒）")
+
+    # 预编码响应缓存
+    users_cache_ttl_seconds: int = Field(default=30, ge=0, description="/users 全量用户列表预编码缓存时长（秒），0 表示不缓存")
+
     # 默认用户配置
     default_user_id: str = Field(default="BEATU", description="默认用户ID")
     default_user_name: str = Field(default="BEATU", description="默认用户名")
@@ -9,6 +9,9 @@ from typing import Callable
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from core.config import settings
+from database.query_counter import track_queries
+
 logger = logging.getLogger(__name__)
 
 
@@ -57,3 +60,25 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
                 exc_info=True
             )
             raise
+
+
+class QueryCountMiddleware(BaseHTTPMiddleware):
+    """统计每个请求的 SQL 查询条数与耗时，并对疑似 N+1 的重复语句告警"""
+
+    def __init__(self, app, repeat_threshold: int | None = None) -> None:
+        super().__init__(app)
+        self.repeat_threshold = repeat_threshold or settings.query_repeat_threshold
+
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        with track_queries() as stats:
+            response = await call_next(request)
+
+        response.headers["X-Query-Count"] = str(stats.count)
+        response.headers["X-Query-Time-Ms"] = f"{stats.total_ms:.2f}"
+
+        for shape, times in stats.repeated_shapes(self.repeat_threshold):
+            logger.warning(
+                f"[N+1] {request.method} {request.url.path} | "
+                f"同一语句执行 {times} 次: {shape}"
+            )
+        return response
@@ -0,0 +1,107 @@
+"""
+orjson 响应与预编码 JSON
+
+- ORJSONResponse：应用默认响应类，用 orjson 代替标准库 json 编码
+- 路由直接 return ORJSONResponse(success_response(...)) 时，FastAPI 不再执行 jsonable_encoder
+- pre_encode / EncodedCache：服务层把热点数据（用户列表、缓存的 Feed 页、图文卡片等）
+  编码一次得到 orjson.Fragment，嵌入响应信封时按原样拼接，不再重复序列化
+- TTLCache：通用的 TTL + LRU 缓存，用于缓存需要按请求再加工的对象（如热门评论首页）
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import AnyUrl, BaseModel
+
+PreEncoded = orjson.Fragment
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, AnyUrl):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def pre_encode(data: Any) -> PreEncoded:
+    """编码一次，之后作为片段嵌入任意响应而不再重复序列化。"""
+    return orjson.Fragment(dumps(data))
+
+
+class ORJSONResponse(JSONResponse):
+    """基于 orjson 的 JSON 响应，支持 pydantic 模型、URL 与 PreEncoded 片段。"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class TTLCache:
+    """
+    TTL + LRU 缓存（线程安全）。
+
+    写路径改变数据后调用 invalidate() 主动失效；多实例部署时依赖 TTL 兜底一致性。
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """失效单个 key；不传 key 时清空全部。"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class EncodedCache(TTLCache):
+    """预编码片段（PreEncoded）的 TTL + LRU 缓存。"""
+
+    def get_or_encode(self, key: Hashable, build: Callable[[], Any]) -> PreEncoded:
+        """命中时直接返回片段；未命中时 build() 并编码后写入缓存。TTL 为 0 表示不缓存，每次重新编码。"""
+        if self.ttl_seconds <= 0:
+            return pre_encode(build())
+        fragment = self.get(key)
+        if fragment is None:
+            fragment = pre_encode(build())
+            self.set(key, fragment)
+        return fragment
@@ -6,9 +6,12 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from core.config import settings
+from database.query_counter import install_query_counter
 
 
 engine = create_engine(settings.database_url, future=True, echo=settings.debug)
+if settings.query_tracking_enabled:
+    install_query_counter(engine)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 
@@ -4,11 +4,16 @@
 DROP TABLE IF EXISTS beatu_watch_history;
 DROP TABLE IF EXISTS beatu_user_follow;
 DROP TABLE IF EXISTS beatu_video_interaction;
+DROP TABLE IF EXISTS beatu_comment_interaction;
 DROP TABLE IF EXISTS beatu_comment;
+DROP TABLE IF EXISTS beatu_video_rendition;
+DROP TABLE IF EXISTS beatu_video_tag;
 DROP TABLE IF EXISTS beatu_video;
 DROP TABLE IF EXISTS beatu_user;
 DROP TABLE IF EXISTS beatu_metrics_interaction;
 DROP TABLE IF EXISTS beatu_metrics_playback;
+DROP TABLE IF EXISTS beatu_metrics_playback_rollup;
+DROP TABLE IF EXISTS beatu_image_post;
 
 -- ============================================
 -- 2. 创建新表结构（按照设计文档）
@@ -21,6 +26,8 @@ CREATE TABLE beatu_user (
     avatarUrl VARCHAR(500) DEFAULT NULL COMMENT '头像 URL',
     followerCount BIGINT NOT NULL DEFAULT 0 COMMENT '粉丝数',
     followingCount BIGINT NOT NULL DEFAULT 0 COMMENT '关注数',
+    videoCount BIGINT NOT NULL DEFAULT 0 COMMENT '发布视频数',
+    receivedLikeCount BIGINT NOT NULL DEFAULT 0 COMMENT '作品累计获赞数',
     bio VARCHAR(500) DEFAULT NULL COMMENT '简介',
     INDEX idx_userName (userName)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户信息表';
@@ -38,13 +45,37 @@ CREATE TABLE beatu_video (
     commentCount BIGINT NOT NULL DEFAULT 0 COMMENT '评论数',
     favoriteCount BIGINT NOT NULL DEFAULT 0 COMMENT '收藏数',
     viewCount BIGINT NOT NULL DEFAULT 0 COMMENT '观看次数',
+    shareCount BIGINT NOT NULL DEFAULT 0 COMMENT '分享次数',
     authorAvatar VARCHAR(500) DEFAULT NULL COMMENT '作者头像',
     shareUrl VARCHAR(500) DEFAULT NULL COMMENT '分享链接',
     INDEX idx_authorId (authorId),
-    INDEX idx_orientation (orientation),
+    INDEX idx_video_orientation_videoId (orientation, videoId),
     FOREIGN KEY (authorId) REFERENCES beatu_user(userId) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='视频内容表';
 
+-- 表：beatu_video_rendition
+CREATE TABLE beatu_video_rendition (
+    videoId BIGINT NOT NULL COMMENT '视频 ID (PK)',
+    codec VARCHAR(16) NOT NULL DEFAULT 'h264' COMMENT '编码 (PK)：h264 / h265 / av1',
+    label VARCHAR(16) NOT NULL COMMENT '清晰度标签 (PK)，如 720P',
+    resolution VARCHAR(16) DEFAULT NULL COMMENT '分辨率，如 1280x720',
+    bitrateKbps INT NOT NULL COMMENT '码率（kbps）',
+    url VARCHAR(500) NOT NULL COMMENT '该档位的播放地址',
+    PRIMARY KEY (videoId, codec, label),
+    INDEX idx_rendition_videoId_bitrate (videoId, bitrateKbps),
+    FOREIGN KEY (videoId) REFERENCES beatu_video(videoId) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='视频清晰度档位';
+
+-- 表：beatu_video_tag
+CREATE TABLE beatu_video_tag (
+    videoId BIGINT NOT NULL COMMENT '视频 ID (PK)',
+    tag VARCHAR(64) NOT NULL COMMENT '标签 (PK)',
+    position INT NOT NULL DEFAULT 0 COMMENT '展示顺序',
+    PRIMARY KEY (videoId, tag),
+    INDEX idx_video_tag_tag_videoId (tag, videoId),
+    FOREIGN KEY (videoId) REFERENCES beatu_video(videoId) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='视频标签';
+
 -- 表：beatu_video_interaction
 CREATE TABLE beatu_video_interaction (
     videoId BIGINT NOT NULL COMMENT '视频 ID (PK)',
@@ -53,9 +84,9 @@ CREATE TABLE beatu_video_interaction (
     isFavorited TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否收藏 (0/1)',
     isPending TINYINT(1) NOT NULL DEFAULT 0 COMMENT '本地待同步状态 (0/1)',
     PRIMARY KEY (videoId, userId),
-    INDEX idx_userId (userId),
-    INDEX idx_videoId (videoId),
-    INDEX idx_isPending (isPending),
+    INDEX idx_interaction_userId (userId),
+    INDEX idx_interaction_videoId (videoId),
+    INDEX idx_interaction_isPending (isPending),
     FOREIGN KEY (videoId) REFERENCES beatu_video(videoId) ON DELETE CASCADE,
     FOREIGN KEY (userId) REFERENCES beatu_user(userId) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户-视频互动表';
@@ -67,9 +98,11 @@ CREATE TABLE beatu_user_follow (
     isFollowed TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否关注 (0/1)',
     isPending TINYINT(1) NOT NULL DEFAULT 0 COMMENT '本地待同步状态 (0/1)',
     PRIMARY KEY (userId, authorId),
-    INDEX idx_userId (userId),
-    INDEX idx_authorId (authorId),
-    INDEX idx_isPending (isPending),
+    INDEX idx_follow_userId (userId),
+    INDEX idx_follow_authorId (authorId),
+    INDEX idx_follow_isPending (isPending),
+    INDEX idx_follow_authorId_isFollowed (authorId, isFollowed),
+    INDEX idx_follow_userId_isFollowed (userId, isFollowed),
     FOREIGN KEY (userId) REFERENCES beatu_user(userId) ON DELETE CASCADE,
     FOREIGN KEY (authorId) REFERENCES beatu_user(userId) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户-用户关注表';
@@ -82,10 +115,10 @@ CREATE TABLE beatu_watch_history (
     watchedAt BIGINT NOT NULL COMMENT '最后观看时间（排序用，Unix 时间戳毫秒）',
     isPending TINYINT(1) NOT NULL DEFAULT 0 COMMENT '本地待同步状态 (0/1)',
     PRIMARY KEY (videoId, userId),
-    INDEX idx_userId (userId),
-    INDEX idx_videoId (videoId),
-    INDEX idx_userId_watchedAt (userId, watchedAt),
-    INDEX idx_isPending (isPending),
+    INDEX idx_history_userId (userId),
+    INDEX idx_history_videoId (videoId),
+    INDEX idx_history_userId_watchedAt (userId, watchedAt),
+    INDEX idx_history_isPending (isPending),
     FOREIGN KEY (videoId) REFERENCES beatu_video(videoId) ON DELETE CASCADE,
     FOREIGN KEY (userId) REFERENCES beatu_user(userId) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='观看历史表';
@@ -101,35 +134,95 @@ CREATE TABLE beatu_comment (
     isLiked TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否点赞 (0/1)',
     isPending TINYINT(1) NOT NULL DEFAULT 0 COMMENT '本地待同步状态 (0/1)',
     authorAvatar VARCHAR(500) DEFAULT NULL COMMENT '作者头像',
-    INDEX idx_videoId (videoId),
+    parentId VARCHAR(64) DEFAULT NULL COMMENT '被回复的评论 ID（顶层评论为空）',
+    rootId VARCHAR(64) DEFAULT NULL COMMENT '所属楼层（顶层评论）ID，顶层评论为空',
+    replyCount BIGINT NOT NULL DEFAULT 0 COMMENT '楼层内回复数（仅顶层评论维护）',
     INDEX idx_authorId (authorId),
-    INDEX idx_createdAt (createdAt),
+    INDEX idx_comment_video_root_cursor (videoId, rootId, createdAt, commentId),
+    INDEX idx_comment_root_cursor (rootId, createdAt, commentId),
     FOREIGN KEY (videoId) REFERENCES beatu_video(videoId) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='评论内容表';
 
--- 播放指标表
+-- 表：beatu_comment_interaction
+CREATE TABLE beatu_comment_interaction (
+    commentId VARCHAR(64) NOT NULL COMMENT '评论 ID (PK)',
+    userId VARCHAR(64) NOT NULL COMMENT '用户 ID (PK)',
+    isLiked TINYINT(1) NOT NULL DEFAULT 0 COMMENT '是否点赞 (0/1)',
+    isPending TINYINT(1) NOT NULL DEFAULT 0 COMMENT '本地待同步状态 (0/1)',
+    PRIMARY KEY (commentId, userId),
+    INDEX idx_comment_interaction_userId (userId),
+    FOREIGN KEY (commentId) REFERENCES beatu_comment(commentId) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='用户-评论互动表';
+
+-- 播放指标表（按天 RANGE 分区，每日分区由保留期任务提前创建、过期后 DROP PARTITION）
 CREATE TABLE beatu_metrics_playback (
-    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    id BIGINT AUTO_INCREMENT,
     video_id BIGINT NOT NULL,
     fps DOUBLE,
     start_up_ms BIGINT,
     rebuffer_count INT,
     memory_mb DOUBLE,
     channel VARCHAR(32),
-    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_metric_video (video_id, created_at DESC)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='播放指标';
-
--- 互动指标表
-CREATE TABLE beatu_metrics_interaction (
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
+    INDEX idx_metric_video (video_id, created_at DESC),
+    INDEX idx_metric_playback_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='播放指标'
+PARTITION BY RANGE (TO_DAYS(created_at)) (
+    PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- 播放指标预聚合表（按分钟/小时 × 频道/视频，由服务端增量维护）
+CREATE TABLE beatu_metrics_playback_rollup (
     id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    granularity VARCHAR(8) NOT NULL COMMENT 'minute / hour',
+    bucket_start DATETIME NOT NULL COMMENT '桶起始时间（UTC）',
+    dimension VARCHAR(16) NOT NULL COMMENT 'channel / video',
+    dimension_key VARCHAR(64) NOT NULL,
+    sample_count BIGINT NOT NULL DEFAULT 0,
+    fps_sum DOUBLE NOT NULL DEFAULT 0,
+    fps_count BIGINT NOT NULL DEFAULT 0,
+    startup_sum DOUBLE NOT NULL DEFAULT 0,
+    startup_count BIGINT NOT NULL DEFAULT 0,
+    startup_hist JSON NOT NULL COMMENT '起播耗时固定分桶直方图',
+    rebuffer_sum BIGINT NOT NULL DEFAULT 0,
+    memory_sum DOUBLE NOT NULL DEFAULT 0,
+    memory_count BIGINT NOT NULL DEFAULT 0,
+    UNIQUE KEY uq_playback_rollup_bucket (granularity, dimension, dimension_key, bucket_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='播放指标预聚合';
+
+-- 互动指标表（按天 RANGE 分区，同播放指标表）
+CREATE TABLE beatu_metrics_interaction (
+    id BIGINT AUTO_INCREMENT,
     event VARCHAR(64) NOT NULL,
     video_id BIGINT DEFAULT NULL,
     latency_ms BIGINT,
     success BOOLEAN DEFAULT TRUE,
-    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_metric_event (event, created_at DESC)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='互动指标';
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
+    INDEX idx_metric_event (event, created_at DESC),
+    INDEX idx_metric_interaction_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='互动指标'
+PARTITION BY RANGE (TO_DAYS(created_at)) (
+    PARTITION p_history VALUES LESS THAN (TO_DAYS('2025-01-01')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- 图文内容表
+CREATE TABLE beatu_image_post (
+    postId BIGINT PRIMARY KEY COMMENT '图文 ID (PK)',
+    title VARCHAR(200) NOT NULL COMMENT '标题',
+    imageUrls JSON NOT NULL COMMENT '图片 URL 列表，首张作为封面',
+    bgmUrl VARCHAR(500) COMMENT '背景音乐 URL',
+    authorId VARCHAR(64) NOT NULL DEFAULT 'beatu-official' COMMENT '作者 ID',
+    authorName VARCHAR(100) NOT NULL DEFAULT 'BeatU 官方' COMMENT '作者名称',
+    likeCount BIGINT NOT NULL DEFAULT 0 COMMENT '点赞数',
+    commentCount BIGINT NOT NULL DEFAULT 0 COMMENT '评论数',
+    favoriteCount BIGINT NOT NULL DEFAULT 0 COMMENT '收藏数',
+    shareCount BIGINT NOT NULL DEFAULT 0 COMMENT '分享数',
+    isActive BOOLEAN NOT NULL DEFAULT TRUE COMMENT '是否参与 Feed 混编'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='图文+BGM 内容';
 
 -- ============================================
 -- 3. 插入数据
@@ -395,6 +488,15 @@ VALUES
 ('c044', 100015, '1069344105', '歌词大意：来财，来，来财[doge]', 1764383515000, 1113, 0, 0, 'https://i0.hdslb.com/bfs/face/b461e0beb28bdeda355a4919b3a1c7b24a6ec8db.jpg'),
 ('c045', 100015, '176618655', '原版是老阿姨装嫩，这个是小可爱装老阿姨。非常有意思[doge_金箍]', 1764391082000, 2877, 0, 0, 'http://i0.hdslb.com/bfs/face/0e8212a0b68957b400fbaae570f58c686eebc205.jpg');
 
+-- 图文内容（Feed 混编）
+INSERT INTO beatu_image_post (postId, title, imageUrls, bgmUrl, likeCount, commentCount, favoriteCount, shareCount)
+VALUES
+(1, '🌅 日出东方，新的一天开始了', '["https://picsum.photos/seed/beatu-sunrise-1/720/1280", "https://picsum.photos/seed/beatu-sunrise-2/720/1280", "https://picsum.photos/seed/beatu-sunrise-3/720/1280"]', 'https://samplelib.com/lib/preview/mp3/sample-6s.mp3', 1314, 99, 520, 66),
+(2, '🌸 春天的花海，美不胜收', '["https://picsum.photos/seed/beatu-flower-1/720/1280", "https://picsum.photos/seed/beatu-flower-2/720/1280", "https://picsum.photos/seed/beatu-flower-3/720/1280"]', 'https://samplelib.com/lib/preview/mp3/sample-6s.mp3', 888, 66, 333, 66),
+(3, '🏔️ 雪山之巅，一览众山小', '["https://picsum.photos/seed/beatu-mountain-1/720/1280", "https://picsum.photos/seed/beatu-mountain-2/720/1280", "https://picsum.photos/seed/beatu-mountain-3/720/1280"]', 'https://samplelib.com/lib/preview/mp3/sample-6s.mp3', 2024, 168, 666, 66),
+(4, '🌊 海浪拍岸，心旷神怡', '["https://picsum.photos/seed/beatu-sea-1/720/1280", "https://picsum.photos/seed/beatu-sea-2/720/1280", "https://picsum.photos/seed/beatu-sea-3/720/1280"]', 'https://samplelib.com/lib/preview/mp3/sample-6s.mp3', 999, 88, 444, 66),
+(5, '🌙 夜晚的城市，灯火通明', '["https://picsum.photos/seed/beatu-night-1/720/1280", "https://picsum.photos/seed/beatu-night-2/720/1280", "https://picsum.photos/seed/beatu-night-3/720/1280"]', 'https://samplelib.com/lib/preview/mp3/sample-6s.mp3', 777, 55, 222, 66);
+
 -- ============================================
 -- 4. 验证数据
 -- ============================================
@@ -404,4 +506,5 @@ SELECT COUNT(*) AS video_count FROM beatu_video;
 SELECT COUNT(*) AS comment_count FROM beatu_comment;
 SELECT COUNT(*) AS interaction_count FROM beatu_video_interaction;
 SELECT COUNT(*) AS follow_count FROM beatu_user_follow;
-SELECT COUNT(*) AS watch_history_count FROM beatu_watch_history;
\ No newline at end of file
+SELECT COUNT(*) AS watch_history_count FROM beatu_watch_history;
+SELECT COUNT(*) AS image_post_count FROM beatu_image_post;
\ No newline at end of file
@@ -1,19 +1,221 @@
 from __future__ import annotations
 
 import argparse
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Tuple
 
-from sqlalchemy import create_engine
+from sqlalchemy import BigInteger, Column, Index, MetaData, String, Table, column, create_engine, func, inspect, select, table
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.types import NullType
 
 from core.config import settings
-from database.models import Base
+from database.models import Base, SchemaMigration
+from database.partitions import METRICS_TABLES, partition_by_day
 
+logger = logging.getLogger(__name__)
 
-def init_db(drop_existing: bool = False) -> None:
-    """Create database tables according to ORM models."""
-    engine = create_engine(settings.database_url, future=True)
+
+@dataclass(frozen=True)
+class Migration:
+    """一次结构变更：version 单调递增，upgrade 需可重复执行（已存在的对象跳过）。"""
+
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+IndexSpec = Tuple[str, str, Tuple[str, ...]]
+
+
+def _index(table_name: str, name: str, columns: Tuple[str, ...]) -> Index:
+    # 迁移自带索引定义（不引用 models.py 中当前的声明），保证历史迁移在模型演进后仍可执行
+    table = Table(table_name, MetaData(), *(Column(column, NullType()) for column in columns))
+    return Index(name, *(table.c[column] for column in columns))
+
+
+def _existing_indexes(conn: Connection, table_name: str) -> set[str]:
+    return {item["name"] for item in inspect(conn).get_indexes(table_name)}
+
+
+def _create_indexes(*specs: IndexSpec) -> Callable[[Connection], None]:
+    """创建索引；库中已存在同名索引时跳过。"""
+
+    def upgrade(conn: Connection) -> None:
+        for table_name, name, columns in specs:
+            if name not in _existing_indexes(conn, table_name):
+                _index(table_name, name, columns).create(conn)
+                logger.info(f"创建索引 {table_name}.{name}")
+
+    return upgrade
+
+
+def _replace_index(old: IndexSpec, new: IndexSpec) -> Callable[[Connection], None]:
+    """先建新索引再删除被取代的旧索引。"""
+    create = _create_indexes(new)
+
+    def upgrade(conn: Connection) -> None:
+        create(conn)
+        table_name, name, columns = old
+        if name in _existing_indexes(conn, table_name):
+            _index(table_name, name, columns).drop(conn)
+            logger.info(f"删除索引 {table_name}.{name}")
+
+    return upgrade
+
+
+def _add_columns(table_name: str, *columns: Column) -> Callable[[Connection], None]:
+    """ALTER TABLE ADD COLUMN；库中已存在同名列时跳过。"""
+
+    stub = Table(table_name, MetaData(), *columns)
+
+    def upgrade(conn: Connection) -> None:
+        existing = {item["name"] for item in inspect(conn).get_columns(table_name)}
+        for column in stub.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {conn.dialect.identifier_preparer.quote(table_name)} ADD COLUMN {ddl}")
+                logger.info(f"添加列 {table_name}.{column.name}")
+
+    return upgrade
+
+
+def _backfill_author_stats(conn: Connection) -> None:
+    """按现有视频回填作者的视频数与累计获赞数（一条带关联子查询的 UPDATE）。"""
+    user = table("beatu_user", column("userId"), column("videoCount"), column("receivedLikeCount"))
+    video = table("beatu_video", column("authorId"), column("likeCount"))
+    owned = video.c.authorId == user.c.userId
+    conn.execute(
+        user.update().values(
+            videoCount=select(func.count()).select_from(video).where(owned).scalar_subquery(),
+            receivedLikeCount=select(func.coalesce(func.sum(video.c.likeCount), 0)).where(owned).scalar_subquery(),
+        )
+    )
+    logger.info("回填作者视频数/获赞数")
+
+
+def _partition_metrics_tables(conn: Connection) -> None:
+    """MySQL 上把原始指标表改为按天 RANGE 分区（一次性重建表）；其他数据库跳过。"""
+    today = datetime.utcnow().date()
+    for table_name in METRICS_TABLES:
+        partition_by_day(conn, table_name, today, settings.metrics_partition_days_ahead)
+
+
+def _steps(*steps: Callable[[Connection], None]) -> Callable[[Connection], None]:
+    def upgrade(conn: Connection) -> None:
+        for step in steps:
+            step(conn)
+
+    return upgrade
+
+
+# 按 version 顺序执行；新增迁移只追加，不修改已发布的条目
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "按查询形状添加组合索引",
+        _create_indexes(
+            ("beatu_video", "idx_video_orientation_videoId", ("orientation", "videoId")),
+            ("beatu_comment", "idx_comment_videoId_createdAt", ("videoId", "createdAt")),
+            ("beatu_user_follow", "idx_follow_authorId_isFollowed", ("authorId", "isFollowed")),
+            ("beatu_user_follow", "idx_follow_userId_isFollowed", ("userId", "isFollowed")),
+        ),
+    ),
+    Migration(
+        2,
+        "评论游标分页索引 (videoId, createdAt, commentId)",
+        _replace_index(
+            ("beatu_comment", "idx_comment_videoId_createdAt", ("videoId", "createdAt")),
+            ("beatu_comment", "idx_comment_video_cursor", ("videoId", "createdAt", "commentId")),
+        ),
+    ),
+    Migration(
+        3,
+        "评论楼层回复：parentId / rootId / replyCount",
+        _steps(
+            _add_columns(
+                "beatu_comment",
+                Column("parentId", String(64)),
+                Column("rootId", String(64)),
+                Column("replyCount", BigInteger, nullable=False, server_default="0"),
+            ),
+            _replace_index(
+                ("beatu_comment", "idx_comment_video_cursor", ("videoId", "createdAt", "commentId")),
+                ("beatu_comment", "idx_comment_video_root_cursor", ("videoId", "rootId", "createdAt", "commentId")),
+            ),
+            _create_indexes(("beatu_comment", "idx_comment_root_cursor", ("rootId", "createdAt", "commentId"))),
+        ),
+    ),
+    Migration(
+        4,
+        "作者主页聚合：videoCount / receivedLikeCount",
+        _steps(
+            _add_columns(
+                "beatu_user",
+                Column("videoCount", BigInteger, nullable=False, server_default="0"),
+                Column("receivedLikeCount", BigInteger, nullable=False, server_default="0"),
+            ),
+            _backfill_author_stats,
+        ),
+    ),
+    Migration(
+        5,
+        "视频分享数：shareCount",
+        _add_columns("beatu_video", Column("shareCount", BigInteger, nullable=False, server_default="0")),
+    ),
+    Migration(
+        6,
+        "原始指标表：created_at 索引与按天分区",
+        _steps(
+            _create_indexes(
+                ("beatu_metrics_playback", "idx_metric_playback_created_at", ("created_at",)),
+                ("beatu_metrics_interaction", "idx_metric_interaction_created_at", ("created_at",)),
+            ),
+            _partition_metrics_tables,
+        ),
+    ),
+    Migration(
+        7,
+        "播放预聚合表：(granularity, bucket_start) 保留期清理索引",
+        _create_indexes(
+            ("beatu_metrics_playback_rollup", "idx_playback_rollup_granularity_bucket", ("granularity", "bucket_start")),
+        ),
+    ),
+]
+
+
+def migrate(engine: Engine) -> List[Tuple[int, str]]:
+    """执行尚未应用的迁移，返回本次执行的 (version, description)。"""
+    SchemaMigration.__table__.create(engine, checkfirst=True)
+    applied: List[Tuple[int, str]] = []
+    with engine.begin() as conn:
+        done = set(conn.execute(select(SchemaMigration.version)).scalars())
+        for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+            if migration.version in done:
+                continue
+            migration.upgrade(conn)
+            conn.execute(
+                SchemaMigration.__table__.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    appliedAt=int(time.time() * 1000),
+                )
+            )
+            applied.append((migration.version, migration.description))
+    return applied
+
+
+def init_db(drop_existing: bool = False, engine: Engine | None = None) -> None:
+    """Create database tables according to ORM models, then apply pending migrations."""
+    engine = engine or create_engine(settings.database_url, future=True)
     if drop_existing:
         Base.metadata.drop_all(engine)
     Base.metadata.create_all(engine)
+    for version, description in migrate(engine):
+        print(f"Applied migration {version}: {description}")
 
 
 def parse_args() -> argparse.Namespace:
@@ -30,5 +232,3 @@ if __name__ == "__main__":
     args = parse_args()
     init_db(drop_existing=args.drop)
     print(f"Database initialized using {settings.database_url}")
-
-
@@ -33,6 +33,8 @@ class User(Base):
     bio = Column(Text)
     followerCount = Column(BigInteger, nullable=False, default=0)  # ✅ 修改：字段名从 followers 改为 followerCount
     followingCount = Column(BigInteger, nullable=False, default=0)  # ✅ 修改：字段名从 followings 改为 followingCount
+    videoCount = Column(BigInteger, nullable=False, default=0)  # 发布的视频数（作者主页聚合）
+    receivedLikeCount = Column(BigInteger, nullable=False, default=0)  # 作品累计获赞数，点赞/取消点赞时增量维护
 
     videos = relationship("Video", back_populates="author", cascade="all, delete-orphan", primaryjoin="User.userId == foreign(Video.authorId)")
     watch_histories = relationship("WatchHistory", back_populates="user", cascade="all, delete-orphan", primaryjoin="User.userId == foreign(WatchHistory.userId)")
@@ -52,6 +54,7 @@ class Video(Base):
     commentCount = Column(BigInteger, nullable=False, default=0)  # ✅ 修改：字段名从 comment_count 改为 commentCount
     favoriteCount = Column(BigInteger, nullable=False, default=0)  # ✅ 修改：字段名从 favorite_count 改为 favoriteCount
     viewCount = Column(BigInteger, nullable=False, default=0)  # ✅ 修改：字段名从 view_count 改为 viewCount
+    shareCount = Column(BigInteger, nullable=False, default=0)  # ✅ 新增：分享次数（由计数缓冲区批量落库）
     authorAvatar = Column(String(500))  # ✅ 修改：字段名从 author_avatar 改为 authorAvatar
     shareUrl = Column(String(500))  # ✅ 新增：分享链接
 
@@ -59,6 +62,42 @@ class Video(Base):
     author = relationship("User", back_populates="videos", primaryjoin="foreign(Video.authorId) == User.userId")
     watch_histories = relationship("WatchHistory", back_populates="video", cascade="all, delete-orphan", primaryjoin="Video.videoId == foreign(WatchHistory.videoId)")
 
+    __table_args__ = (
+        # Feed：WHERE orientation = ? ORDER BY videoId DESC
+        Index("idx_video_orientation_videoId", "orientation", "videoId"),
+    )
+
+
+class VideoRendition(Base):
+    """视频的清晰度档位（转码产物），渲染为 VideoItem.qualities，并作为 /ai/quality 的候选档位"""
+
+    __tablename__ = "beatu_video_rendition"
+
+    videoId = Column(BigInteger, primary_key=True, nullable=False)
+    codec = Column(String(16), primary_key=True, nullable=False, default="h264")  # h264 / h265 / av1
+    label = Column(String(16), primary_key=True, nullable=False)  # 360P / 720P / 1080P ...
+    resolution = Column(String(16))  # 如 1280x720
+    bitrateKbps = Column(Integer, nullable=False)
+    url = Column(String(500), nullable=False)
+
+    __table_args__ = (
+        # 渲染与清晰度决策：WHERE videoId IN (...) ORDER BY videoId, bitrateKbps
+        Index("idx_rendition_videoId_bitrate", "videoId", "bitrateKbps"),
+    )
+
+
+class VideoTag(Base):
+    __tablename__ = "beatu_video_tag"
+
+    videoId = Column(BigInteger, primary_key=True, nullable=False)
+    tag = Column(String(64), primary_key=True, nullable=False)
+    position = Column(Integer, nullable=False, default=0)  # 展示顺序
+
+    __table_args__ = (
+        # 按标签找视频
+        Index("idx_video_tag_tag_videoId", "tag", "videoId"),
+    )
+
 
 class Comment(Base):
     __tablename__ = "beatu_comment"  # ✅ 修改：表名从 beatu_comments 改为 beatu_comment
@@ -72,9 +111,50 @@ class Comment(Base):
     isLiked = Column(Boolean, default=False, nullable=False)  # ✅ 新增：是否点赞
     isPending = Column(Boolean, default=False, nullable=False)  # ✅ 新增：本地待同步状态
     authorAvatar = Column(String(500))  # ✅ 修改：字段名从 author_avatar 改为 authorAvatar
+    parentId = Column(String(64))  # ✅ 新增：被回复的评论 ID（顶层评论为空）
+    rootId = Column(String(64))  # ✅ 新增：所属楼层（顶层评论）ID，顶层评论为空
+    replyCount = Column(BigInteger, default=0, nullable=False)  # ✅ 新增：楼层内回复数（仅顶层评论维护）
 
     video = relationship("Video", back_populates="comments", primaryjoin="foreign(Comment.videoId) == Video.videoId")
 
+    __table_args__ = (
+        # 顶层评论游标分页：WHERE videoId = ? AND rootId IS NULL AND (createdAt, commentId) < (?, ?)
+        Index("idx_comment_video_root_cursor", "videoId", "rootId", "createdAt", "commentId"),
+        # 楼层回复：WHERE rootId IN (...) ORDER BY createdAt, commentId
+        Index("idx_comment_root_cursor", "rootId", "createdAt", "commentId"),
+    )
+
+
+class ImagePost(Base):
+    """图文+BGM 内容表：由 Feed 混编注入到视频流中"""
+    __tablename__ = "beatu_image_post"
+
+    postId = Column(BigInteger, primary_key=True)
+    title = Column(String(200), nullable=False)
+    imageUrls = Column(JSON, nullable=False)  # 图片 URL 列表（至少 1 张，首张作为封面）
+    bgmUrl = Column(String(500))
+    authorId = Column(String(64), nullable=False, default="beatu-official")
+    authorName = Column(String(100), nullable=False, default="BeatU 官方")
+    likeCount = Column(BigInteger, nullable=False, default=0)
+    commentCount = Column(BigInteger, nullable=False, default=0)
+    favoriteCount = Column(BigInteger, nullable=False, default=0)
+    shareCount = Column(BigInteger, nullable=False, default=0)
+    isActive = Column(Boolean, nullable=False, default=True)
+
+
+class CommentInteraction(Base):
+    """用户-评论互动表（评论点赞）"""
+    __tablename__ = "beatu_comment_interaction"
+
+    commentId = Column(String(64), primary_key=True, nullable=False)
+    userId = Column(String(64), primary_key=True, nullable=False)
+    isLiked = Column(Boolean, default=False, nullable=False)
+    isPending = Column(Boolean, default=False, nullable=False)  # 本地待同步状态
+
+    __table_args__ = (
+        Index("idx_comment_interaction_userId", "userId"),
+    )
+
 
 class VideoInteraction(Base):
     """用户-视频互动表（点赞/收藏）"""
@@ -90,9 +170,9 @@ class VideoInteraction(Base):
     user = relationship("User", primaryjoin="foreign(VideoInteraction.userId) == User.userId")
 
     __table_args__ = (
-        Index("idx_userId", "userId"),
-        Index("idx_videoId", "videoId"),
-        Index("idx_isPending", "isPending"),
+        Index("idx_interaction_userId", "userId"),
+        Index("idx_interaction_videoId", "videoId"),
+        Index("idx_interaction_isPending", "isPending"),
     )
 
 
@@ -108,6 +188,39 @@ class PlaybackMetric(Base):
     channel = Column(String(32))
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # 保留期清理与按时间范围分析：WHERE created_at < ?（MySQL 上另按天分区，见 database/partitions.py）
+        Index("idx_metric_playback_created_at", "created_at"),
+    )
+
+
+class PlaybackRollup(Base):
+    """播放指标按分钟/小时、按频道/视频的预聚合（由 services.playback_rollups 增量维护）"""
+
+    __tablename__ = "beatu_metrics_playback_rollup"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    granularity = Column(String(8), nullable=False)  # minute / hour
+    bucket_start = Column(DateTime, nullable=False)  # 桶起始时间（UTC）
+    dimension = Column(String(16), nullable=False)  # channel / video
+    dimension_key = Column(String(64), nullable=False)
+    sample_count = Column(BigInteger, nullable=False, default=0)
+    fps_sum = Column(Float, nullable=False, default=0)
+    fps_count = Column(BigInteger, nullable=False, default=0)
+    startup_sum = Column(Float, nullable=False, default=0)
+    startup_count = Column(BigInteger, nullable=False, default=0)
+    startup_hist = Column(JSON, nullable=False)  # 起播耗时固定分桶直方图（计数列表）
+    rebuffer_sum = Column(BigInteger, nullable=False, default=0)
+    memory_sum = Column(Float, nullable=False, default=0)
+    memory_count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        # 查询：WHERE granularity = ? AND dimension = ? AND dimension_key = ? AND bucket_start BETWEEN ? AND ?
+        UniqueConstraint("granularity", "dimension", "dimension_key", "bucket_start", name="uq_playback_rollup_bucket"),
+        # 保留期清理：WHERE granularity = ? AND bucket_start < ?
+        Index("idx_playback_rollup_granularity_bucket", "granularity", "bucket_start"),
+    )
+
 
 class InteractionMetric(Base):
     __tablename__ = "beatu_metrics_interaction"
@@ -119,6 +232,10 @@ class InteractionMetric(Base):
     success = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        Index("idx_metric_interaction_created_at", "created_at"),
+    )
+
 
 class UserFollow(Base):
     __tablename__ = "beatu_user_follow"  # ✅ 修改：表名从 beatu_user_follows 改为 beatu_user_follow
@@ -132,12 +249,24 @@ class UserFollow(Base):
     author = relationship("User", primaryjoin="foreign(UserFollow.authorId) == User.userId")
 
     __table_args__ = (
-        Index("idx_userId", "userId"),
-        Index("idx_authorId", "authorId"),
-        Index("idx_isPending", "isPending"),
+        Index("idx_follow_userId", "userId"),
+        Index("idx_follow_authorId", "authorId"),
+        Index("idx_follow_isPending", "isPending"),
+        # 粉丝数/关注数统计：WHERE authorId|userId = ? AND isFollowed
+        Index("idx_follow_authorId_isFollowed", "authorId", "isFollowed"),
+        Index("idx_follow_userId_isFollowed", "userId", "isFollowed"),
     )
 
 
+class SchemaMigration(Base):
+    """已执行的数据库迁移版本（由 database/init_db.py 维护）"""
+    __tablename__ = "beatu_schema_migration"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String(200), nullable=False)
+    appliedAt = Column(BigInteger, nullable=False)  # Unix 时间戳毫秒
+
+
 class WatchHistory(Base):
     __tablename__ = "beatu_watch_history"
 
@@ -151,10 +280,10 @@ class WatchHistory(Base):
     video = relationship("Video", back_populates="watch_histories", primaryjoin="foreign(WatchHistory.videoId) == Video.videoId")
 
     __table_args__ = (
-        Index("idx_userId", "userId"),
-        Index("idx_videoId", "videoId"),
-        Index("idx_userId_watchedAt", "userId", "watchedAt"),
-        Index("idx_isPending", "isPending"),
+        Index("idx_history_userId", "userId"),
+        Index("idx_history_videoId", "videoId"),
+        Index("idx_history_userId_watchedAt", "userId", "watchedAt"),
+        Index("idx_history_isPending", "isPending"),
     )
 
 
@@ -0,0 +1,106 @@
+"""按天分区的原始指标表（MySQL RANGE 分区）
+
+beatu_metrics_playback / beatu_metrics_interaction 只追加写入，按 created_at 做 RANGE 分区：
+
+- 每天一个分区 pYYYYMMDD（VALUES LESS THAN (TO_DAYS(次日))），最后是兜底分区 pmax
+- 保留期清理直接 DROP PARTITION，只改元数据，与分区内行数无关
+- 提前若干天从 pmax 中拆出未来的分区（pmax 为空时 REORGANIZE 无需搬数据）
+
+MySQL 要求分区键包含在每个唯一键中，因此分区后主键为 (id, created_at)。
+SQLite 等不支持分区的数据库不做任何 DDL，由保留期任务按 created_at 索引分批删除。
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+METRICS_TABLES = ("beatu_metrics_playback", "beatu_metrics_interaction")
+MAX_PARTITION = "pmax"
+HISTORY_PARTITION = "p_history"
+
+
+def supports_partitions(conn: Connection) -> bool:
+    return conn.dialect.name == "mysql"
+
+
+def to_days(day: date) -> int:
+    """与 MySQL TO_DAYS() 一致的天数（TO_DAYS('0001-01-01') = 366）"""
+    return day.toordinal() + 365
+
+
+def partition_name(day: date) -> str:
+    return f"p{day:%Y%m%d}"
+
+
+def day_partitions_sql(first_day: date, last_day: date) -> List[str]:
+    """[first_day, last_day] 每天一个分区的定义"""
+    days = (last_day - first_day).days + 1
+    return [
+        f"PARTITION {partition_name(day)} VALUES LESS THAN ({to_days(day + timedelta(days=1))})"
+        for day in (first_day + timedelta(days=offset) for offset in range(max(days, 0)))
+    ]
+
+
+def list_partitions(conn: Connection, table_name: str) -> List[Tuple[str, str]]:
+    """已有分区的 (名称, 上界)，按顺序排列；未分区的表返回空列表"""
+    rows = conn.execute(
+        text(
+            "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ),
+        {"table": table_name},
+    )
+    return [(name, description) for name, description in rows]
+
+
+def partition_by_day(conn: Connection, table_name: str, today: date, days_ahead: int) -> bool:
+    """把未分区的指标表改为按天分区；已分区时跳过。返回是否执行了 DDL。"""
+    if not supports_partitions(conn) or list_partitions(conn, table_name):
+        return False
+    # 一次性重建表：created_at 改为 DATETIME（TO_DAYS 分区键），主键加入分区键
+    conn.exec_driver_sql(
+        f"ALTER TABLE {table_name} "
+        "MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP, "
+        "DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+    )
+    definitions = [
+        f"PARTITION {HISTORY_PARTITION} VALUES LESS THAN ({to_days(today)})",
+        *day_partitions_sql(today, today + timedelta(days=days_ahead)),
+        f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE",
+    ]
+    conn.exec_driver_sql(f"ALTER TABLE {table_name} PARTITION BY RANGE (TO_DAYS(created_at)) ({', '.join(definitions)})")
+    logger.info(f"按天分区 {table_name}")
+    return True
+
+
+def ensure_future_partitions(conn: Connection, table_name: str, today: date, days_ahead: int) -> int:
+    """从 pmax 中拆出直到 today + days_ahead 的每日分区，返回新建的分区数"""
+    bounds = [int(description) for name, description in list_partitions(conn, table_name) if name != MAX_PARTITION]
+    # 已有分区覆盖到 (最大上界 - 1) 这一天；中间若有空档（任务长时间未运行），由今天的分区一并覆盖
+    first_day = max(date.fromordinal(max(bounds) - 365), today) if bounds else today
+    definitions = day_partitions_sql(first_day, today + timedelta(days=days_ahead))
+    if not definitions:
+        return 0
+    definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    conn.exec_driver_sql(f"ALTER TABLE {table_name} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(definitions)})")
+    return len(definitions) - 1
+
+
+def drop_partitions_before(conn: Connection, table_name: str, cutoff: date) -> List[str]:
+    """删除上界不晚于 cutoff 的分区（分区内全部早于 cutoff），返回被删除的分区名"""
+    expired = [
+        name
+        for name, description in list_partitions(conn, table_name)
+        if name != MAX_PARTITION and int(description) <= to_days(cutoff)
+    ]
+    if expired:
+        conn.exec_driver_sql(f"ALTER TABLE {table_name} DROP PARTITION {', '.join(expired)}")
+    return expired
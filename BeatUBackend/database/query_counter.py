@@ -0,0 +1,102 @@
+"""
+SQL 查询计数与 N+1 检测
+
+在 Engine 的 before/after_cursor_execute 事件上挂钩，把每条语句计入“当前上下文”
+（一次 HTTP 请求、一个测试代码块）的 QueryStats 中：
+- 统计语句条数与累计耗时
+- 按语句形状（参数占位符、IN 列表归一化后的 SQL）聚合，同一形状重复次数超过阈值即疑似 N+1
+"""
+from __future__ import annotations
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 各驱动的参数占位符：sqlite 的 ?、pymysql 的 %s / %(name)s、文本 SQL 的 :name
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_IN_LIST_RE = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("beatu_query_stats", default=None)
+
+
+def normalize_statement(statement: str) -> str:
+    """将 SQL 归一化为“形状”：折叠空白，IN (?, ?, ?) 统一为 IN (?)。"""
+    shape = _WHITESPACE_RE.sub(" ", statement).strip()
+    return _IN_LIST_RE.sub("(?)", shape)
+
+
+class QueryStats:
+    """一个上下文内的查询统计。"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.shapes[normalize_statement(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """返回重复次数超过 threshold 的语句形状（按次数降序）。"""
+        return [(shape, times) for shape, times in self.shapes.most_common() if times > threshold]
+
+    def describe(self) -> str:
+        lines = [f"{self.count} 条查询，共 {self.total_ms:.2f}ms"]
+        for shape, times in self.shapes.most_common():
+            lines.append(f"  x{times}: {shape}")
+        return "\n".join(lines)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    在代码块内统计查询。
+
+    统计对象通过 ContextVar 传递，FastAPI 把同步路由放进线程池执行时会复制上下文，
+    因此中间件里开启的统计在路由/服务层中同样生效。嵌套使用时内层块独立计数。
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("beatu_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["beatu_query_start"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, (time.perf_counter() - started) * 1000)
+
+
+def _handle_error(exception_context) -> None:
+    # 语句执行失败时不会触发 after_cursor_execute，这里弹出对应的开始时间
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("beatu_query_start"):
+        conn.info["beatu_query_start"].pop()
+
+
+def install_query_counter(engine: Engine) -> None:
+    """为 engine 注册计数钩子（重复调用无副作用）。"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from datetime import datetime
@@ -6,7 +7,8 @@ from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 
 from core.config import settings
-from core.middleware import RequestLoggingMiddleware
+from core.middleware import QueryCountMiddleware, RequestLoggingMiddleware
+from core.responses import ORJSONResponse
 from routes.ai import router as ai_router
 from routes.mcp import router as mcp_router
 from routes.metrics import router as metrics_router
@@ -27,9 +29,52 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理：启动和关闭时的资源管理"""
     # 启动时
     logger.info("服务启动中...")
+    from database.connection import SessionLocal
+    from services.image_post_service import load_image_post_catalog
+    from services.ai_comment_queue import get_ai_comment_queue, run_ai_comment_recovery
+    from services.counter_buffer import run_counter_flusher
+    from services.follow_counts import run_follow_count_reconciler
+    from services.item_cf_service import load_item_cf_table
+    from services.metrics_export import run_metrics_exporter
+    from services.metrics_retention import run_metrics_retention
+    from services.playback_rollups import run_playback_rollup_flusher
+    from services.ranking_service import run_ranking_refresher
+
+    # 预加载推荐近邻表与图文目录，并启动热度榜后台刷新
+    load_item_cf_table()
+    with SessionLocal() as db:
+        load_image_post_catalog(db)
+    # 热度榜由后台任务启动即刷新（预热），请求路径不再同步构建
+    ranking_task = asyncio.create_task(run_ranking_refresher())
+    # 计数增量（评论点赞等）后台批量落库
+    counter_task = asyncio.create_task(run_counter_flusher())
+    # 播放 QoE 分钟/小时预聚合落库
+    rollup_task = asyncio.create_task(run_playback_rollup_flusher())
+    # 原始指标保留期清理（MySQL 上删除过期分区并创建未来分区）
+    retention_task = asyncio.create_task(run_metrics_retention())
+    # 原始指标按天导出为列式文件（可选）
+    export_task = asyncio.create_task(run_metrics_exporter()) if settings.metrics_export_enabled else None
+    # 粉丝/关注计数周期校对
+    reconcile_task = asyncio.create_task(run_follow_count_reconciler())
+    # AI 评论回答异步生成 worker；遗留的占位评论（超过最长生成时长仍未完成）由后台周期回填
+    ai_comment_queue = get_ai_comment_queue()
+    ai_comment_queue.start()
+    recovery_task = asyncio.create_task(run_ai_comment_recovery())
     yield
     # 关闭时
     logger.info("服务关闭中，清理资源...")
+    ranking_task.cancel()
+    reconcile_task.cancel()
+    retention_task.cancel()
+    recovery_task.cancel()
+    if export_task is not None:
+        export_task.cancel()
+    # 先排空 AI 评论队列（有上限的等待），再取消 worker
+    await ai_comment_queue.stop()
+    # 取消后会把剩余的计数增量最后落库一次
+    counter_task.cancel()
+    rollup_task.cancel()
+    await asyncio.gather(counter_task, rollup_task, return_exceptions=True)
     try:
         # 清理 MCP 服务资源
         from services.mcp_orchestrator_service import _mcp_service
@@ -46,11 +91,15 @@ def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.project_name, 
         version=settings.version,
-        lifespan=lifespan  # ✅ 添加生命周期管理
+        lifespan=lifespan,  # ✅ 添加生命周期管理
+        default_response_class=ORJSONResponse,  # ✅ 优化：默认使用 orjson 编码响应
     )
 
     # 添加请求日志中间件（记录所有请求）
     app.add_middleware(RequestLoggingMiddleware)
+    # 统计每个请求的 SQL 查询条数，响应头返回 X-Query-Count，并对 N+1 告警
+    if settings.query_tracking_enabled:
+        app.add_middleware(QueryCountMiddleware)
 
     # 健康检查接口（用于快速验证服务是否正常运行）
     @app.get("/health")
@@ -5,13 +5,14 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from core.responses import ORJSONResponse
 from database.connection import get_db
+from routes.videos import enqueue_ai_comment, resolve_user
 from schemas.api import (
     AICommentQARequest,
     AIQualityRequest,
     AIRecommendRequest,
     AISearchRequest,
-    CommentAIRequest,
     success_response,
 )
 from services.ai_service import AIService
@@ -31,29 +32,37 @@ def get_comment_service(db: Session = Depends(get_db)) -> CommentService:
 
 
 @router.post("/ai/recommend")
-def recommend(payload: AIRecommendRequest, service: AIService = Depends(get_ai_service)):
-    data = service.recommend(payload)
-    return success_response(data.dict(by_alias=True))
+def recommend(
+    payload: AIRecommendRequest,
+    service: AIService = Depends(get_ai_service),
+    user_id: str = Depends(resolve_user),
+):
+    data = service.recommend(payload, user_id=user_id)
+    return ORJSONResponse(success_response(data.to_payload()))
 
 
 @router.post("/ai/quality")
-def quality(payload: AIQualityRequest, service: AIService = Depends(get_ai_service)):
-    data = service.quality(payload)
+def quality(
+    payload: AIQualityRequest,
+    service: AIService = Depends(get_ai_service),
+    user_id: str = Depends(resolve_user),
+):
+    data = service.quality(payload, user_id=user_id)
     return success_response(data.dict(by_alias=True))
 
 
 @router.post("/ai/comment/qa")
-def comment_qa(
+async def comment_qa(
     payload: AICommentQARequest,
-    service: AIService = Depends(get_ai_service),
     comment_service: CommentService = Depends(get_comment_service),
 ):
-    content = service.comment_qa(payload)
-    ai_comment = comment_service.create_ai_comment(
-        video_id=payload.video_id,
-        payload=CommentAIRequest(question=payload.question),
+    # ✅ 优化：回答由 AI 评论队列异步生成，这里立即返回占位评论，完成后通过 /comments/{id}/stream 推送
+    ai_comment = await enqueue_ai_comment(
+        comment_service,
+        payload.video_id,
+        payload.question,
         user_name="@元宝",
-        override_content=content,
+        kind="qa",
     )
     return success_response({"comment": ai_comment.dict(by_alias=True)})
 
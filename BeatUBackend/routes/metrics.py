@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 
+from core.responses import ORJSONResponse
 from database.connection import get_db
 from schemas.api import MetricsInteraction, MetricsPlayback, success_response
+from services.ai_comment_queue import get_ai_comment_queue
+from services.feed_cache import get_feed_page_cache
+from services.follow_counts import get_follow_count_reconciler
+from services.metrics_export import get_metrics_exporter
+from services.metrics_retention import get_metrics_retention
 from services.metrics_service import MetricsService
+from services.playback_rollups import MAX_EPOCH_MS
+from services.quality_engine import get_quality_engine
 
 
 router = APIRouter(tags=["metrics"])
@@ -31,4 +39,56 @@ def record_interaction(
     return success_response({"success": True})
 
 
+@router.get("/metrics/playback/rollups")
+def playback_rollups(
+    key: str = Query(..., min_length=1, max_length=64, description="频道名或视频 ID"),
+    granularity: str = Query("minute", pattern="^(minute|hour)$", description="视频维度只有 hour 粒度"),
+    dimension: str = Query("channel", pattern="^(channel|video)$"),
+    start: int | None = Query(default=None, ge=0, le=MAX_EPOCH_MS, description="起始时间（毫秒时间戳）"),
+    end: int | None = Query(default=None, ge=0, le=MAX_EPOCH_MS, description="结束时间（毫秒时间戳），默认当前时间"),
+    service: MetricsService = Depends(get_metrics_service),
+):
+    """播放 QoE 预聚合：按分钟/小时返回样本数、平均帧率、起播耗时均值与 p50/p95、卡顿次数、内存"""
+    from fastapi import HTTPException
+
+    try:
+        result = service.playback_rollups(granularity, dimension, key, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(success_response(result.to_payload()))
+
+
+@router.get("/metrics/feed-cache")
+def feed_cache_stats():
+    """Feed 下一页预物化缓存的命中统计"""
+    return success_response(get_feed_page_cache().stats())
+
+
+@router.get("/metrics/ai-comment-queue")
+def ai_comment_queue_stats():
+    """AI 评论异步生成队列的积压与成功/失败统计"""
+    return success_response(get_ai_comment_queue().stats())
+
+
+@router.get("/metrics/follow-counts")
+def follow_count_stats():
+    """粉丝/关注计数校对的漂移统计（最近一次与累计修正数）"""
+    return success_response(get_follow_count_reconciler().stats())
+
+
+@router.get("/metrics/retention")
+def metrics_retention_stats():
+    """原始指标保留期清理统计（删除的分区/行数、最近一次执行结果）"""
+    return success_response(get_metrics_retention().stats())
+
+
+@router.get("/metrics/export")
+def metrics_export_stats():
+    """原始指标列式导出统计（格式、累计导出天数/行数、最近一次执行结果）"""
+    return success_response(get_metrics_exporter().stats())
+
 
+@router.get("/metrics/quality")
+def quality_engine_stats():
+    """清晰度决策统计：决策次数、码率缓存命中、各 (频道/设备档位) 的卡顿与起播 EWMA"""
+    return success_response(get_quality_engine().stats())
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Header, Path
+from fastapi import APIRouter, Depends, Header, Path, Query
 
+from core.config import settings
+from core.responses import ORJSONResponse
 from database.connection import get_db
 from schemas.api import success_response
+from services.follow_service import FollowService
 from services.user_service import UserService
+from services.video_service import VideoService
 from sqlalchemy.orm import Session
 
 
@@ -15,6 +19,14 @@ def get_user_service(db: Session = Depends(get_db)) -> UserService:
     return UserService(db)
 
 
+def get_follow_service(db: Session = Depends(get_db)) -> FollowService:
+    return FollowService(db)
+
+
+def get_video_service(db: Session = Depends(get_db)) -> VideoService:
+    return VideoService(db)
+
+
 def resolve_user(x_user_id: str | None = Header(default=None, alias="X-User-Id")) -> str:
     """解析当前用户ID"""
     return x_user_id or "demo-user"
@@ -72,8 +84,8 @@ def get_all_users(
     import logging
     logger = logging.getLogger(__name__)
     try:
-        users = service.get_all_users()
-        return success_response([user.dict(by_alias=True) for user in users])
+        # 服务层返回预编码片段（带 TTL 缓存），直接拼入响应信封，不再逐个模型序列化
+        return ORJSONResponse(success_response(service.get_all_users_payload()))
     except Exception as e:
         logger.error(f"获取所有用户失败: error={e}", exc_info=True)
         from fastapi import HTTPException
@@ -96,3 +108,49 @@ def get_user_follows(
         from fastapi import HTTPException
         raise HTTPException(status_code=500, detail=f"获取用户关注关系失败: {str(e)}")
 
+
+@router.get("/users/{user_id}/followers")
+def list_followers(
+    user_id: str = Path(...),
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    cursor: str | None = Query(default=None, max_length=200),
+    service: FollowService = Depends(get_follow_service),
+    current_user_id: str = Depends(resolve_user),
+):
+    """粉丝列表（游标分页），每个用户附带当前用户是否已关注"""
+    try:
+        data = service.list_followers(user_id, limit=limit, cursor=cursor, viewer_id=current_user_id)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(success_response(data.to_payload()))
+
+
+@router.get("/users/{user_id}/followings")
+def list_followings(
+    user_id: str = Path(...),
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    cursor: str | None = Query(default=None, max_length=200),
+    service: FollowService = Depends(get_follow_service),
+    current_user_id: str = Depends(resolve_user),
+):
+    """关注列表（游标分页），每个用户附带当前用户是否已关注"""
+    try:
+        data = service.list_followings(user_id, limit=limit, cursor=cursor, viewer_id=current_user_id)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(success_response(data.to_payload()))
+
+
+@router.get("/users/{user_id}/videos")
+def list_user_videos(
+    user_id: str = Path(...),
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    cursor: int | None = Query(default=None, ge=1),
+    service: VideoService = Depends(get_video_service),
+    current_user_id: str = Depends(resolve_user),
+):
+    """作者主页视频列表（游标分页，cursor 为上一页返回的 nextCursor）；视频数/获赞数见 /users/{user_id}"""
+    data = service.list_author_videos(user_id, limit=limit, cursor=cursor, user_id=current_user_id)
+    return ORJSONResponse(success_response(data.to_payload()))
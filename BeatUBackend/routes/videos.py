@@ -1,9 +1,11 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Header, Path, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, Path, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from core.config import settings
+from core.responses import ORJSONResponse
 from database.connection import get_db
 from schemas.api import (
     CommentAIRequest,
@@ -13,10 +15,13 @@ from schemas.api import (
     InteractionRequest,
     OperationResult,
     VideoItem,
-    VideoList,
 )
 from schemas.api import success_response
+from services.ai_comment_queue import AICommentJob, get_ai_comment_queue
 from services.comment_service import CommentService
+from services.feed_cache import FeedPageKey, get_feed_page_cache, materialize_next_page
+from services.feed_pipeline import FeedContext, build_default_feed_pipeline, build_feed_page
+from services.following_feed import FollowingFeedService
 from services.video_service import VideoService
 
 
@@ -31,6 +36,10 @@ def get_comment_service(db: Session = Depends(get_db)) -> CommentService:
     return CommentService(db)
 
 
+def get_following_feed_service(db: Session = Depends(get_db)) -> FollowingFeedService:
+    return FollowingFeedService(db)
+
+
 def resolve_user(x_user_id: str | None = Header(default=None)) -> str:
     return x_user_id or settings.default_user_id
 
@@ -40,7 +49,8 @@ def resolve_user_name(x_user_name: str | None = Header(default=None)) -> str:
 
 
 @router.get("/videos")
-def list_videos(
+async def list_videos(
+    background_tasks: BackgroundTasks,
     page: int = Query(1, ge=1),
     limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
     orientation: str | None = Query(default=None, pattern="^(portrait|landscape)$"),  # ✅ 修复：Pydantic V2 使用 pattern 替代 regex
@@ -51,24 +61,27 @@ def list_videos(
     import logging
     logger = logging.getLogger(__name__)
     try:
-        data = service.list_videos(
+        # ✅ 修改：由 Feed 流水线组装（视频 → 过滤已看 → 图文混编 → 预加载提示），
+        # 响应中附带下一页的封面/播放地址，客户端可提前预加载
+        ctx = FeedContext(
             page=page,
             limit=limit,
+            user_id=user_id,
             orientation=orientation.lower() if orientation else None,
             channel=channel,
-            user_id=user_id,
-        )
-        # 后端统一负责对推荐流做"图文+视频"混编
-        mixed_items = service.build_mixed_feed(page=data.page, items=data.items)
-        # 使用新的create方法生成包含pageSize等字段的响应
-        response_data = VideoList.create(
-            items=mixed_items,
-            total=data.total,
-            page=data.page,
-            limit=data.limit,
         )
-        logger.info(f"返回视频列表: total={data.total}, items数量={len(mixed_items)}, page={data.page}, limit={data.limit}")
-        return success_response(response_data.dict(by_alias=True))
+        key = FeedPageKey.of(ctx)
+        # ✅ 优化：优先使用上一页响应后在后台预物化好的本页，命中时不访问数据库
+        cached = get_feed_page_cache().take(key) if settings.feed_next_page_enabled else None
+        if cached is not None:
+            total, payload = cached
+        else:
+            response_data = await build_feed_page(build_default_feed_pipeline(service), ctx)
+            total, payload = ctx.total, response_data.to_payload()
+        if settings.feed_next_page_enabled:
+            background_tasks.add_task(materialize_next_page, key, total)
+        logger.info(f"返回视频列表: total={total}, page={page}, limit={limit}, cached={cached is not None}")
+        return ORJSONResponse(success_response(payload))
     except Exception as e:
         logger.error(f"获取视频列表失败: page={page}, limit={limit}, orientation={orientation}, user_id={user_id}, error={e}", exc_info=True)
         from fastapi import HTTPException
@@ -110,6 +123,18 @@ def get_all_watch_histories(
         raise HTTPException(status_code=500, detail=f"获取观看历史失败: {str(e)}")
 
 
+@router.get("/videos/following")
+def list_following_videos(
+    limit: int = Query(settings.default_page_size, ge=1, le=settings.max_page_size),
+    cursor: int | None = Query(default=None, ge=1),
+    service: FollowingFeedService = Depends(get_following_feed_service),
+    user_id: str = Depends(resolve_user),
+):
+    """关注流：已关注作者的视频，按发布顺序（videoId）倒序，cursor 为上一页返回的 nextCursor"""
+    data = service.list_following_videos(user_id, limit=limit, cursor=cursor)
+    return ORJSONResponse(success_response(data.to_payload()))
+
+
 @router.get("/videos/{video_id}")
 def get_video(
     video_id: int,  # ✅ 修改：从 str 改为 int (Long)
@@ -117,7 +142,7 @@ def get_video(
     user_id: str = Depends(resolve_user),
 ):
     item = service.get_video(video_id, user_id=user_id)
-    return success_response(item.dict(by_alias=True))
+    return ORJSONResponse(success_response(item.to_payload()))
 
 
 @router.post("/videos/{video_id}/like")
@@ -178,10 +203,34 @@ def share_video(
     - 客户端点击分享并成功调起系统分享后调用
     - 后端只做 share_count 统计，返回统一的成功响应
     """
-    result = service.share_video(video_id)
+    try:
+        service.share_video(video_id)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=404, detail=str(e))
     return success_response(None)
 
 
+@router.post("/videos/{video_id}/view")
+def record_view(
+    video_id: int,
+    service: VideoService = Depends(get_video_service),
+    user_id: str = Depends(resolve_user),
+):
+    """
+    记录一次播放。
+    - 客户端开始播放时调用，同一用户在去重窗口内重复调用只计一次
+    - 播放量在内存中聚合，由后台任务批量写入 beatu_video.viewCount
+    - 视频不存在时返回 404，不产生去重记录与计数增量
+    """
+    try:
+        counted = service.record_view(video_id, user_id)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=404, detail=str(e))
+    return success_response({"counted": counted})
+
+
 # 旧的 /follow 接口保留以兼容，新的用户接口在 users.py 中实现
 @router.post("/follow")
 def follow_author(
@@ -198,10 +247,16 @@ def list_comments(
     video_id: int = Path(...),  # ✅ 修改：从 str 改为 int (Long)
     page: int = Query(1, ge=1),
     limit: int = Query(settings.default_comment_page_size, ge=1, le=settings.max_comment_page_size),
+    cursor: str | None = Query(default=None, max_length=200),  # ✅ 新增：上一页响应中的 nextCursor
     service: CommentService = Depends(get_comment_service),
+    user_id: str = Depends(resolve_user),
 ):
-    data = service.list_comments(video_id=video_id, page=page, limit=limit)
-    return success_response(data.dict(by_alias=True))
+    try:
+        payload = service.list_comments_payload(video_id, page=page, limit=limit, cursor=cursor, user_id=user_id)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(success_response(payload))
 
 
 @router.post("/videos/{video_id}/comments")
@@ -212,21 +267,138 @@ def create_comment(
     user_id: str = Depends(resolve_user),
     user_name: str = Depends(resolve_user_name),
 ):
-    item = service.create_comment(video_id, payload, user_id=user_id, user_name=user_name)
+    try:
+        item = service.create_comment(video_id, payload, user_id=user_id, user_name=user_name)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(e))
     return success_response(item.dict(by_alias=True))
 
 
+@router.get("/comments/{comment_id}/replies")
+def list_comment_replies(
+    comment_id: str = Path(...),
+    limit: int = Query(settings.default_comment_page_size, ge=1, le=settings.max_comment_page_size),
+    cursor: str | None = Query(default=None, max_length=200),
+    service: CommentService = Depends(get_comment_service),
+    user_id: str = Depends(resolve_user),
+):
+    """展开楼层内的更多回复（按时间正序，游标分页）"""
+    try:
+        data = service.list_replies(comment_id, limit=limit, cursor=cursor, user_id=user_id)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(e))
+    return ORJSONResponse(success_response(data.to_payload()))
+
+
+@router.post("/comments/{comment_id}/like")
+def like_comment(
+    comment_id: str = Path(...),
+    service: CommentService = Depends(get_comment_service),
+    user_id: str = Depends(resolve_user),
+):
+    """点赞评论（幂等），客户端不需要传递body参数"""
+    try:
+        service.like_comment(comment_id, user_id=user_id, liked=True)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(e))
+    return success_response(None)
+
+
+@router.post("/comments/{comment_id}/unlike")
+def unlike_comment(
+    comment_id: str = Path(...),
+    service: CommentService = Depends(get_comment_service),
+    user_id: str = Depends(resolve_user),
+):
+    """取消点赞评论（幂等），客户端不需要传递body参数"""
+    try:
+        service.like_comment(comment_id, user_id=user_id, liked=False)
+    except ValueError as e:
+        from fastapi import HTTPException
+        raise HTTPException(status_code=400, detail=str(e))
+    return success_response(None)
+
+
+async def enqueue_ai_comment(service: CommentService, video_id: int, question: str, user_name: str, kind: str = "comment"):
+    """写入占位评论并提交 AI 评论队列，立即返回占位评论（isPending=True）；回答生成完成后通过 /comments/{id}/stream 推送。"""
+    from fastapi import HTTPException
+
+    queue = get_ai_comment_queue()
+    if queue.busy():
+        raise HTTPException(status_code=503, detail="AI 评论生成繁忙，请稍后再试")
+    try:
+        item = await run_in_threadpool(
+            service.create_ai_comment,
+            video_id,
+            CommentAIRequest(question=question),
+            user_name=user_name,
+            pending=True,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    queue.submit(AICommentJob(comment_id=item.id, video_id=video_id, question=question, kind=kind))
+    return item
+
+
 @router.post("/videos/{video_id}/comments/ai")
-def create_ai_comment(
+async def create_ai_comment(
     video_id: int,  # ✅ 修改：从 str 改为 int (Long)
     payload: CommentAIRequest,
     service: CommentService = Depends(get_comment_service),
     user_name: str = Depends(resolve_user_name),
 ):
-    item = service.create_ai_comment(video_id, payload, user_name=user_name)
+    # ✅ 优化：回答改为异步生成，接口只写入占位评论，不再等待模型返回
+    item = await enqueue_ai_comment(service, video_id, payload.question, user_name=user_name)
     return success_response(item.dict(by_alias=True))
 
 
+@router.get("/comments/{comment_id}/stream")
+async def stream_comment(comment_id: str = Path(...)):
+    """
+    评论内容推送（SSE）：AI 回答生成中时保持连接，生成完成后推送完整评论并结束。
+
+    评论已完成时立即推送；超过 AI_COMMENT_STREAM_TIMEOUT_SECONDS 仍未完成时推送当前（占位）状态，客户端可重连。
+    """
+    import time
+
+    from fastapi import HTTPException
+    from fastapi.responses import StreamingResponse
+
+    from database.connection import SessionLocal
+
+    def _load():
+        # 流式响应期间请求级会话已释放，这里使用独立会话
+        with SessionLocal() as db:
+            return CommentService(db).get_comment(comment_id)
+
+    try:
+        item = await run_in_threadpool(_load)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    async def generate():
+        current = item
+        deadline = time.monotonic() + settings.ai_comment_stream_timeout_seconds
+        queue = get_ai_comment_queue()
+        while current.is_pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # 同进程内的任务完成时立即唤醒；其他进程处理的任务按秒轮询
+            await queue.wait(comment_id, min(remaining, 1.0))
+            current = await run_in_threadpool(_load)
+        yield f"data: {current.model_dump_json(by_alias=True)}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/search/videos")
 def search_videos(
     query: str = Query(..., min_length=1, max_length=100),
@@ -248,7 +420,7 @@ def search_videos(
             user_id=user_id,
         )
         logger.info(f"搜索成功: query={query}, total={data.total}, items数量={len(data.items)}")
-        return success_response(data.dict(by_alias=True))
+        return ORJSONResponse(success_response(data.to_payload()))
     except Exception as e:
         logger.error(f"搜索视频失败: query={query}, error={str(e)}", exc_info=True)
         from fastapi import HTTPException
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Generic, List, Optional, TypeVar
+from functools import lru_cache
+from typing import Any, Generic, List, Optional, Tuple, TypeVar
 
-from pydantic import AnyHttpUrl, BaseModel, Field
+from pydantic import AnyHttpUrl, AnyUrl, BaseModel, Field
 
 
 def to_camel(string: str) -> str:
@@ -17,12 +18,45 @@ class APIModel(BaseModel):
         alias_generator = to_camel
         from_attributes = True  # �?修复：Pydantic V2 使用 from_attributes 替代 orm_mode
 
+    @classmethod
+    def trusted(cls, **values: Any):
+        """跳过校验直接构造，仅用于数据库行等可信数据（URL 等字段保持原始字符串）"""
+        return cls.model_construct(**values)
+
+    def to_payload(self) -> dict:
+        """
+        按别名输出 dict 的快速路径，结果与 .dict(by_alias=True) 一致（URL 输出为字符串），
+        但不经过 pydantic 序列化器，Feed 等大列表接口使用。
+        """
+        return {alias: _to_payload_value(getattr(self, name)) for name, alias in _payload_aliases(type(self))}
+
+
+@lru_cache(maxsize=None)
+def _payload_aliases(model: type) -> Tuple[Tuple[str, str], ...]:
+    return tuple((name, field.alias or name) for name, field in model.model_fields.items())
+
+
+_PAYLOAD_SCALARS = (str, int, float, bool, type(None))
+
+
+def _to_payload_value(value: Any) -> Any:
+    if type(value) in _PAYLOAD_SCALARS:
+        return value
+    if isinstance(value, APIModel):
+        return value.to_payload()
+    if isinstance(value, list):
+        return [_to_payload_value(item) for item in value] if value else []
+    if isinstance(value, AnyUrl):
+        return str(value)
+    return value
+
 
 class VideoQuality(APIModel):
     label: str
     bitrate: Optional[int] = None
     resolution: Optional[str] = None
     url: AnyHttpUrl
+    codec: Optional[str] = None  # ✅ 新增：h264 / h265 / av1，客户端按解码能力过滤
 
 
 class VideoItem(APIModel):
@@ -87,6 +121,31 @@ class VideoList(APIModel):
         )
 
 
+class PrefetchHint(APIModel):
+    """下一页预加载提示：客户端可提前拉取封面并预缓冲视频"""
+    id: int
+    cover_url: AnyHttpUrl
+    play_url: AnyHttpUrl
+
+
+class FeedPage(VideoList):
+    """Feed 分页响应：在 VideoList 基础上附带下一页的预加载提示"""
+    prefetch: List[PrefetchHint] = Field(default_factory=list)
+
+    @classmethod
+    def create(cls, items: List[VideoItem], total: int, page: int, limit: int, prefetch: List[PrefetchHint] | None = None):
+        feed_page = super().create(items=items, total=total, page=page, limit=limit)
+        feed_page.prefetch = prefetch or []
+        return feed_page
+
+
+class VideoCursorPage(APIModel):
+    """视频游标分页响应（关注流、作者主页），游标为上一页最后一条 videoId"""
+    items: List[VideoItem]
+    next_cursor: Optional[int] = Field(default=None, alias="nextCursor")
+    has_next: bool = Field(default=False, alias="hasNext")
+
+
 class InteractionRequest(APIModel):
     action: str = Field(pattern="^(LIKE|UNLIKE|SAVE|REMOVE|FOLLOW|UNFOLLOW)$")  # �?修复：Pydantic V2 使用 pattern 替代 regex
 
@@ -114,6 +173,12 @@ class CommentItem(APIModel):
     ai_source: Optional[str] = None
     ai_confidence: Optional[float] = None
     like_count: int = 0
+    is_liked: bool = False  # 当前用户是否点赞
+    parent_id: Optional[str] = None  # 被回复的评论 ID
+    root_id: Optional[str] = None  # 所属楼层 ID，顶层评论为空
+    reply_count: int = 0  # 楼层内回复总数（仅顶层评论）
+    replies: List[CommentItem] = Field(default_factory=list)  # 楼层内最早的若干条回复
+    is_pending: bool = False  # AI 回答生成中（内容为占位文案）
 
 
 class CommentList(APIModel):
@@ -121,14 +186,15 @@ class CommentList(APIModel):
     total: int
     page: int
     page_size: int = Field(alias="pageSize")
-    limit: int  # 保持兼容�?
+    limit: int  # 保持兼容性
     total_pages: int = Field(default=0, alias="totalPages")
     has_next: bool = Field(default=False, alias="hasNext")
     has_previous: bool = Field(default=False, alias="hasPrevious")
+    next_cursor: Optional[str] = Field(default=None, alias="nextCursor")  # 下一页游标，最后一页为 None
     
     @classmethod
-    def create(cls, items: List[CommentItem], total: int, page: int, limit: int):
-        """创建分页响应，自动计算totalPages、hasNext、hasPrevious"""
+    def create(cls, items: List[CommentItem], total: int, page: int, limit: int, next_cursor: Optional[str] = None):
+        """创建分页响应，自动计算totalPages、hasNext、hasPrevious（hasNext 以是否还有下一页游标为准）"""
         total_pages = (total + limit - 1) // limit if limit > 0 else 0
         return cls(
             items=items,
@@ -137,8 +203,9 @@ class CommentList(APIModel):
             pageSize=limit,
             limit=limit,
             totalPages=total_pages,
-            hasNext=page < total_pages,
-            hasPrevious=page > 1
+            hasNext=next_cursor is not None,
+            hasPrevious=page > 1,
+            nextCursor=next_cursor,
         )
 
 
@@ -167,11 +234,15 @@ class AIQualityRequest(APIModel):
     video_id: int  # �?修改：从 str 改为 int (Long)
     network_stats: dict
     device_stats: dict
+    channel: Optional[str] = None  # 当前播放所在频道，用于参考该频道近期的卡顿/起播数据
 
 
 class AIQualityResponse(APIModel):
     quality: str
     reason: str
+    bitrate: Optional[int] = None  # 所选档位码率（kbps），AUTO 时为空
+    resolution: Optional[str] = None
+    url: Optional[str] = None  # 所选档位的播放地址（视频登记了清晰度档位时）
 
 
 class AICommentQARequest(APIModel):
@@ -191,6 +262,7 @@ class MetricsPlayback(APIModel):
     rebuffer_count: Optional[int] = None
     memory_mb: Optional[float] = None
     channel: Optional[str] = None
+    device_class: Optional[str] = None  # 设备档位（normal / constrained，其他取值按 normal 统计），只参与内存中的清晰度决策统计
 
 
 class MetricsInteraction(APIModel):
@@ -200,6 +272,27 @@ class MetricsInteraction(APIModel):
     success: Optional[bool] = True
 
 
+class PlaybackRollupStats(APIModel):
+    """一个时间桶（或整个查询范围）的播放 QoE 聚合"""
+    bucket_start: Optional[int] = None  # 桶起始时间（毫秒时间戳，UTC）；范围汇总时为空
+    count: int = 0
+    fps_avg: Optional[float] = None
+    start_up_ms_avg: Optional[float] = None
+    start_up_ms_p50: Optional[float] = None  # 由固定分桶直方图估算
+    start_up_ms_p95: Optional[float] = None
+    rebuffer_avg: Optional[float] = None
+    memory_mb_avg: Optional[float] = None
+
+
+class PlaybackRollupSeries(APIModel):
+    """播放 QoE 预聚合查询结果"""
+    granularity: str
+    dimension: str
+    key: str
+    buckets: List[PlaybackRollupStats]
+    summary: PlaybackRollupStats  # 范围内所有桶合并后的统计
+
+
 class UserItem(APIModel):
     """用户信息模型"""
     id: str  # 用户ID (userId)
@@ -210,6 +303,19 @@ class UserItem(APIModel):
     likes_count: int = Field(default=0, alias="likesCount")
     following_count: int = Field(default=0, alias="followingCount")
     followers_count: int = Field(default=0, alias="followersCount")
+    video_count: int = Field(default=0, alias="videoCount")
+
+
+class FollowUserItem(UserItem):
+    """粉丝/关注列表中的用户，附带当前用户是否已关注该用户"""
+    is_followed: bool = Field(default=False, alias="isFollowed")
+
+
+class FollowList(APIModel):
+    """粉丝/关注列表（游标分页）"""
+    items: List[FollowUserItem]
+    next_cursor: Optional[str] = Field(default=None, alias="nextCursor")  # 下一页游标，最后一页为 None
+    has_next: bool = Field(default=False, alias="hasNext")
 
 
 T = TypeVar("T")
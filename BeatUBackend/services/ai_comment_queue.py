@@ -0,0 +1,259 @@
+"""AI 评论异步生成队列
+
+AI 评论（/videos/{id}/comments/ai、/ai/comment/qa）的回答生成耗时取决于模型，不应占用请求时间：
+
+1. 接口先写入一条 isPending=True 的占位评论，入队后立即返回评论 ID
+2. 固定数量的 worker 从队列取任务生成回答（并发上限 = worker 数），单次调用有超时，失败按指数退避重试
+3. 生成完成（或重试耗尽回填兜底文案）后更新评论行、清除 isPending，并唤醒 /comments/{id}/stream 上等待的客户端
+
+worker 由应用 lifespan 启动/停止；数据库访问通过 run_in_threadpool 在独立会话中执行。
+队列只存在于进程内存中，因此：
+
+- 关闭时先拒绝新任务、在 AI_COMMENT_DRAIN_SECONDS 内等待已排队的任务完成，再取消 worker
+- 后台周期性地把创建已超过 orphan_age_seconds、仍处于 isPending 的 AI 占位评论回填兜底文案
+  （进程崩溃或未排空时遗留），避免 /comments/{id}/stream 每次重连都等到超时；
+  多实例/滚动发布时其他存活实例仍在生成的任务不会超过该时长，不会被覆盖
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 重试退避基数（秒）：第 n 次重试前等待 RETRY_BACKOFF_SECONDS * 2^(n-1)
+RETRY_BACKOFF_SECONDS = 0.5
+# 重试耗尽后回填的内容
+AI_COMMENT_FALLBACK = "元宝暂时无法回答这个问题，请稍后再试～"
+
+
+@dataclass(frozen=True)
+class AICommentJob:
+    comment_id: str
+    video_id: int
+    question: str
+    kind: str = "comment"  # comment: 视频评论区提问；qa: /ai/comment/qa 问答
+
+
+AnswerGenerator = Callable[[AICommentJob], Awaitable[str]]
+
+
+def _session_factory():
+    # 延迟导入，测试可替换 database.connection.SessionLocal
+    from database.connection import SessionLocal
+
+    return SessionLocal
+
+
+async def generate_ai_answer(job: AICommentJob) -> str:
+    """默认的回答生成：按任务类型调用对应服务（当前为模板，接入 LLM 后只需替换这里）。"""
+    from schemas.api import AICommentQARequest
+    from services.ai_service import AIService
+    from services.comment_service import CommentService
+
+    def _generate() -> str:
+        with _session_factory()() as db:
+            if job.kind == "qa":
+                return AIService(db).comment_qa(AICommentQARequest(video_id=job.video_id, question=job.question))
+            return CommentService(db).compose_ai_answer(job.video_id, job.question)
+
+    return await run_in_threadpool(_generate)
+
+
+def _complete_comment(comment_id: str, content: str):
+    from services.comment_service import CommentService
+
+    with _session_factory()() as db:
+        return CommentService(db).complete_ai_comment(comment_id, content)
+
+
+def _expire_orphaned_comments(created_before_ms: int) -> int:
+    from services.comment_service import CommentService
+
+    with _session_factory()() as db:
+        return CommentService(db).expire_pending_ai_comments(created_before_ms, AI_COMMENT_FALLBACK)
+
+
+class AICommentQueue:
+    """有界并发的 AI 评论生成队列（单事件循环内使用）。"""
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        timeout_seconds: float,
+        max_retries: int,
+        generator: Optional[AnswerGenerator] = None,
+        drain_seconds: float = 10.0,
+        stream_timeout_seconds: float = 30.0,
+    ) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.generator = generator or generate_ai_answer
+        self.drain_seconds = drain_seconds
+        self.stream_timeout_seconds = stream_timeout_seconds
+        self._queue: Optional[asyncio.Queue[AICommentJob]] = None
+        self._tasks: List[asyncio.Task] = []
+        # 等待中的评论 -> 完成事件；完成后移除，之后的查询直接读库
+        self._done: Dict[str, asyncio.Event] = {}
+        self._closing = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.recovered = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def start(self) -> None:
+        """在当前事件循环上启动 worker（已启动时忽略）。"""
+        if self.running:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_seconds: float | None = None) -> None:
+        """
+        停止接收新任务，在 drain_seconds 内等待已排队/进行中的任务完成后取消 worker。
+        超时未完成的任务保持占位状态，超过 orphan_age_seconds 后由 recover_orphans() 回填兜底文案。
+        """
+        self._closing = True
+        timeout = self.drain_seconds if drain_seconds is None else drain_seconds
+        if self._queue is not None and self.running and timeout > 0:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"AI 评论队列未在 {timeout}s 内排空，剩余 {len(self._done)} 条任务将由遗留回收回填兜底文案")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def orphan_age_seconds(self) -> float:
+        """
+        占位评论创建后超过该时长仍未完成即视为遗留：覆盖一次任务的全部重试与退避、
+        流式接口的等待时间以及关闭时的排空窗口，存活实例上的任务不会达到这个时长。
+        """
+        backoff = sum(RETRY_BACKOFF_SECONDS * 2 ** attempt for attempt in range(self.max_retries))
+        generation = (self.max_retries + 1) * self.timeout_seconds + backoff
+        return generation + self.stream_timeout_seconds + self.drain_seconds
+
+    async def recover_orphans(self, now_ms: int | None = None) -> int:
+        """回填创建已超过 orphan_age_seconds 仍未完成的 AI 占位评论，返回回填条数。"""
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        cutoff = now_ms - int(self.orphan_age_seconds * 1000)
+        recovered = await run_in_threadpool(_expire_orphaned_comments, cutoff)
+        self.recovered += recovered
+        return recovered
+
+    def busy(self) -> bool:
+        """排队任务已达上限，或队列正在关闭"""
+        return self._closing or (self._queue is not None and self._queue.qsize() >= self.max_pending)
+
+    def submit(self, job: AICommentJob) -> None:
+        self.start()
+        self._done.setdefault(job.comment_id, asyncio.Event())
+        self._queue.put_nowait(job)
+        self.submitted += 1
+
+    async def wait(self, comment_id: str, timeout: float) -> bool:
+        """等待评论的回答生成完成；不在本队列中（已完成或由其他进程处理）时等待 timeout 后返回 False。"""
+        event = self._done.get(comment_id)
+        if event is None:
+            await asyncio.sleep(timeout)
+            return False
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.error(f"AI 评论回填失败: comment={job.comment_id}, error={e}", exc_info=True)
+            finally:
+                event = self._done.pop(job.comment_id, None)
+                if event is not None:
+                    event.set()
+                self._queue.task_done()
+
+    async def _process(self, job: AICommentJob) -> None:
+        content = await self._generate(job)
+        await run_in_threadpool(_complete_comment, job.comment_id, content)
+        self.completed += 1
+
+    async def _generate(self, job: AICommentJob) -> str:
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+            try:
+                return await asyncio.wait_for(self.generator(job), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                logger.warning(f"AI 回答生成超时: comment={job.comment_id}, attempt={attempt + 1}")
+            except Exception as e:
+                logger.warning(f"AI 回答生成失败: comment={job.comment_id}, attempt={attempt + 1}, error={e}")
+        self.failed += 1
+        return AI_COMMENT_FALLBACK
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "pending": len(self._done),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "recovered": self.recovered,
+        }
+
+
+# 全局 AI 评论队列（单例模式）
+_ai_comment_queue: Optional[AICommentQueue] = None
+
+
+def get_ai_comment_queue() -> AICommentQueue:
+    global _ai_comment_queue
+    if _ai_comment_queue is None:
+        _ai_comment_queue = AICommentQueue(
+            workers=settings.ai_comment_workers,
+            max_pending=settings.ai_comment_max_pending,
+            timeout_seconds=settings.ai_comment_timeout_seconds,
+            max_retries=settings.ai_comment_max_retries,
+            drain_seconds=settings.ai_comment_drain_seconds,
+            stream_timeout_seconds=settings.ai_comment_stream_timeout_seconds,
+        )
+    return _ai_comment_queue
+
+
+async def run_ai_comment_recovery(interval_seconds: float | None = None) -> None:
+    """后台周期性回填遗留的 AI 占位评论，由应用 lifespan 启动、关闭时取消。"""
+    queue = get_ai_comment_queue()
+    interval = interval_seconds or queue.orphan_age_seconds
+    while True:
+        try:
+            recovered = await queue.recover_orphans()
+            if recovered:
+                logger.info(f"已回填 {recovered} 条遗留的 AI 占位评论")
+        except Exception as e:
+            logger.warning(f"AI 占位评论回收失败（下个周期重试）: {e}")
+        await asyncio.sleep(interval)
@@ -5,73 +5,126 @@ from typing import List
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from database.models import Video
+from database.models import Video, WatchHistory
 from schemas.api import (
     AICommentQARequest,
     AIQualityRequest,
     AIQualityResponse,
     AIRecommendRequest,
     AIRecommendResponse,
-    VideoItem,
 )
-from services.helpers import parse_quality_list, parse_tag_list
+from services.item_cf_service import get_item_cf_table
+from services.quality_engine import get_quality_engine
+from services.ranking_service import get_popularity_ranking
+from services.video_media import rendition_ladder
+from services.video_renderer import VideoRenderer
+from services.video_service import VideoService
+
+RECOMMEND_LIMIT = 5
+# 每路召回多取的候选数：剔除其中已看过的视频后仍能凑满 RECOMMEND_LIMIT
+RECOMMEND_CANDIDATES = 3 * RECOMMEND_LIMIT
+# 个性化召回：参与打分的最近观看视频数、按名次的衰减系数、无时长信息时视为“看完”的停留时长
+HISTORY_SEEDS = 10
+HISTORY_DECAY = 0.8
+DWELL_FULL_MS = 15000
 
 
 class AIService:
     def __init__(self, db: Session) -> None:
         self.db = db
 
-    def recommend(self, payload: AIRecommendRequest) -> AIRecommendResponse:
-        query = (
-            select(Video)
-            .where(Video.videoId != payload.video_id)  # ✅ 修改：字段名从 id 改为 videoId
-            .order_by(Video.viewCount.desc())  # ✅ 修改：字段名从 view_count 改为 viewCount
-            .limit(5)
-        )
-        records = self.db.execute(query).scalars().all()
+    def recommend(self, payload: AIRecommendRequest, user_id: str | None = None) -> AIRecommendResponse:
+        # ✅ 优化：先用离线训练的视频近邻表做个性化召回，不足部分由热度榜 O(K) 补齐；
+        # 两路各多取少量候选，再用一条 IN 查询剔除其中已看过的视频，查询量与观看历史长度无关。
+        # 热度榜只由后台任务构建（lifespan 启动时即刷新一次）；尚未就绪时榜单为空，
+        # 最终退化为按主键取前几条视频，请求路径上不做全表扫描
+        seeds = self._recent_watched_video_ids(user_id)
+        ranking = get_popularity_ranking()
+        personalized_ids = self._personalized_candidates(payload, seeds, {payload.video_id} | set(seeds))
+        popular_ids = ranking.top(RECOMMEND_CANDIDATES, exclude={payload.video_id, *seeds, *personalized_ids})
+        watched = VideoService(self.db).get_watched_video_ids(user_id, personalized_ids + popular_ids)
+
+        candidate_ids = [video_id for video_id in personalized_ids if video_id not in watched][:RECOMMEND_LIMIT]
+        personalized = bool(candidate_ids)
+        candidate_ids += [video_id for video_id in popular_ids if video_id not in watched][: RECOMMEND_LIMIT - len(candidate_ids)]
+        if not candidate_ids:
+            # 候选都已看过时，退化为只剔除当前视频
+            candidate_ids = ranking.top(RECOMMEND_LIMIT, exclude={payload.video_id})
+
+        records = []
+        if candidate_ids:
+            video_map = {
+                video.videoId: video
+                for video in self.db.execute(select(Video).where(Video.videoId.in_(candidate_ids))).scalars()
+            }
+            records = [video_map[video_id] for video_id in candidate_ids if video_id in video_map]
         if not records:
-            records = self.db.execute(select(Video).limit(5)).scalars().all()
-        # ✅ 修改：获取作者信息
-        from database.models import User
-        videos = []
-        for video in records:
-            author = self.db.get(User, video.authorId)
-            author_name = author.userName if author else video.authorId
-            
-            videos.append(
-                VideoItem(
-                    id=video.videoId,  # ✅ 修改：字段名从 id 改为 videoId
-                    play_url=video.playUrl,  # ✅ 修改：字段名从 play_url 改为 playUrl
-                    cover_url=video.coverUrl,  # ✅ 修改：字段名从 cover_url 改为 coverUrl
-                    title=video.title,
-                    tags=[],  # ✅ 修改：新表结构中没有 tags 字段
-                    duration_ms=video.durationMs,  # ✅ 修改：字段名从 duration_ms 改为 durationMs
-                    orientation=video.orientation.value.lower(),
-                    author_id=video.authorId,  # ✅ 修改：字段名从 author_id 改为 authorId
-                    author_name=author_name,  # ✅ 修改：通过 authorId 查询 User 获取 userName
-                    author_avatar=video.authorAvatar,  # ✅ 修改：字段名从 author_avatar 改为 authorAvatar
-                    like_count=video.likeCount,  # ✅ 修改：字段名从 like_count 改为 likeCount
-                    comment_count=video.commentCount,  # ✅ 修改：字段名从 comment_count 改为 commentCount
-                    favorite_count=video.favoriteCount,  # ✅ 修改：字段名从 favorite_count 改为 favoriteCount
-                    share_count=0,  # ✅ 修改：新表结构中没有 share_count 字段
-                    view_count=video.viewCount,  # ✅ 修改：字段名从 view_count 改为 viewCount
-                    qualities=[],  # ✅ 修改：新表结构中没有 qualities 字段
-                )
-            )
-        reason = "结合播放完成度与兴趣标签，为你准备的下一支好视频"
+            records = self.db.execute(select(Video).limit(RECOMMEND_LIMIT)).scalars().all()
+        # ✅ 优化：复用 Feed 的批量渲染，作者/互动/关注各一条 IN 查询，避免逐条 db.get(User)
+        videos = VideoRenderer(self.db).render(records, user_id=user_id)
+        if personalized:
+            reason = "结合播放完成度与观看历史，为你准备的下一支好视频"
+        else:
+            reason = "大家都在看的热门视频，为你准备的下一支好视频"
         return AIRecommendResponse(next_videos=videos, reason=reason)
 
-    def quality(self, payload: AIQualityRequest) -> AIQualityResponse:
-        bandwidth = payload.network_stats.get("bandwidthKbps", 3000)
-        quality = "AUTO"
-        if bandwidth > 8000:
-            quality = "4K"
-        elif bandwidth > 5000:
-            quality = "1080P"
-        elif bandwidth > 2500:
-            quality = "720P"
-        reason = f"网络 {bandwidth}kbps，选择 {quality} 以平衡清晰度与流畅度"
-        return AIQualityResponse(quality=quality, reason=reason)
+    def _recent_watched_video_ids(self, user_id: str | None) -> List[int]:
+        """最近观看的 HISTORY_SEEDS 个视频（召回种子），按观看时间倒序"""
+        if not user_id:
+            return []
+        return list(
+            self.db.execute(
+                select(WatchHistory.videoId)
+                .where(WatchHistory.userId == user_id)
+                .order_by(WatchHistory.watchedAt.desc())
+                .limit(HISTORY_SEEDS)
+            ).scalars()
+        )
+
+    def _personalized_candidates(
+        self,
+        payload: AIRecommendRequest,
+        seeds: List[int],
+        exclude: set[int],
+    ) -> List[int]:
+        """
+        以当前视频与最近观看的视频为种子，在近邻表上加权召回 RECOMMEND_CANDIDATES 个候选：
+        - 当前视频权重 0.5~1.5，随播放完成度（consumed_duration_ms / 时长）升高，快速划走的视频影响更小
+        - 最近观看的视频权重 0.5 起按名次指数衰减
+        """
+        table = get_item_cf_table()
+        if table is None:
+            return []
+
+        duration = table.duration_ms(payload.video_id)
+        if duration:
+            completion = min(1.0, payload.consumed_duration_ms / duration)
+        else:
+            completion = min(1.0, payload.dwell_ms / DWELL_FULL_MS)
+        weights = {payload.video_id: 0.5 + completion}
+        for rank, video_id in enumerate(seeds):
+            weights.setdefault(video_id, 0.5 * HISTORY_DECAY ** rank)
+        return table.score(weights, exclude=exclude, limit=RECOMMEND_CANDIDATES)
+
+    def quality(self, payload: AIQualityRequest, user_id: str | None = None) -> AIQualityResponse:
+        # ✅ 优化：由清晰度决策引擎综合带宽 EWMA、频道/设备近期卡顿与起播、设备状态和可用档位决定
+        # 候选档位取自该视频的 beatu_video_rendition（按设备上报的 codecs 过滤，按视频缓存）
+        renditions = rendition_ladder(self.db, payload.video_id, payload.device_stats.get("codecs"))
+        decision = get_quality_engine().decide(
+            user_id or "anonymous",
+            payload.network_stats,
+            payload.device_stats,
+            renditions,
+            channel=payload.channel,
+        )
+        rendition = decision.rendition
+        return AIQualityResponse(
+            quality=decision.label,
+            reason=decision.reason,
+            bitrate=rendition.bitrate_kbps if rendition else None,
+            resolution=rendition.resolution if rendition else None,
+            url=rendition.url if rendition else None,
+        )
 
     def comment_qa(self, payload: AICommentQARequest) -> str:
         return f"关于《{payload.video_id}》：{payload.question}。建议继续关注剧情发展，更多彩蛋等你发现！"
@@ -1,43 +1,297 @@
 from __future__ import annotations
 
-from sqlalchemy import func, select
-from sqlalchemy.orm import Session
+import base64
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
 
-from database.models import Comment, Video, User
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+
+from core.config import settings
+from core.responses import TTLCache
+from database.models import Comment, CommentInteraction, Video, User
 from datetime import datetime
-from schemas.api import CommentAIRequest, CommentCreate, CommentItem, CommentList
+from schemas.api import CommentAIRequest, CommentCreate, CommentItem, CommentList, OperationResult
+from services.counter_buffer import CounterBuffer, get_counter
+
+# 异步生成 AI 回答期间占位评论的内容
+AI_COMMENT_PLACEHOLDER = "元宝正在思考…"
+# AI 评论的作者 ID
+AI_AUTHOR_ID = "ai_beatu"
+
+# 热门视频评论首页缓存（key 为 videoId，只缓存默认每页条数的第一页，不含用户相关状态）；新增评论时主动失效
+hot_comments_cache = TTLCache(
+    ttl_seconds=settings.hot_comments_cache_ttl_seconds,
+    max_entries=settings.hot_comments_cache_max_videos,
+)
+
+
+def get_comment_like_counter() -> CounterBuffer:
+    """评论点赞数的聚合写入缓冲区（热门评论的点赞不在同一行上排队）"""
+    return get_counter("comment_likes", Comment.__table__.c.commentId, Comment.__table__.c.likeCount)
+
+
+def encode_cursor(created_at: int, comment_id: str) -> str:
+    """评论游标：(createdAt, commentId) 编码为 URL 安全的不透明字符串"""
+    raw = f"{created_at}:{comment_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, comment_id = raw.split(":", 1)
+        return int(created_at), comment_id
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("无效的评论游标")
 
 
 class CommentService:
     def __init__(self, db: Session) -> None:
         self.db = db
 
-    def list_comments(self, video_id: int, page: int, limit: int) -> CommentList:  # ✅ 修改：video_id 从 str 改为 int
-        total = self.db.scalar(
-            select(func.count(Comment.commentId)).where(Comment.videoId == video_id)  # ✅ 修改：字段名从 id/video_id 改为 commentId/videoId
-        ) or 0
+    def list_comments(
+        self,
+        video_id: int,  # ✅ 修改：video_id 从 str 改为 int
+        page: int = 1,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> CommentList:
+        """评论列表（含当前用户的点赞状态，整页一次批量查询）"""
+        comments = self._load_comment_page(video_id, page=page, limit=limit, cursor=cursor)
+        self._apply_viewer_state(comments.items + [reply for item in comments.items for reply in item.replies], user_id)
+        return comments
+
+    def _load_comment_page(
+        self,
+        video_id: int,
+        page: int,
+        limit: int,
+        cursor: Optional[str],
+    ) -> CommentList:
+        """
+        顶层评论按 (createdAt, commentId) 倒序的游标分页，每条附带楼层内最早的若干条回复。
+
+        - 传 cursor 时从游标位置继续（WHERE (createdAt, commentId) < 游标，走索引，无 OFFSET 扫描）
+        - 不传 cursor 时返回第一页；page > 1 仅为兼容按页码翻页的旧客户端，退化为 OFFSET
+        - total 直接取 Video.commentCount（含回复），不再每页 COUNT
+        - 查询次数固定：计数 + 顶层评论 + 批量回复 + 批量作者
+        - 不含用户相关状态（点赞），可在用户之间共享缓存；由调用方再批量叠加
+        """
+        # ✅ 优化：总数使用视频表上维护的评论计数（主键查询）
+        total = int(self.db.scalar(select(Video.commentCount).where(Video.videoId == video_id)) or 0)
 
         query = (
             select(Comment)
-            .where(Comment.videoId == video_id)  # ✅ 修改：字段名从 video_id 改为 videoId
-            .order_by(Comment.createdAt.desc())  # ✅ 修改：字段名从 created_at 改为 createdAt
-            .offset((page - 1) * limit)
-            .limit(limit)
+            .where(Comment.videoId == video_id, Comment.rootId.is_(None))  # ✅ 修改：只取顶层评论，回复挂在楼层下
+            .order_by(Comment.createdAt.desc(), Comment.commentId.desc())
+            .limit(limit + 1)  # 多取一条判断是否还有下一页
         )
-        items = self.db.execute(query).scalars().all()
-        
-        # ✅ 优化：批量获取所有评论作者信息，避免 N+1 查询
-        author_ids = {comment.authorId for comment in items}
-        author_map = {}
-        if author_ids:
-            authors = self.db.query(User).filter(User.userId.in_(author_ids)).all()
-            author_map = {author.userId: author for author in authors}
-        
+        if cursor:
+            created_at, comment_id = decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    Comment.createdAt < created_at,
+                    and_(Comment.createdAt == created_at, Comment.commentId < comment_id),
+                )
+            )
+        elif page > 1:
+            query = query.offset((page - 1) * limit)
+        rows = self.db.execute(query).scalars().all()
+        roots = rows[:limit]
+        next_cursor = encode_cursor(roots[-1].createdAt, roots[-1].commentId) if len(rows) > limit else None
+
+        replies_by_root = self._load_reply_previews(
+            [root.commentId for root in roots if root.replyCount],
+            settings.comment_reply_preview_size,
+        )
+        # ✅ 优化：批量获取顶层评论与回复的作者信息，避免 N+1 查询
+        author_map = self._load_authors(
+            roots + [reply for replies in replies_by_root.values() for reply in replies]
+        )
+
+        items = []
+        for root in roots:
+            item = self._to_schema(root, author_map)
+            item.replies = [self._to_schema(reply, author_map) for reply in replies_by_root.get(root.commentId, [])]
+            items.append(item)
         return CommentList.create(
-            items=[self._to_schema(comment, author_map) for comment in items],
+            items=items,
             total=total,
             page=page,
             limit=limit,
+            next_cursor=next_cursor,
+        )
+
+    def list_replies(
+        self,
+        root_id: str,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> CommentList:
+        """楼层内回复按 (createdAt, commentId) 正序的游标分页（“展开更多回复”）"""
+        root = self.db.get(Comment, root_id)
+        if not root or root.rootId is not None:
+            raise ValueError("评论不存在")
+
+        query = (
+            select(Comment)
+            .where(Comment.rootId == root_id)
+            .order_by(Comment.createdAt, Comment.commentId)
+            .limit(limit + 1)
+        )
+        if cursor:
+            created_at, comment_id = decode_cursor(cursor)
+            query = query.where(
+                or_(
+                    Comment.createdAt > created_at,
+                    and_(Comment.createdAt == created_at, Comment.commentId > comment_id),
+                )
+            )
+        rows = self.db.execute(query).scalars().all()
+        replies = rows[:limit]
+        next_cursor = encode_cursor(replies[-1].createdAt, replies[-1].commentId) if len(rows) > limit else None
+        author_map = self._load_authors(replies)
+        items = [self._to_schema(reply, author_map) for reply in replies]
+        self._apply_viewer_state(items, user_id)
+        return CommentList.create(
+            items=items,
+            total=int(root.replyCount),
+            page=1,
+            limit=limit,
+            next_cursor=next_cursor,
+        )
+
+    def _load_reply_previews(self, root_ids: List[str], per_root: int) -> Dict[str, List[Comment]]:
+        """一条窗口查询取出每个楼层最早的 per_root 条回复"""
+        if not root_ids or per_root <= 0:
+            return {}
+        ranked = (
+            select(
+                Comment,
+                func.row_number()
+                .over(partition_by=Comment.rootId, order_by=(Comment.createdAt, Comment.commentId))
+                .label("reply_rank"),
+            )
+            .where(Comment.rootId.in_(root_ids))
+            .subquery()
+        )
+        reply = aliased(Comment, ranked)
+        rows = self.db.execute(
+            select(reply)
+            .where(ranked.c.reply_rank <= per_root)
+            .order_by(ranked.c.rootId, ranked.c.createdAt, ranked.c.commentId)
+        ).scalars().all()
+        replies_by_root: Dict[str, List[Comment]] = defaultdict(list)
+        for row in rows:
+            replies_by_root[row.rootId].append(row)
+        return replies_by_root
+
+    def _load_authors(self, comments: Sequence[Comment]) -> dict:
+        author_ids = {comment.authorId for comment in comments}
+        if not author_ids:
+            return {}
+        authors = self.db.query(User).filter(User.userId.in_(author_ids)).all()
+        return {author.userId: author for author in authors}
+
+    def list_comments_payload(
+        self,
+        video_id: int,
+        page: int = 1,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> dict:
+        """
+        评论列表响应数据。热门视频（评论数达到阈值）的第一页命中缓存，
+        只需再查一次当前用户的点赞状态与本页评论的最新点赞数。
+        """
+        cacheable = (
+            cursor is None
+            and page == 1
+            and limit == settings.default_comment_page_size
+            and settings.hot_comments_cache_ttl_seconds > 0
+        )
+        comments = hot_comments_cache.get(video_id) if cacheable else None
+        cached = comments is not None
+        if comments is None:
+            comments = self._load_comment_page(video_id, page=page, limit=limit, cursor=cursor)
+            if cacheable and comments.total >= settings.hot_comments_min_count:
+                hot_comments_cache.set(video_id, comments)
+        # 缓存中的模型保持不变，用户相关状态与点赞数只写入本次输出的 dict
+        payload = comments.to_payload()
+        items = payload["items"] + [reply for item in payload["items"] for reply in item["replies"]]
+        comment_ids = [item["id"] for item in items]
+        liked = self._liked_comment_ids(user_id, comment_ids)
+        # 缓存页中的点赞数是缓存时的快照：计数落库后 pending 归零，需与库中最新值一起读取，否则展示值会回退
+        like_counts = self._like_counts(comment_ids) if cached else {}
+        counter = get_comment_like_counter()
+        for item in items:
+            item["isLiked"] = item["id"] in liked
+            item["likeCount"] = like_counts.get(item["id"], item["likeCount"]) + counter.pending(item["id"])
+        return payload
+
+    def like_comment(self, comment_id: str, user_id: str, liked: bool) -> OperationResult:
+        """
+        幂等点赞/取消点赞：互动行按 (commentId, userId) upsert，状态未变化直接返回；
+        点赞数增量交给计数缓冲区聚合后批量落库。
+        """
+        for attempt in range(2):
+            try:
+                if self.db.scalar(select(Comment.commentId).where(Comment.commentId == comment_id)) is None:
+                    raise ValueError("评论不存在")
+                interaction = self.db.get(CommentInteraction, (comment_id, user_id))
+                current = bool(interaction and interaction.isLiked)
+                if current == liked:
+                    return OperationResult(success=True, message="OK")
+                # 写入目标状态：已有行（可能是 isLiked=False 的待同步行）只改状态，不删除
+                if interaction is None:
+                    self.db.add(CommentInteraction(commentId=comment_id, userId=user_id, isLiked=liked, isPending=False))
+                else:
+                    interaction.isLiked = liked
+                    interaction.isPending = False
+                self.db.commit()
+                get_comment_like_counter().add(comment_id, 1 if liked else -1)
+                return OperationResult(success=True, message="OK")
+            except IntegrityError as exc:
+                # 并发点赞导致主键冲突：回滚后按最新状态重试一次
+                self.db.rollback()
+                if attempt == 1:
+                    raise ValueError(f"互动状态冲突: {getattr(exc, 'orig', exc)}")
+
+    def _apply_viewer_state(self, items: List[CommentItem], user_id: Optional[str]) -> None:
+        """写入当前用户的点赞状态，并叠加尚未落库的点赞增量"""
+        liked = self._liked_comment_ids(user_id, [item.id for item in items])
+        counter = get_comment_like_counter()
+        for item in items:
+            item.is_liked = item.id in liked
+            item.like_count += counter.pending(item.id)
+
+    def _like_counts(self, comment_ids: Sequence[str]) -> Dict[str, int]:
+        """一条 IN 查询读取评论当前的点赞数"""
+        if not comment_ids:
+            return {}
+        return dict(
+            self.db.execute(
+                select(Comment.commentId, Comment.likeCount).where(Comment.commentId.in_(comment_ids))
+            ).all()
+        )
+
+    def _liked_comment_ids(self, user_id: Optional[str], comment_ids: Sequence[str]) -> set[str]:
+        """一条 IN 查询取出当前用户点过赞的评论"""
+        if not user_id or not comment_ids:
+            return set()
+        return set(
+            self.db.execute(
+                select(CommentInteraction.commentId).where(
+                    CommentInteraction.userId == user_id,
+                    CommentInteraction.commentId.in_(comment_ids),
+                    CommentInteraction.isLiked.is_(True),
+                )
+            ).scalars()
         )
 
     def create_comment(self, video_id: int, payload: CommentCreate, user_id: str, user_name: str) -> CommentItem:  # ✅ 修改：video_id 从 str 改为 int
@@ -49,6 +303,21 @@ class CommentService:
         import uuid
         comment_id = f"comment_{int(datetime.utcnow().timestamp() * 1000)}_{uuid.uuid4().hex[:8]}"
         
+        # ✅ 新增：回复评论时记录被回复的评论与所属楼层，楼层回复数原子自增
+        parent_id = root_id = None
+        if payload.reply_to:
+            parent = self.db.get(Comment, payload.reply_to)
+            if not parent or parent.videoId != video_id:
+                raise ValueError("被回复的评论不存在")
+            parent_id = parent.commentId
+            root_id = parent.rootId or parent.commentId
+            self.db.execute(
+                update(Comment)
+                .where(Comment.commentId == root_id)
+                .values(replyCount=Comment.replyCount + 1)
+                .execution_options(synchronize_session=False)
+            )
+
         # ✅ 修改：获取用户信息
         user = self.db.get(User, user_id)
         author_avatar = user.avatarUrl if user else None
@@ -63,12 +332,17 @@ class CommentService:
             isLiked=False,  # ✅ 新增：是否点赞
             isPending=False,  # ✅ 新增：本地待同步状态
             authorAvatar=author_avatar,  # ✅ 修改：字段名从 author_avatar 改为 authorAvatar
+            parentId=parent_id,
+            rootId=root_id,
+            replyCount=0,
         )
         self.db.add(entity)
         video.commentCount += 1  # ✅ 修改：字段名从 comment_count 改为 commentCount
+        # 提交前组装返回值：提交后 ORM 对象过期，再读作者/评论字段会各自触发一次回查
+        item = self._to_schema(entity, {user.userId: user} if user else {})
         self.db.commit()
-        self.db.refresh(entity)
-        return self._to_schema(entity)
+        hot_comments_cache.invalidate(video_id)
+        return item
 
     def create_ai_comment(
         self,
@@ -76,36 +350,101 @@ class CommentService:
         payload: CommentAIRequest,
         user_name: str,
         override_content: str | None = None,
+        pending: bool = False,
     ) -> CommentItem:
+        """
+        创建 AI 回复评论。
+
+        pending=True 时只写入占位评论（isPending=True）并立即返回，回答由 AI 评论队列异步生成后
+        通过 complete_ai_comment 回填。
+        """
         video = self.db.get(Video, video_id)
         if not video:
             raise ValueError("视频不存在")
-        content = override_content or self._compose_ai_answer(payload.question, video.title)
+        if pending:
+            content = AI_COMMENT_PLACEHOLDER
+        else:
+            content = override_content or self._compose_ai_answer(payload.question, video.title)
         
         # ✅ 修改：生成评论ID
         import uuid
         comment_id = f"comment_ai_{int(datetime.utcnow().timestamp() * 1000)}_{uuid.uuid4().hex[:8]}"
         
         # ✅ 修改：获取AI用户信息
-        ai_user = self.db.get(User, "ai_beatu")
+        ai_user = self.db.get(User, AI_AUTHOR_ID)
         author_avatar = ai_user.avatarUrl if ai_user else None
 
         entity = Comment(
             commentId=comment_id,  # ✅ 修改：字段名从 id 改为 commentId
             videoId=video_id,  # ✅ 修改：字段名从 video_id 改为 videoId
-            authorId="ai_beatu",  # ✅ 修改：字段名从 author_id 改为 authorId
+            authorId=AI_AUTHOR_ID,  # ✅ 修改：字段名从 author_id 改为 authorId
             content=content,
             createdAt=int(datetime.utcnow().timestamp() * 1000),  # ✅ 修改：字段名从 created_at 改为 createdAt
             likeCount=0,  # ✅ 修改：字段名从 like_count 改为 likeCount
             isLiked=False,  # ✅ 新增：是否点赞
-            isPending=False,  # ✅ 新增：本地待同步状态
+            isPending=pending,  # AI 回答生成中
             authorAvatar=author_avatar,  # ✅ 修改：字段名从 author_avatar 改为 authorAvatar
+            replyCount=0,
         )
         self.db.add(entity)
         video.commentCount += 1  # ✅ 修改：字段名从 comment_count 改为 commentCount
+        # 提交前组装返回值：提交后 ORM 对象过期，再读作者/评论字段会各自触发一次回查
+        item = self._to_schema(entity, {ai_user.userId: ai_user} if ai_user else {})
         self.db.commit()
-        self.db.refresh(entity)
-        return self._to_schema(entity)
+        hot_comments_cache.invalidate(video_id)
+        return item
+
+    def compose_ai_answer(self, video_id: int, question: str) -> str:
+        """生成 AI 评论回答（当前为模板，由 AI 评论队列的 worker 调用）。"""
+        video = self.db.get(Video, video_id)
+        if not video:
+            raise ValueError("视频不存在")
+        return self._compose_ai_answer(question, video.title)
+
+    def complete_ai_comment(self, comment_id: str, content: str) -> Optional[CommentItem]:
+        """回填异步生成的 AI 回答并清除 isPending；评论已被删除时返回 None。"""
+        comment = self.db.get(Comment, comment_id)
+        if comment is None:
+            return None
+        comment.content = content
+        comment.isPending = False
+        author = self.db.get(User, comment.authorId)
+        item = self._to_schema(comment, {author.userId: author} if author else {})
+        self.db.commit()
+        hot_comments_cache.invalidate(item.video_id)
+        return item
+
+    def expire_pending_ai_comments(self, created_before_ms: int, content: str) -> int:
+        """
+        把 created_before_ms 之前创建、仍处于生成中的 AI 占位评论回填为 content，返回回填条数。
+        用于进程重启后恢复：队列只存在于内存中，重启前未完成的任务不会再被处理。
+        """
+        rows = self.db.execute(
+            select(Comment.commentId, Comment.videoId).where(
+                Comment.authorId == AI_AUTHOR_ID,
+                Comment.isPending.is_(True),
+                Comment.createdAt < created_before_ms,
+            )
+        ).all()
+        if not rows:
+            return 0
+        self.db.execute(
+            update(Comment)
+            .where(Comment.commentId.in_([comment_id for comment_id, _ in rows]))
+            .values(content=content, isPending=False)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        for video_id in {video_id for _, video_id in rows}:
+            hot_comments_cache.invalidate(video_id)
+        return len(rows)
+
+    def get_comment(self, comment_id: str) -> CommentItem:
+        comment = self.db.get(Comment, comment_id)
+        if comment is None:
+            raise ValueError("评论不存在")
+        author = self.db.get(User, comment.authorId)
+        return self._to_schema(comment, {author.userId: author} if author else {})
 
     def _to_schema(self, comment: Comment, author_map: dict = None) -> CommentItem:
         # ✅ 优化：从批量查询的 author_map 中获取用户信息，避免 N+1 查询
@@ -129,11 +468,15 @@ class CommentService:
             author_avatar=comment.authorAvatar,  # ✅ 修改：字段名从 author_avatar 改为 authorAvatar
             content=comment.content,
             created_at=created_at_iso,  # ✅ 修改：将 Unix 时间戳转换为 ISO 8601 格式
-            is_ai_reply=(comment.authorId == "ai_beatu"),  # ✅ 修改：通过 authorId 判断是否为 AI 回复
+            is_ai_reply=(comment.authorId == AI_AUTHOR_ID),  # ✅ 修改：通过 authorId 判断是否为 AI 回复
             ai_model=None,  # ✅ 修改：新表结构中没有 ai_model 字段
             ai_source=None,  # ✅ 修改：新表结构中没有 ai_source 字段
             ai_confidence=None,  # ✅ 修改：新表结构中没有 ai_confidence 字段
             like_count=comment.likeCount,  # ✅ 修改：字段名从 like_count 改为 likeCount
+            parent_id=comment.parentId,
+            root_id=comment.rootId,
+            reply_count=comment.replyCount or 0,
+            is_pending=bool(comment.isPending),
         )
 
     def _compose_ai_answer(self, question: str, title: str) -> str:
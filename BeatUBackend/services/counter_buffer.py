@@ -0,0 +1,134 @@
+"""计数聚合写入
+
+热点行（热门评论的点赞数等）如果每次互动都 UPDATE 同一行，会在行锁上排队。
+这里把计数增量先在进程内按 key 聚合，后台周期性地一次 executemany 落库：
+
+    UPDATE <table> SET <counter> = <counter> + :delta WHERE <key> = :key
+
+同一行在一个刷新周期内无论被点了多少次，只产生一次 UPDATE。
+读取侧可用 pending() 把尚未落库的增量叠加到展示值上，保证“自己点的赞立刻可见”；
+正在落库（已取出、尚未提交）的增量同样计入 pending()，提交成功后才移除，展示值不会短暂回退。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Hashable
+
+from sqlalchemy import bindparam
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.schema import Column
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """按 key 聚合某一计数列的增量。"""
+
+    def __init__(self, key_column: Column, counter_column: Column) -> None:
+        self.table = key_column.table
+        self.key_column = key_column
+        self.counter_column = counter_column
+        self._deltas: Dict[Hashable, int] = defaultdict(int)
+        # 已从缓冲区取出、正在落库的增量（提交成功后移除）
+        self._in_flight: Dict[Hashable, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, key: Hashable, delta: int = 1) -> None:
+        with self._lock:
+            self._deltas[key] += delta
+
+    def pending(self, key: Hashable) -> int:
+        """尚未提交到数据库的增量（含正在落库的部分）"""
+        with self._lock:
+            return self._deltas.get(key, 0) + self._in_flight.get(key, 0)
+
+    def flush(self, db: Session) -> int:
+        """把累积的增量写入数据库，返回更新的行数（key 数）。失败时增量放回缓冲区等待下次重试。"""
+        with self._lock:
+            deltas = {key: delta for key, delta in self._deltas.items() if delta}
+            self._deltas = defaultdict(int)
+            for key, delta in deltas.items():
+                self._in_flight[key] += delta
+        if not deltas:
+            return 0
+        statement = (
+            self.table.update()
+            .where(self.key_column == bindparam("b_key"))
+            .values({self.counter_column.name: self.counter_column + bindparam("b_delta")})
+        )
+        try:
+            db.execute(statement, [{"b_key": key, "b_delta": delta} for key, delta in deltas.items()])
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._settle(deltas)
+                for key, delta in deltas.items():
+                    self._deltas[key] += delta
+            raise
+        with self._lock:
+            self._settle(deltas)
+        return len(deltas)
+
+    def _settle(self, deltas: Dict[Hashable, int]) -> None:
+        """从 in-flight 中移除本次落库的增量（调用方持有锁）"""
+        for key, delta in deltas.items():
+            remaining = self._in_flight[key] - delta
+            if remaining:
+                self._in_flight[key] = remaining
+            else:
+                del self._in_flight[key]
+
+
+# 已注册的计数缓冲区：名称 -> CounterBuffer（单例模式）
+_counters: Dict[str, CounterBuffer] = {}
+_counters_lock = threading.Lock()
+
+
+def get_counter(name: str, key_column: Column, counter_column: Column) -> CounterBuffer:
+    """按名称获取计数缓冲区，首次调用时注册。"""
+    with _counters_lock:
+        counter = _counters.get(name)
+        if counter is None:
+            counter = _counters[name] = CounterBuffer(key_column, counter_column)
+        return counter
+
+
+def flush_counters(db: Session) -> int:
+    """刷新全部已注册的计数缓冲区，返回更新的行数。单个缓冲区失败不影响其他缓冲区。"""
+    updated = 0
+    for name, counter in list(_counters.items()):
+        try:
+            updated += counter.flush(db)
+        except Exception as e:
+            logger.warning(f"计数落库失败（下个周期重试）: counter={name}, error={e}")
+    return updated
+
+
+async def run_counter_flusher(interval_seconds: float | None = None) -> None:
+    """后台循环刷新计数缓冲区，由应用 lifespan 启动；关闭时取消前会再刷新一次。"""
+    from fastapi.concurrency import run_in_threadpool
+
+    from database.connection import SessionLocal
+
+    interval = interval_seconds or settings.counter_flush_seconds
+
+    def _flush_once() -> int:
+        with SessionLocal() as db:
+            return flush_counters(db)
+
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(_flush_once)
+            except Exception as e:
+                logger.warning(f"计数落库失败（下个周期重试）: {e}")
+    finally:
+        await run_in_threadpool(_flush_once)
@@ -0,0 +1,175 @@
+"""Feed 下一页预物化缓存
+
+用户在推荐流中是连续下滑的：返回第 N 页后，很快就会请求第 N+1 页。
+因此响应第 N 页后在后台（BackgroundTasks，响应发出之后执行）用同样的参数把第 N+1 页
+完整组装并预编码，按用户存入短 TTL 的内存缓存；后续请求命中时直接返回，不再查库。
+
+- 缓存项一次性使用（命中即移除），用户点赞/收藏/关注等写操作后整体失效，避免展示过期的互动状态
+- 只为每个用户保留少量页面，用户数超过上限时按 LRU 淘汰
+- hits / misses / materialized / hit_ratio 通过 /metrics/feed-cache 暴露
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from core.config import settings
+from core.responses import PreEncoded, pre_encode
+from services.feed_pipeline import FeedContext, build_default_feed_pipeline, build_feed_page
+
+logger = logging.getLogger(__name__)
+
+
+class FeedPageKey(NamedTuple):
+    user_id: str
+    orientation: Optional[str]
+    channel: Optional[str]
+    page: int
+    limit: int
+
+    @classmethod
+    def of(cls, ctx: FeedContext) -> "FeedPageKey":
+        return cls(ctx.user_id, ctx.orientation, ctx.channel, ctx.page, ctx.limit)
+
+    def next(self) -> "FeedPageKey":
+        return self._replace(page=self.page + 1)
+
+
+class CachedFeedPage(NamedTuple):
+    total: int
+    payload: PreEncoded
+
+
+class FeedPageCache:
+    """按用户分组的预物化页面缓存（线程安全）。"""
+
+    def __init__(self, ttl_seconds: float, max_users: int = 10000, pages_per_user: int = 2) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        self.pages_per_user = pages_per_user
+        self._users: "OrderedDict[str, Dict[FeedPageKey, tuple[float, CachedFeedPage]]]" = OrderedDict()
+        self._in_flight: set[FeedPageKey] = set()
+        # 物化过程中用户发生了写操作：结果已过期，完成后丢弃
+        self._cancelled: set[FeedPageKey] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.materialized = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def take(self, key: FeedPageKey) -> Optional[CachedFeedPage]:
+        """取出并移除缓存页；不存在或已过期时返回 None。"""
+        with self._lock:
+            pages = self._users.get(key.user_id)
+            entry = pages.pop(key, None) if pages else None
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: FeedPageKey, page: CachedFeedPage) -> None:
+        with self._lock:
+            if key in self._cancelled:
+                return
+            pages = self._users.setdefault(key.user_id, {})
+            self._users.move_to_end(key.user_id)
+            pages[key] = (time.monotonic() + self.ttl_seconds, page)
+            while len(pages) > self.pages_per_user:
+                pages.pop(next(iter(pages)))
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            self.materialized += 1
+
+    def claim(self, key: FeedPageKey) -> bool:
+        """登记一次物化任务；同一页已在物化中时返回 False，避免重复组装。"""
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+            return True
+
+    def release(self, key: FeedPageKey) -> None:
+        with self._lock:
+            self._in_flight.discard(key)
+            self._cancelled.discard(key)
+
+    def invalidate_user(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._cancelled.update(key for key in self._in_flight if key.user_id == user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            cached_pages = sum(len(pages) for pages in self._users.values())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "materialized": self.materialized,
+            "hitRatio": round(self.hit_ratio, 4),
+            "cachedUsers": len(self._users),
+            "cachedPages": cached_pages,
+        }
+
+
+async def materialize_feed_page(service, key: FeedPageKey) -> CachedFeedPage:
+    """用默认流水线组装一页并预编码。"""
+    ctx = FeedContext(
+        page=key.page,
+        limit=key.limit,
+        user_id=key.user_id,
+        orientation=key.orientation,
+        channel=key.channel,
+    )
+    feed_page = await build_feed_page(build_default_feed_pipeline(service), ctx)
+    return CachedFeedPage(total=ctx.total, payload=pre_encode(feed_page.to_payload()))
+
+
+async def materialize_next_page(key: FeedPageKey, total: int, session_factory=None) -> None:
+    """
+    后台任务：预物化 key 的下一页。
+
+    请求的数据库会话在响应结束时已关闭，这里使用独立会话；失败只记日志，不影响后续请求。
+    """
+    next_key = key.next()
+    cache = get_feed_page_cache()
+    if key.page * key.limit >= total or not cache.claim(next_key):
+        return
+    from database.connection import SessionLocal
+    from services.video_service import VideoService
+
+    try:
+        with (session_factory or SessionLocal)() as db:
+            cache.put(next_key, await materialize_feed_page(VideoService(db), next_key))
+    except Exception as e:
+        logger.warning(f"预物化 Feed 下一页失败: key={next_key}, error={e}")
+    finally:
+        cache.release(next_key)
+
+
+# 全局页面缓存（单例模式）
+_feed_page_cache: Optional[FeedPageCache] = None
+
+
+def get_feed_page_cache() -> FeedPageCache:
+    global _feed_page_cache
+    if _feed_page_cache is None:
+        _feed_page_cache = FeedPageCache(
+            ttl_seconds=settings.feed_next_page_ttl_seconds,
+            max_users=settings.feed_next_page_max_users,
+        )
+    return _feed_page_cache
+
+
+def invalidate_feed_pages(user_id: str) -> None:
+    """用户产生写操作后调用，丢弃其预物化页面。"""
+    if _feed_page_cache is not None:
+        _feed_page_cache.invalidate_user(user_id)
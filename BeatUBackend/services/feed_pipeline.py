@@ -0,0 +1,174 @@
+"""Feed 组装流水线
+
+推荐流按阶段组装：数据源 → 过滤已看 → 排序 → 图文混编 → 标注（预加载提示）。
+排序放在混编之前，图文卡片保持在混编规则指定的位置。
+每个阶段都是异步生成器：接收上游的 VideoItem 流与本次请求的 FeedContext，产出新的流；
+阶段之间可以自由增删、重排，路由只负责构造上下文并执行流水线。
+
+同步的数据库访问统一通过 run_in_threadpool 放到线程池执行，不阻塞事件循环。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Hashable, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from core.config import settings
+from schemas.api import FeedPage, PrefetchHint, VideoItem
+from services.image_post_service import IMAGE_POST_ID_BASE
+from services.ranking_service import get_popularity_ranking
+
+FeedStream = AsyncIterator[VideoItem]
+
+
+@dataclass
+class FeedContext:
+    """一次 Feed 请求的参数，以及各阶段回填的结果（总数、预加载提示）。"""
+
+    page: int
+    limit: int
+    user_id: str
+    orientation: Optional[str] = None
+    channel: Optional[str] = None
+    total: int = 0
+    prefetch: List[PrefetchHint] = field(default_factory=list)
+
+
+FeedSource = Callable[[FeedContext], FeedStream]
+FeedStage = Callable[[FeedStream, FeedContext], FeedStream]
+
+
+class FeedPipeline:
+    """由一个数据源和若干阶段串联而成的 Feed 流水线。"""
+
+    def __init__(self, source: FeedSource, stages: Optional[List[FeedStage]] = None) -> None:
+        self.source = source
+        self.stages: List[FeedStage] = list(stages or [])
+
+    def then(self, stage: FeedStage) -> "FeedPipeline":
+        """追加一个阶段，返回新的流水线（原流水线不变）。"""
+        return FeedPipeline(self.source, [*self.stages, stage])
+
+    async def run(self, ctx: FeedContext) -> List[VideoItem]:
+        stream = self.source(ctx)
+        for stage in self.stages:
+            stream = stage(stream, ctx)
+        return [item async for item in stream]
+
+
+async def _collect(stream: FeedStream) -> List[VideoItem]:
+    return [item async for item in stream]
+
+
+def video_source(service) -> FeedSource:
+    """数据源：按页读取视频（含用户互动状态），并回填总数。"""
+
+    async def source(ctx: FeedContext) -> FeedStream:
+        data = await run_in_threadpool(
+            service.list_videos,
+            page=ctx.page,
+            limit=ctx.limit,
+            orientation=ctx.orientation,
+            channel=ctx.channel,
+            user_id=ctx.user_id,
+        )
+        ctx.total = data.total
+        for item in data.items:
+            yield item
+
+    return source
+
+
+def filter_watched(service) -> FeedStage:
+    """过滤用户已看过的视频（整页一次 IN 查询）。"""
+
+    async def stage(stream: FeedStream, ctx: FeedContext) -> FeedStream:
+        items = await _collect(stream)
+        video_ids = [item.id for item in items if item.id < IMAGE_POST_ID_BASE]
+        watched = await run_in_threadpool(service.get_watched_video_ids, ctx.user_id, video_ids)
+        for item in items:
+            if item.id not in watched:
+                yield item
+
+    return stage
+
+
+def mix_image_posts(service) -> FeedStage:
+    """按页插入图文+BGM 卡片。"""
+
+    async def stage(stream: FeedStream, ctx: FeedContext) -> FeedStream:
+        items = await _collect(stream)
+        for item in service.build_mixed_feed(page=ctx.page, items=items):
+            yield item
+
+    return stage
+
+
+def rank_by(key: Callable[[VideoItem], Hashable], reverse: bool = False) -> FeedStage:
+    """按 key 稳定排序（key 相同的条目保持上游顺序）。"""
+
+    async def stage(stream: FeedStream, ctx: FeedContext) -> FeedStream:
+        for item in sorted(await _collect(stream), key=key, reverse=reverse):
+            yield item
+
+    return stage
+
+
+def rank_by_popularity() -> FeedStage:
+    """按热度榜分数降序稳定排序；榜单外的视频（或榜单尚未刷新时全部视频）保持上游顺序。"""
+
+    async def stage(stream: FeedStream, ctx: FeedContext) -> FeedStream:
+        items = await _collect(stream)
+        ranking = get_popularity_ranking()
+        scores = ranking.scores(item.id for item in items) if ranking.ready else {}
+        for item in sorted(items, key=lambda item: -scores.get(item.id, 0.0)):
+            yield item
+
+    return stage
+
+
+def annotate_prefetch(service, exclude_watched: bool = False) -> FeedStage:
+    """
+    透传条目，并在上下文中写入下一页视频的封面/播放地址，供客户端预加载。
+
+    exclude_watched=True（与 filter_watched 同时使用）时剔除用户已看过的视频，提示与下一页实际返回的条目一致。
+    """
+
+    async def stage(stream: FeedStream, ctx: FeedContext) -> FeedStream:
+        async for item in stream:
+            yield item
+        if ctx.page * ctx.limit < ctx.total:
+            hints = await run_in_threadpool(
+                service.get_prefetch_hints,
+                page=ctx.page + 1,
+                limit=ctx.limit,
+                orientation=ctx.orientation,
+            )
+            if exclude_watched and hints:
+                watched = await run_in_threadpool(
+                    service.get_watched_video_ids, ctx.user_id, [hint.id for hint in hints]
+                )
+                hints = [hint for hint in hints if hint.id not in watched]
+            ctx.prefetch = hints
+
+    return stage
+
+
+async def build_feed_page(pipeline: FeedPipeline, ctx: FeedContext) -> FeedPage:
+    """执行流水线并封装为分页响应。"""
+    items = await pipeline.run(ctx)
+    return FeedPage.create(items=items, total=ctx.total, page=ctx.page, limit=ctx.limit, prefetch=ctx.prefetch)
+
+
+def build_default_feed_pipeline(service) -> FeedPipeline:
+    """推荐流默认流水线：视频 → （可选）过滤已看 → 按热度排序 → 图文混编 → 预加载提示。"""
+    pipeline = FeedPipeline(video_source(service))
+    if settings.feed_filter_watched:
+        pipeline = pipeline.then(filter_watched(service))
+    return (
+        pipeline.then(rank_by_popularity())
+        .then(mix_image_posts(service))
+        .then(annotate_prefetch(service, exclude_watched=settings.feed_filter_watched))
+    )
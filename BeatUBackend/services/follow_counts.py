@@ -0,0 +1,191 @@
+"""粉丝数 / 关注数维护
+
+写路径：关注/取关时用原子的 `SET followerCount = followerCount + 1` 更新计数，
+不再读出 User 对象、在 Python 中加减后写回（并发关注同一作者时会丢失更新）。
+
+校对任务：后台按 userId 分块，对 beatu_user_follow 做一次分组聚合重新计算每个用户的
+粉丝数/关注数，与 User 表中的冗余计数比对并修正漂移，漂移统计通过 /metrics/follow-counts 暴露。
+修正时带上读取到的旧值做条件更新（compare-and-set），与写路径并发时不会覆盖新的增量，
+被跳过的行留到下一轮校对。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, literal, select, union_all, update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import User, UserFollow
+
+logger = logging.getLogger(__name__)
+
+
+def adjust_follow_counts(db: Session, user_id: str, author_id: str, delta: int) -> None:
+    """关注（delta=1）/取关（delta=-1）时原子地调整双方计数，不提交事务；计数不会减到负数。"""
+    for key, column in ((user_id, User.followingCount), (author_id, User.followerCount)):
+        statement = update(User).where(User.userId == key).values({column.key: column + delta})
+        if delta < 0:
+            statement = statement.where(column >= -delta)
+        db.execute(statement)
+
+
+def count_follows(db: Session, user_ids: List[str]) -> Dict[str, Tuple[int, int]]:
+    """
+    一次分组聚合计算一批用户的 (粉丝数, 关注数)，没有任何关注关系的用户不出现在结果中。
+
+    粉丝按 authorId、关注按 userId 统计，分别命中 (authorId, isFollowed) / (userId, isFollowed) 索引，
+    UNION ALL 后再按用户分组求和。
+    """
+    if not user_ids:
+        return {}
+    followers = select(
+        UserFollow.authorId.label("uid"),
+        literal(1).label("follower"),
+        literal(0).label("following"),
+    ).where(UserFollow.authorId.in_(user_ids), UserFollow.isFollowed.is_(True))
+    followings = select(
+        UserFollow.userId.label("uid"),
+        literal(0).label("follower"),
+        literal(1).label("following"),
+    ).where(UserFollow.userId.in_(user_ids), UserFollow.isFollowed.is_(True))
+    edges = union_all(followers, followings).subquery()
+    rows = db.execute(
+        select(edges.c.uid, func.sum(edges.c.follower), func.sum(edges.c.following)).group_by(edges.c.uid)
+    )
+    return {uid: (int(follower), int(following)) for uid, follower, following in rows}
+
+
+class FollowCountReconciler:
+    """粉丝/关注计数校对，记录最近一次及累计的漂移统计。"""
+
+    def __init__(self, chunk_size: int = 1000) -> None:
+        self.chunk_size = chunk_size
+        self.runs = 0
+        self.last_run: Optional[dict] = None
+        self.total_fixed = 0
+        self._lock = threading.Lock()
+
+    def run(self, db: Session) -> dict:
+        started = time.monotonic()
+        scanned = drifted = fixed = follower_drift = following_drift = max_drift = 0
+        last_user_id: Optional[str] = None
+        while True:
+            query = select(User.userId, User.followerCount, User.followingCount).order_by(User.userId).limit(self.chunk_size)
+            if last_user_id is not None:
+                query = query.where(User.userId > last_user_id)
+            users = db.execute(query).all()
+            if not users:
+                break
+            last_user_id = users[-1].userId
+            scanned += len(users)
+
+            actual = count_follows(db, [user.userId for user in users])
+            corrections = []
+            for user in users:
+                followers, followings = actual.get(user.userId, (0, 0))
+                if (user.followerCount, user.followingCount) == (followers, followings):
+                    continue
+                drifted += 1
+                follower_delta = abs(followers - (user.followerCount or 0))
+                following_delta = abs(followings - (user.followingCount or 0))
+                follower_drift += follower_delta
+                following_drift += following_delta
+                max_drift = max(max_drift, follower_delta, following_delta)
+                corrections.append(
+                    {
+                        "b_user_id": user.userId,
+                        "b_old_followers": user.followerCount,
+                        "b_old_followings": user.followingCount,
+                        "b_followers": followers,
+                        "b_followings": followings,
+                    }
+                )
+            if corrections:
+                fixed += self._apply(db, corrections)
+
+        report = {
+            "scannedUsers": scanned,
+            "driftedUsers": drifted,
+            "fixedUsers": fixed,
+            "followerDrift": follower_drift,
+            "followingDrift": following_drift,
+            "maxDrift": max_drift,
+            "durationMs": int((time.monotonic() - started) * 1000),
+            "finishedAt": int(time.time() * 1000),
+        }
+        if fixed:
+            from services.user_service import all_users_cache
+
+            all_users_cache.invalidate()
+        with self._lock:
+            self.runs += 1
+            self.total_fixed += fixed
+            self.last_run = report
+        if drifted:
+            logger.info(f"粉丝/关注计数校对: {report}")
+        return report
+
+    def _apply(self, db: Session, corrections: List[dict]) -> int:
+        """条件更新：只有计数仍等于读取时的值才改写，返回实际修正的行数。"""
+        table = User.__table__
+        statement = (
+            table.update()
+            .where(
+                and_(
+                    table.c.userId == bindparam("b_user_id"),
+                    # NULL 计数（旧数据）同样需要修正
+                    func.coalesce(table.c.followerCount, -1) == func.coalesce(bindparam("b_old_followers"), -1),
+                    func.coalesce(table.c.followingCount, -1) == func.coalesce(bindparam("b_old_followings"), -1),
+                )
+            )
+            .values(followerCount=bindparam("b_followers"), followingCount=bindparam("b_followings"))
+        )
+        try:
+            result = db.execute(statement, corrections)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(corrections)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"runs": self.runs, "totalFixed": self.total_fixed, "lastRun": self.last_run}
+
+
+# 全局校对任务（单例模式）
+_follow_count_reconciler: Optional[FollowCountReconciler] = None
+
+
+def get_follow_count_reconciler() -> FollowCountReconciler:
+    global _follow_count_reconciler
+    if _follow_count_reconciler is None:
+        _follow_count_reconciler = FollowCountReconciler(chunk_size=settings.follow_reconcile_chunk_size)
+    return _follow_count_reconciler
+
+
+async def run_follow_count_reconciler(interval_seconds: float | None = None) -> None:
+    """后台周期性校对粉丝/关注计数，由应用 lifespan 启动、关闭时取消。"""
+    from fastapi.concurrency import run_in_threadpool
+
+    from database.connection import SessionLocal
+
+    interval = interval_seconds or settings.follow_reconcile_seconds
+    reconciler = get_follow_count_reconciler()
+
+    def _reconcile_once() -> dict:
+        with SessionLocal() as db:
+            return reconciler.run(db)
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_reconcile_once)
+        except Exception as e:
+            logger.warning(f"粉丝/关注计数校对失败（下个周期重试）: {e}")
@@ -0,0 +1,153 @@
+"""关注关系服务
+
+关注/取关只有一条写路径（set_follow），旧的 /follow 与 /users/{id}/follow|unfollow 都委托到这里：
+
+- 先用条件 UPDATE 切换已有关系（WHERE isFollowed != 目标状态），命中即表示状态发生变化
+- 没有命中且是关注操作时直接 INSERT；唯一键冲突说明关系已存在（已关注或并发请求刚插入），视为未变化
+- 状态变化时在同一事务中原子调整双方计数，提交后失效相关缓存
+
+读路径提供批量“是否关注了这些作者”查询（Feed 渲染使用）和按 (authorId|userId, isFollowed) 索引
+游标分页的粉丝/关注列表。
+"""
+
+from __future__ import annotations
+
+import base64
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.models import User, UserFollow
+from schemas.api import FollowList, FollowUserItem
+from services.feed_cache import invalidate_feed_pages
+from services.follow_counts import adjust_follow_counts
+
+
+def encode_follow_cursor(user_id: str) -> str:
+    return base64.urlsafe_b64encode(user_id.encode()).decode().rstrip("=")
+
+
+def decode_follow_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode()
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("无效的分页游标") from e
+
+
+class FollowService:
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def set_follow(self, user_id: str, author_id: str, followed: bool) -> bool:
+        """关注（followed=True）/取关，幂等；返回关注关系是否发生了变化。"""
+        changed = self._toggle(user_id, author_id, followed)
+        if changed:
+            adjust_follow_counts(self.db, user_id, author_id, 1 if followed else -1)
+        self.db.commit()
+        if changed:
+            from services.user_service import all_users_cache
+
+            all_users_cache.invalidate()
+            invalidate_feed_pages(user_id)
+        return changed
+
+    def _toggle(self, user_id: str, author_id: str, followed: bool) -> bool:
+        result = self.db.execute(
+            update(UserFollow)
+            .where(
+                UserFollow.userId == user_id,
+                UserFollow.authorId == author_id,
+                UserFollow.isFollowed != followed,
+            )
+            .values(isFollowed=followed, isPending=False)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            return True
+        if not followed:
+            return False
+        try:
+            with self.db.begin_nested():
+                self.db.execute(
+                    insert(UserFollow).values(userId=user_id, authorId=author_id, isFollowed=True, isPending=False)
+                )
+        except IntegrityError:
+            return False
+        return True
+
+    def followed_author_ids(self, user_id: str) -> List[str]:
+        """user_id 关注的全部作者（命中 (userId, isFollowed) 索引，只读一列）。"""
+        return list(
+            self.db.execute(
+                select(UserFollow.authorId).where(UserFollow.userId == user_id, UserFollow.isFollowed.is_(True))
+            ).scalars()
+        )
+
+    def following_ids(self, user_id: str | None, author_ids: Iterable[str]) -> Set[str]:
+        """user_id 关注了 author_ids 中的哪些作者（一次 IN 查询）。"""
+        author_ids = set(author_ids)
+        if not user_id or not author_ids:
+            return set()
+        return set(
+            self.db.execute(
+                select(UserFollow.authorId).where(
+                    UserFollow.userId == user_id,
+                    UserFollow.isFollowed.is_(True),
+                    UserFollow.authorId.in_(author_ids),
+                )
+            ).scalars()
+        )
+
+    def list_followers(
+        self, author_id: str, limit: int = 20, cursor: str | None = None, viewer_id: str | None = None
+    ) -> FollowList:
+        """粉丝列表：WHERE authorId = ? AND isFollowed ORDER BY userId，命中 (authorId, isFollowed) 索引。"""
+        return self._list_page(UserFollow.authorId, UserFollow.userId, author_id, limit, cursor, viewer_id)
+
+    def list_followings(
+        self, user_id: str, limit: int = 20, cursor: str | None = None, viewer_id: str | None = None
+    ) -> FollowList:
+        """关注列表：WHERE userId = ? AND isFollowed ORDER BY authorId，命中 (userId, isFollowed) 索引。"""
+        return self._list_page(UserFollow.userId, UserFollow.authorId, user_id, limit, cursor, viewer_id)
+
+    def _list_page(self, owner_column, peer_column, owner_id: str, limit: int, cursor: str | None, viewer_id: str | None) -> FollowList:
+        # 游标为上一页最后一个用户 ID；按主键另一列排序（InnoDB 二级索引尾部自带主键列，无需额外排序）
+        query = (
+            select(peer_column)
+            .where(owner_column == owner_id, UserFollow.isFollowed.is_(True))
+            .order_by(peer_column)
+            .limit(limit + 1)
+        )
+        if cursor:
+            query = query.where(peer_column > decode_follow_cursor(cursor))
+        peer_ids: List[str] = list(self.db.execute(query).scalars())
+        has_next = len(peer_ids) > limit
+        peer_ids = peer_ids[:limit]
+
+        users = {user.userId: user for user in self.db.query(User).filter(User.userId.in_(peer_ids)).all()} if peer_ids else {}
+        followed = self.following_ids(viewer_id, peer_ids)
+        items = [self._to_item(peer_id, users.get(peer_id), peer_id in followed) for peer_id in peer_ids]
+        return FollowList(
+            items=items,
+            next_cursor=encode_follow_cursor(peer_ids[-1]) if has_next else None,
+            has_next=has_next,
+        )
+
+    @staticmethod
+    def _to_item(user_id: str, user: Optional[User], is_followed: bool) -> FollowUserItem:
+        if user is None:
+            return FollowUserItem(id=user_id, username=user_id, name=user_id, is_followed=is_followed)
+        return FollowUserItem(
+            id=user.userId,
+            username=user.userName,
+            name=user.userName,
+            avatar_url=user.avatarUrl,
+            bio=user.bio,
+            likes_count=int(user.receivedLikeCount or 0),
+            following_count=int(user.followingCount or 0),
+            followers_count=int(user.followerCount or 0),
+            video_count=int(user.videoCount or 0),
+            is_followed=is_followed,
+        )
@@ -0,0 +1,118 @@
+"""关注流：已关注作者的视频（读时扇出）
+
+不维护每个用户的收件箱，而是在读取时合并各关注作者的最新视频：
+
+1. 取出用户关注的作者（命中 (userId, isFollowed) 索引）
+2. 每位作者最新的若干条 videoId 放在进程内缓存中（key 为 authorId，短 TTL），
+   未命中的作者用一条窗口查询（ROW_NUMBER() OVER (PARTITION BY authorId ORDER BY videoId DESC)）批量补齐
+3. 各作者列表都按 videoId 降序，用 heapq.merge 做 k 路归并，只取出一页所需的条数
+4. 游标为上一页最后一条 videoId；某位作者的缓存窗口被翻完、而作者还有更早的视频时，
+   只为这些作者再做一次“videoId < 游标”的窗口查询
+
+关注数百位作者时，每页仍只有固定几条查询，且每位作者最多参与 limit+1 条。
+"""
+
+from __future__ import annotations
+
+import heapq
+from bisect import bisect_right
+from itertools import islice
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.responses import TTLCache
+from database.models import Video
+from schemas.api import VideoCursorPage
+from services.follow_service import FollowService
+from services.video_renderer import VideoRenderer
+
+# 作者最新视频 ID 缓存：authorId -> videoId 降序列表（最多 following_feed_author_window 条）
+author_videos_cache = TTLCache(
+    ttl_seconds=settings.following_feed_cache_ttl_seconds,
+    max_entries=settings.following_feed_cache_max_authors,
+)
+
+
+def _recent_video_ids(
+    db: Session, author_ids: Sequence[str], per_author: int, before_id: Optional[int] = None
+) -> Dict[str, List[int]]:
+    """一条窗口查询取出每位作者最新的 per_author 条 videoId（降序）"""
+    if not author_ids:
+        return {}
+    ranked = select(
+        Video.authorId,
+        Video.videoId,
+        func.row_number().over(partition_by=Video.authorId, order_by=Video.videoId.desc()).label("rn"),
+    ).where(Video.authorId.in_(author_ids))
+    if before_id is not None:
+        ranked = ranked.where(Video.videoId < before_id)
+    ranked = ranked.subquery()
+    rows = db.execute(
+        select(ranked.c.authorId, ranked.c.videoId)
+        .where(ranked.c.rn <= per_author)
+        .order_by(ranked.c.authorId, ranked.c.videoId.desc())
+    )
+    videos: Dict[str, List[int]] = {author_id: [] for author_id in author_ids}
+    for author_id, video_id in rows:
+        videos[author_id].append(video_id)
+    return videos
+
+
+class FollowingFeedService:
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def list_following_videos(self, user_id: str, limit: int, cursor: Optional[int] = None) -> VideoCursorPage:
+        """关注作者的视频，按 videoId 降序；cursor 为上一页最后一条 videoId。"""
+        author_ids = FollowService(self.db).followed_author_ids(user_id)
+        windows = self._author_windows(author_ids)
+
+        streams: List[List[int]] = []
+        deep_authors: List[str] = []
+        for author_id in author_ids:
+            window = windows[author_id]
+            # window 为降序：跳过 >= cursor 的部分
+            ids = window[_first_below(window, cursor):] if cursor is not None else window
+            if len(ids) <= limit and len(window) >= settings.following_feed_author_window:
+                # 缓存窗口不足一页且作者可能还有更早的视频：改为直接查询游标之后的部分
+                deep_authors.append(author_id)
+            else:
+                streams.append(ids)
+        if deep_authors:
+            streams.extend(_recent_video_ids(self.db, deep_authors, limit + 1, before_id=cursor).values())
+
+        page_ids = list(islice(heapq.merge(*streams, reverse=True), limit + 1))
+        has_next = len(page_ids) > limit
+        page_ids = page_ids[:limit]
+
+        videos = {video.videoId: video for video in self.db.execute(select(Video).where(Video.videoId.in_(page_ids))).scalars()} if page_ids else {}
+        items = VideoRenderer(self.db).render([videos[video_id] for video_id in page_ids if video_id in videos], user_id=user_id)
+        return VideoCursorPage(
+            items=items,
+            next_cursor=page_ids[-1] if has_next else None,
+            has_next=has_next,
+        )
+
+    def _author_windows(self, author_ids: Sequence[str]) -> Dict[str, List[int]]:
+        windows: Dict[str, List[int]] = {}
+        missing: List[str] = []
+        for author_id in author_ids:
+            window = author_videos_cache.get(author_id)
+            if window is None:
+                missing.append(author_id)
+            else:
+                windows[author_id] = window
+        if missing:
+            loaded = _recent_video_ids(self.db, missing, settings.following_feed_author_window)
+            for author_id, window in loaded.items():
+                author_videos_cache.set(author_id, window)
+            windows.update(loaded)
+        return windows
+
+
+def _first_below(descending: List[int], cursor: int) -> int:
+    """降序列表中第一个 < cursor 的位置"""
+    return bisect_right(descending, -cursor, key=lambda video_id: -video_id)
@@ -0,0 +1,175 @@
+"""图文+BGM 内容目录
+
+启动时从 beatu_image_post 加载全部上架图文，构造成不可变的 VideoItem 模板缓存在内存中；
+Feed 每页只对选中的模板做浅拷贝并替换 id（copy-on-write），混编不再访问数据库或重建模型。
+表为空或尚未建表时使用内置的默认图文，保证前端始终能体验图文页面。
+"""
+
+from __future__ import annotations
+
+import logging
+from random import Random
+from typing import List, Optional, Sequence, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from database.models import ImagePost
+from schemas.api import VideoItem
+
+logger = logging.getLogger(__name__)
+
+# 图文卡片在 Feed 中的整数 ID 段（900000 + 页码 * 100 + 序号），避免与真实视频 ID 冲突
+IMAGE_POST_ID_BASE = 900000
+# play_url 虽然必填，但在 IMAGE_POST 下前端不会使用，只要是合法 URL 即可
+PLACEHOLDER_PLAY_URL = "https://samplelib.com/lib/preview/mp4/sample-5s.mp4"
+FALLBACK_COVER_URL = "https://images.pexels.com/photos/572897/pexels-photo-572897.jpeg"
+DEFAULT_BGM_URL = "https://samplelib.com/lib/preview/mp3/sample-6s.mp3"
+
+# 内置图文（统一使用 HTTPS 可直连的公共资源：图片 picsum.photos，BGM samplelib）
+DEFAULT_IMAGE_POSTS = [
+    dict(title="🌅 日出东方，新的一天开始了", seed="sunrise", like_count=1314, comment_count=99, favorite_count=520),
+    dict(title="🌸 春天的花海，美不胜收", seed="flower", like_count=888, comment_count=66, favorite_count=333),
+    dict(title="🏔️ 雪山之巅，一览众山小", seed="mountain", like_count=2024, comment_count=168, favorite_count=666),
+    dict(title="🌊 海浪拍岸，心旷神怡", seed="sea", like_count=999, comment_count=88, favorite_count=444),
+    dict(title="🌙 夜晚的城市，灯火通明", seed="night", like_count=777, comment_count=55, favorite_count=222),
+]
+
+T = TypeVar("T")
+
+
+def _build_template(
+    *,
+    title: str,
+    image_urls: List[str],
+    bgm_url: Optional[str],
+    author_id: str = "beatu-official",
+    author_name: str = "BeatU 官方",
+    like_count: int = 0,
+    comment_count: int = 0,
+    favorite_count: int = 0,
+    share_count: int = 66,
+) -> VideoItem:
+    return VideoItem.trusted(
+        id=IMAGE_POST_ID_BASE,
+        play_url=PLACEHOLDER_PLAY_URL,
+        cover_url=image_urls[0] if image_urls else FALLBACK_COVER_URL,  # 使用第一张图片作为封面
+        title=title,
+        tags=[],
+        duration_ms=0,
+        orientation="portrait",
+        author_id=author_id,
+        author_name=author_name,
+        author_avatar=None,
+        like_count=like_count,
+        comment_count=comment_count,
+        favorite_count=favorite_count,
+        share_count=share_count,
+        view_count=0,
+        is_liked=False,
+        is_favorited=False,
+        is_followed_author=False,
+        qualities=[],
+        contentType="IMAGE_POST",
+        imageUrls=list(image_urls),
+        bgmUrl=bgm_url,
+    )
+
+
+class ImagePostCatalog:
+    """不可变的图文模板集合。"""
+
+    def __init__(self, templates: Sequence[VideoItem]) -> None:
+        self._templates = tuple(templates)
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    @classmethod
+    def defaults(cls) -> "ImagePostCatalog":
+        return cls(
+            [
+                _build_template(
+                    title=post["title"],
+                    image_urls=[f"https://picsum.photos/seed/beatu-{post['seed']}-{i}/720/1280" for i in (1, 2, 3)],
+                    bgm_url=DEFAULT_BGM_URL,
+                    like_count=post["like_count"],
+                    comment_count=post["comment_count"],
+                    favorite_count=post["favorite_count"],
+                )
+                for post in DEFAULT_IMAGE_POSTS
+            ]
+        )
+
+    @classmethod
+    def from_db(cls, db: Session) -> "ImagePostCatalog":
+        rows = db.execute(
+            select(ImagePost).where(ImagePost.isActive == True).order_by(ImagePost.postId)
+        ).scalars().all()
+        templates = [
+            _build_template(
+                title=row.title,
+                image_urls=row.imageUrls or [],
+                bgm_url=row.bgmUrl,
+                author_id=row.authorId,
+                author_name=row.authorName,
+                like_count=row.likeCount,
+                comment_count=row.commentCount,
+                favorite_count=row.favoriteCount,
+                share_count=row.shareCount,
+            )
+            for row in rows
+        ]
+        return cls(templates) if templates else cls.defaults()
+
+    def for_page(self, page: int, count: int) -> List[VideoItem]:
+        """
+        按页轮换选取 count 条图文（相邻页内容不同，图文数量不受限于每页条数），
+        对模板做浅拷贝并只替换 id，模板本身不被修改。
+        """
+        total = len(self._templates)
+        if not total or count <= 0:
+            return []
+        start = (page - 1) * count
+        return [
+            self._templates[(start + index) % total].model_copy(
+                update={"id": IMAGE_POST_ID_BASE + page * 100 + index}
+            )
+            for index in range(min(count, total))
+        ]
+
+
+def interleave(items: Sequence[T], inserts: Sequence[T], seed: int) -> List[T]:
+    """
+    O(n) 确定性混编：以 seed 初始化随机数，从合并后的 n+k 个位置中选出 k 个放置 inserts，
+    其余位置按原顺序放置 items；同一 seed（页码）每次结果一致。
+    """
+    if not inserts:
+        return list(items)
+    total = len(items) + len(inserts)
+    slots = set(Random(seed).sample(range(total), len(inserts)))
+    item_iter, insert_iter = iter(items), iter(inserts)
+    return [next(insert_iter) if position in slots else next(item_iter) for position in range(total)]
+
+
+# 全局图文目录（启动时加载，单例模式）
+_image_post_catalog: Optional[ImagePostCatalog] = None
+
+
+def load_image_post_catalog(db: Session) -> ImagePostCatalog:
+    """从数据库（重新）加载图文目录；表不存在等异常时退化为内置图文。"""
+    global _image_post_catalog
+    try:
+        _image_post_catalog = ImagePostCatalog.from_db(db)
+    except Exception as e:
+        logger.warning(f"图文内容加载失败，使用内置图文: {e}")
+        db.rollback()
+        _image_post_catalog = ImagePostCatalog.defaults()
+    logger.info(f"图文目录已加载: 数量={len(_image_post_catalog)}")
+    return _image_post_catalog
+
+
+def get_image_post_catalog(db: Session) -> ImagePostCatalog:
+    if _image_post_catalog is None:
+        return load_image_post_catalog(db)
+    return _image_post_catalog
@@ -0,0 +1,211 @@
+"""物品协同过滤（item-to-item）推荐模型
+
+离线训练：
+    python -m services.item_cf_service --output data/item_cf.npz --top-n 50
+
+以 beatu_watch_history（看过 = 1）与 beatu_video_interaction（点赞 +1、收藏 +2）
+构建 用户×视频 稀疏矩阵，计算视频间余弦相似度，为每个视频保留 Top-N 近邻并落盘为 .npz。
+服务启动时加载近邻表到内存，推荐请求只做字典查找与少量加权求和（毫秒级、纯 CPU）。
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import logging
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import Video, VideoInteraction, WatchHistory
+
+logger = logging.getLogger(__name__)
+
+# 隐式反馈权重
+WATCH_WEIGHT = 1.0
+LIKE_WEIGHT = 1.0
+FAVORITE_WEIGHT = 2.0
+
+
+class ItemNeighbourTable:
+    """视频近邻表：video_id -> [(近邻 video_id, 相似度)]，按相似度降序。"""
+
+    def __init__(
+        self,
+        neighbours: Dict[int, List[Tuple[int, float]]],
+        durations: Optional[Dict[int, int]] = None,
+    ) -> None:
+        self._neighbours = neighbours
+        self._durations = durations or {}
+
+    def __len__(self) -> int:
+        return len(self._neighbours)
+
+    def neighbours(self, video_id: int) -> List[Tuple[int, float]]:
+        return self._neighbours.get(video_id, [])
+
+    def duration_ms(self, video_id: int) -> Optional[int]:
+        return self._durations.get(video_id)
+
+    def score(self, seeds: Mapping[int, float], exclude: Iterable[int] = (), limit: int = 5) -> List[int]:
+        """按 Σ 种子权重 × 相似度 为候选打分，返回得分最高的 limit 个视频 ID。"""
+        excluded = set(exclude) | set(seeds)
+        scores: Dict[int, float] = defaultdict(float)
+        for seed_id, weight in seeds.items():
+            for neighbour_id, similarity in self.neighbours(seed_id):
+                if neighbour_id not in excluded:
+                    scores[neighbour_id] += weight * similarity
+        top = heapq.nlargest(limit, scores.items(), key=lambda entry: (entry[1], -entry[0]))
+        return [video_id for video_id, _ in top]
+
+    def save(self, path: str | Path) -> None:
+        import numpy as np
+
+        video_ids = sorted(set(self._neighbours) | set(self._durations))
+        indptr = [0]
+        neighbour_ids: List[int] = []
+        scores: List[float] = []
+        for video_id in video_ids:
+            for neighbour_id, similarity in self._neighbours.get(video_id, []):
+                neighbour_ids.append(neighbour_id)
+                scores.append(similarity)
+            indptr.append(len(neighbour_ids))
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("wb") as fh:
+            np.savez_compressed(
+                fh,
+                video_ids=np.asarray(video_ids, dtype=np.int64),
+                durations=np.asarray([self._durations.get(v, 0) for v in video_ids], dtype=np.int64),
+                indptr=np.asarray(indptr, dtype=np.int64),
+                neighbour_ids=np.asarray(neighbour_ids, dtype=np.int64),
+                scores=np.asarray(scores, dtype=np.float32),
+            )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ItemNeighbourTable":
+        import numpy as np
+
+        with np.load(path) as data:
+            video_ids = data["video_ids"].tolist()
+            durations = data["durations"].tolist()
+            indptr = data["indptr"].tolist()
+            neighbour_ids = data["neighbour_ids"].tolist()
+            scores = data["scores"].tolist()
+        neighbours = {
+            video_id: list(zip(neighbour_ids[indptr[i]:indptr[i + 1]], scores[indptr[i]:indptr[i + 1]]))
+            for i, video_id in enumerate(video_ids)
+            if indptr[i] < indptr[i + 1]
+        }
+        return cls(neighbours, durations={v: d for v, d in zip(video_ids, durations) if d})
+
+
+def _collect_feedback(db: Session) -> Dict[Tuple[str, int], float]:
+    """汇总 (用户, 视频) 的隐式反馈权重。"""
+    feedback: Dict[Tuple[str, int], float] = defaultdict(float)
+    for user_id, video_id in db.execute(select(WatchHistory.userId, WatchHistory.videoId)).yield_per(5000):
+        feedback[(user_id, video_id)] += WATCH_WEIGHT
+    interactions = db.execute(
+        select(VideoInteraction.userId, VideoInteraction.videoId, VideoInteraction.isLiked, VideoInteraction.isFavorited)
+    ).yield_per(5000)
+    for user_id, video_id, is_liked, is_favorited in interactions:
+        weight = (LIKE_WEIGHT if is_liked else 0.0) + (FAVORITE_WEIGHT if is_favorited else 0.0)
+        if weight:
+            feedback[(user_id, video_id)] += weight
+    return feedback
+
+
+def train_item_cf(db: Session, top_n: int = 50) -> ItemNeighbourTable:
+    """从观看历史与互动表训练近邻表（余弦相似度，SciPy 稀疏矩阵运算）。"""
+    import numpy as np
+    from scipy import sparse
+
+    feedback = _collect_feedback(db)
+    durations = {video_id: duration for video_id, duration in db.execute(select(Video.videoId, Video.durationMs))}
+    if not feedback:
+        return ItemNeighbourTable({}, durations)
+
+    user_index: Dict[str, int] = {}
+    video_index: Dict[int, int] = {}
+    rows, cols, data = [], [], []
+    for (user_id, video_id), weight in feedback.items():
+        rows.append(user_index.setdefault(user_id, len(user_index)))
+        cols.append(video_index.setdefault(video_id, len(video_index)))
+        data.append(weight)
+    index_to_video = np.empty(len(video_index), dtype=np.int64)
+    for video_id, column in video_index.items():
+        index_to_video[column] = video_id
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), (rows, cols)),
+        shape=(len(user_index), len(video_index)),
+    )
+    # 列归一化后 XᵀX 即视频间余弦相似度
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1.0
+    normalized = matrix @ sparse.diags(1.0 / norms)
+    similarity = (normalized.T @ normalized).tocsr()
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+
+    neighbours: Dict[int, List[Tuple[int, float]]] = {}
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        if start == end:
+            continue
+        cols_slice = similarity.indices[start:end]
+        vals_slice = similarity.data[start:end]
+        if len(vals_slice) > top_n:
+            keep = np.argpartition(-vals_slice, top_n - 1)[:top_n]
+            cols_slice, vals_slice = cols_slice[keep], vals_slice[keep]
+        order = np.lexsort((index_to_video[cols_slice], -vals_slice))
+        neighbours[int(index_to_video[row])] = [
+            (int(index_to_video[cols_slice[i]]), float(vals_slice[i])) for i in order
+        ]
+    return ItemNeighbourTable(neighbours, durations)
+
+
+# 全局近邻表（启动时加载，未训练时为 None，推荐退化为热度榜）
+_item_cf_table: Optional[ItemNeighbourTable] = None
+
+
+def get_item_cf_table() -> Optional[ItemNeighbourTable]:
+    return _item_cf_table
+
+
+def load_item_cf_table(path: str | Path | None = None) -> Optional[ItemNeighbourTable]:
+    """加载近邻表；文件不存在或加载失败时保持为 None。"""
+    global _item_cf_table
+    model_path = Path(path or settings.item_cf_model_path)
+    if not model_path.is_absolute():
+        model_path = Path(__file__).parent.parent / model_path
+    if not model_path.exists():
+        logger.info(f"未找到协同过滤近邻表，推荐使用热度榜: {model_path}")
+        return None
+    try:
+        _item_cf_table = ItemNeighbourTable.load(model_path)
+        logger.info(f"协同过滤近邻表已加载: 视频数={len(_item_cf_table)}, 路径={model_path}")
+    except Exception as e:
+        logger.warning(f"协同过滤近邻表加载失败，推荐使用热度榜: {e}")
+    return _item_cf_table
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train the item-to-item recommendation model.")
+    parser.add_argument("--output", default=settings.item_cf_model_path, help="Output .npz path.")
+    parser.add_argument("--top-n", type=int, default=50, help="Neighbours kept per video.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from database.connection import SessionLocal
+
+    args = parse_args()
+    with SessionLocal() as session:
+        table = train_item_cf(session, top_n=args.top_n)
+    table.save(args.output)
+    print(f"Item CF model with {len(table)} videos written to {args.output}")
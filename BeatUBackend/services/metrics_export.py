@@ -0,0 +1,300 @@
+"""原始指标列式导出（离线分析用）
+
+把 beatu_metrics_playback / beatu_metrics_interaction 按天导出为压缩列式文件，分析任务读文件而不是查线上库：
+
+    python -m services.metrics_export --since 2025-03-01 --until 2025-03-07
+
+目录按表、按天分区（Hive 风格，Spark/DuckDB/pandas 可直接按目录读取）：
+
+    {METRICS_EXPORT_DIR}/beatu_metrics_playback/date=2025-03-01/part-00000.parquet
+
+- 按 (created_at, id) 游标分块读取，每块写一个 part 文件，内存占用与单块行数成正比，与表大小无关
+- 安装了 pyarrow 时写 Parquet（zstd 压缩），否则写 NumPy .npz（savez_compressed）；
+  .npz 中可空列额外带一个 `<列名>__null` 布尔掩码
+- 每天先写入临时目录，完成后整体改名，目录存在即表示该天已完整导出（重复执行会跳过）；
+  覆盖导出（--overwrite）同样先写完新数据，再把旧目录换成备份、临时目录换成正式目录，失败时旧数据不受影响
+- 后台任务（METRICS_EXPORT_ENABLED）每个周期导出最近 METRICS_EXPORT_LOOKBACK_DAYS 个已结束、尚未导出的自然日，
+  需早于保留期清理（METRICS_RETENTION_DAYS）
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import InteractionMetric, PlaybackMetric
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # 未安装 pyarrow 时导出为 .npz
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    name: str
+    dtype: str  # numpy dtype：int64 / float64 / bool / str / datetime64[ms]
+    nullable: bool = False
+
+
+# 导出的列（与 ORM 模型一一对应，created_at 为 UTC 毫秒精度时间戳）
+EXPORT_TABLES: Dict[str, Tuple[type, Tuple[ExportColumn, ...]]] = {
+    "beatu_metrics_playback": (
+        PlaybackMetric,
+        (
+            ExportColumn("id", "int64"),
+            ExportColumn("video_id", "int64"),
+            ExportColumn("fps", "float64", nullable=True),
+            ExportColumn("start_up_ms", "int64", nullable=True),
+            ExportColumn("rebuffer_count", "int64", nullable=True),
+            ExportColumn("memory_mb", "float64", nullable=True),
+            ExportColumn("channel", "str", nullable=True),
+            ExportColumn("created_at", "datetime64[ms]"),
+        ),
+    ),
+    "beatu_metrics_interaction": (
+        InteractionMetric,
+        (
+            ExportColumn("id", "int64"),
+            ExportColumn("event", "str"),
+            ExportColumn("video_id", "int64", nullable=True),
+            ExportColumn("latency_ms", "int64", nullable=True),
+            ExportColumn("success", "bool", nullable=True),
+            ExportColumn("created_at", "datetime64[ms]"),
+        ),
+    ),
+}
+
+_FILL_VALUES = {"int64": 0, "float64": np.nan, "bool": False, "str": ""}
+
+
+def resolve_format(requested: str) -> str:
+    """auto：有 pyarrow 用 parquet，否则 npz"""
+    if requested == "auto":
+        return "parquet" if pq is not None else "npz"
+    if requested == "parquet" and pq is None:
+        raise ValueError("导出 Parquet 需要安装 pyarrow")
+    if requested not in ("parquet", "npz"):
+        raise ValueError(f"不支持的导出格式: {requested}")
+    return requested
+
+
+def _to_arrays(columns: Sequence[ExportColumn], rows: List[tuple]) -> Dict[str, np.ndarray]:
+    """行转列；可空列的 None 用占位值填充，并额外输出 `<列名>__null` 掩码"""
+    arrays: Dict[str, np.ndarray] = {}
+    for index, spec in enumerate(columns):
+        values = [row[index] for row in rows]
+        if spec.nullable:
+            mask = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+            fill = _FILL_VALUES[spec.dtype]
+            values = [fill if value is None else value for value in values]
+            arrays[f"{spec.name}__null"] = mask
+        arrays[spec.name] = np.array(values, dtype=spec.dtype)
+    return arrays
+
+
+def _write_parquet(path: Path, columns: Sequence[ExportColumn], arrays: Dict[str, np.ndarray]) -> None:
+    fields = {}
+    for spec in columns:
+        mask = arrays.get(f"{spec.name}__null")
+        fields[spec.name] = pa.array(arrays[spec.name], mask=mask)
+    pq.write_table(pa.table(fields), path, compression="zstd")
+
+
+def _write_npz(path: Path, columns: Sequence[ExportColumn], arrays: Dict[str, np.ndarray]) -> None:
+    np.savez_compressed(path, **arrays)
+
+
+class MetricsExporter:
+    """按天分块导出原始指标，记录累计导出统计。"""
+
+    def __init__(self, output_dir: str | Path, chunk_size: int = 50000, file_format: str = "auto") -> None:
+        output = Path(output_dir)
+        if not output.is_absolute():
+            output = Path(__file__).parent.parent / output
+        self.output_dir = output
+        self.chunk_size = chunk_size
+        self.file_format = resolve_format(file_format)
+        self.runs = 0
+        self.exported_days = 0
+        self.exported_rows = 0
+        self.last_run: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def day_dir(self, table_name: str, day: date) -> Path:
+        return self.output_dir / table_name / f"date={day.isoformat()}"
+
+    def export_day(self, db: Session, table_name: str, day: date, overwrite: bool = False) -> Optional[int]:
+        """导出某一天的数据，返回导出的行数；已导出且不覆盖时返回 None"""
+        target = self.day_dir(table_name, day)
+        backup = target.with_name(f".{target.name}.old")
+        if backup.exists():
+            # 上次覆盖导出在两次 rename 之间中断：旧数据仍完整，先放回原位
+            if target.exists():
+                shutil.rmtree(backup)
+            else:
+                backup.rename(target)
+        if target.exists() and not overwrite:
+            return None
+        model, columns = EXPORT_TABLES[table_name]
+        staging = target.with_name(f".{target.name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        selected = [getattr(model, spec.name) for spec in columns]
+        created_at, row_id = model.created_at, model.id
+        write = _write_parquet if self.file_format == "parquet" else _write_npz
+        total = part = 0
+        cursor: Optional[Tuple[datetime, int]] = None
+        try:
+            while True:
+                # (created_at, id) 游标：走 created_at 索引（InnoDB 二级索引自带主键），每块只读 chunk_size 行
+                query = select(*selected).where(created_at >= start, created_at < end)
+                if cursor is not None:
+                    query = query.where(or_(created_at > cursor[0], and_(created_at == cursor[0], row_id > cursor[1])))
+                rows = db.execute(query.order_by(created_at, row_id).limit(self.chunk_size)).all()
+                if not rows:
+                    break
+                write(staging / f"part-{part:05d}.{self.file_format}", columns, _to_arrays(columns, rows))
+                part += 1
+                total += len(rows)
+                last = rows[-1]._mapping
+                cursor = (last["created_at"], last["id"])
+                if len(rows) < self.chunk_size:
+                    break
+        except Exception:
+            # 覆盖导出失败时旧数据原样保留
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self._swap_in(staging, target, backup)
+        return total
+
+    @staticmethod
+    def _swap_in(staging: Path, target: Path, backup: Path) -> None:
+        """新数据写完后再替换：旧目录先改名为备份，staging 改名为目标后删除备份；替换失败时恢复旧目录"""
+        if target.exists():
+            target.rename(backup)
+        try:
+            staging.rename(target)
+        except Exception:
+            if backup.exists():
+                backup.rename(target)
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        shutil.rmtree(backup, ignore_errors=True)
+
+    def export_range(self, db: Session, since: date, until: date, tables: Sequence[str] | None = None, overwrite: bool = False) -> dict:
+        """导出 [since, until] 每一天，返回 {表名: {日期: 行数}}（跳过的天不出现）"""
+        started = time.monotonic()
+        exported: Dict[str, Dict[str, int]] = {}
+        for table_name in tables or EXPORT_TABLES:
+            exported[table_name] = {}
+            day = since
+            while day <= until:
+                rows = self.export_day(db, table_name, day, overwrite=overwrite)
+                if rows is not None:
+                    exported[table_name][day.isoformat()] = rows
+                day += timedelta(days=1)
+        report = {
+            "format": self.file_format,
+            "tables": exported,
+            "durationMs": int((time.monotonic() - started) * 1000),
+            "finishedAt": int(time.time() * 1000),
+        }
+        with self._lock:
+            self.runs += 1
+            self.exported_days += sum(len(days) for days in exported.values())
+            self.exported_rows += sum(sum(days.values()) for days in exported.values())
+            self.last_run = report
+        return report
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "format": self.file_format,
+                "exportedDays": self.exported_days,
+                "exportedRows": self.exported_rows,
+                "lastRun": self.last_run,
+            }
+
+
+# 全局导出任务（单例模式）
+_metrics_exporter: Optional[MetricsExporter] = None
+
+
+def get_metrics_exporter() -> MetricsExporter:
+    global _metrics_exporter
+    if _metrics_exporter is None:
+        _metrics_exporter = MetricsExporter(
+            settings.metrics_export_dir,
+            chunk_size=settings.metrics_export_chunk_size,
+            file_format=settings.metrics_export_format,
+        )
+    return _metrics_exporter
+
+
+async def run_metrics_exporter(interval_seconds: float | None = None) -> None:
+    """后台周期性导出最近几个已结束的自然日，由应用 lifespan 启动（METRICS_EXPORT_ENABLED）、关闭时取消。"""
+    from fastapi.concurrency import run_in_threadpool
+
+    from database.connection import SessionLocal
+
+    interval = interval_seconds or settings.metrics_export_interval_seconds
+    exporter = get_metrics_exporter()
+
+    def _export_once() -> dict:
+        yesterday = datetime.utcnow().date() - timedelta(days=1)
+        since = yesterday - timedelta(days=settings.metrics_export_lookback_days - 1)
+        with SessionLocal() as db:
+            return exporter.export_range(db, since, yesterday)
+
+    while True:
+        try:
+            report = await run_in_threadpool(_export_once)
+            if any(report["tables"].values()):
+                logger.info(f"原始指标导出: {report}")
+        except Exception as e:
+            logger.warning(f"原始指标导出失败（下个周期重试）: {e}")
+        await asyncio.sleep(interval)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export raw metrics to day-partitioned columnar files.")
+    parser.add_argument("--since", type=date.fromisoformat, required=True, help="First day (UTC), YYYY-MM-DD.")
+    parser.add_argument("--until", type=date.fromisoformat, help="Last day (UTC), defaults to --since.")
+    parser.add_argument("--output", default=settings.metrics_export_dir, help="Output directory.")
+    parser.add_argument("--format", default=settings.metrics_export_format, choices=("auto", "parquet", "npz"))
+    parser.add_argument("--chunk-size", type=int, default=settings.metrics_export_chunk_size, help="Rows per part file.")
+    parser.add_argument("--table", action="append", choices=sorted(EXPORT_TABLES), help="Tables to export (default: all).")
+    parser.add_argument("--overwrite", action="store_true", help="Re-export days that already exist.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from database.connection import SessionLocal
+
+    args = parse_args()
+    exporter = MetricsExporter(args.output, chunk_size=args.chunk_size, file_format=args.format)
+    with SessionLocal() as session:
+        result = exporter.export_range(session, args.since, args.until or args.since, args.table, overwrite=args.overwrite)
+    for table_name, days in result["tables"].items():
+        print(f"{table_name}: {len(days)} days, {sum(days.values())} rows ({result['format']}) -> {exporter.output_dir / table_name}")
@@ -0,0 +1,164 @@
+"""原始指标保留期清理
+
+beatu_metrics_playback / beatu_metrics_interaction 只保留最近 METRICS_RETENTION_DAYS 天的原始行
+（长期趋势看 beatu_metrics_playback_rollup 预聚合）：
+
+- MySQL：表按天 RANGE 分区（见 database/partitions.py），过期分区直接 DROP PARTITION，
+  同时提前拆出未来几天的分区，写入永远落在小的当日分区上
+- 其他数据库（SQLite 等）：按 created_at 索引分批删除，每批一个短事务，避免长时间锁表
+
+beatu_metrics_playback_rollup 按粒度分别保留（分钟 PLAYBACK_ROLLUP_MINUTE_RETENTION_DAYS 天、
+小时 PLAYBACK_ROLLUP_HOUR_RETENTION_DAYS 天），按 (granularity, bucket_start) 索引分批删除。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import InteractionMetric, PlaybackMetric, PlaybackRollup
+from database.partitions import drop_partitions_before, ensure_future_partitions, list_partitions, supports_partitions
+
+logger = logging.getLogger(__name__)
+
+METRIC_MODELS = (PlaybackMetric, InteractionMetric)
+
+
+class MetricsRetention:
+    """按保留期清理原始指标表，记录最近一次及累计的清理统计。"""
+
+    def __init__(
+        self,
+        retention_days: int,
+        days_ahead: int = 3,
+        batch_size: int = 5000,
+        rollup_retention_days: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.retention_days = retention_days
+        # 粒度 -> 预聚合保留天数；未列出的粒度不清理
+        self.rollup_retention_days = rollup_retention_days or {}
+        self.days_ahead = days_ahead
+        self.batch_size = batch_size
+        self.runs = 0
+        self.total_dropped_partitions = 0
+        self.total_deleted_rows = 0
+        self.last_run: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def run(self, db: Session, now: Optional[datetime] = None) -> dict:
+        started = time.monotonic()
+        now = now or datetime.utcnow()
+        cutoff = now - timedelta(days=self.retention_days)
+        tables = {}
+        for model in METRIC_MODELS:
+            table_name = model.__tablename__
+            conn = db.connection()
+            if supports_partitions(conn) and list_partitions(conn, table_name):
+                created = ensure_future_partitions(conn, table_name, now.date(), self.days_ahead)
+                # 按天对齐：只删除整天都已过期的分区
+                dropped = drop_partitions_before(conn, table_name, cutoff.date())
+                db.commit()
+                tables[table_name] = {"droppedPartitions": dropped, "createdPartitions": created, "deletedRows": 0}
+            else:
+                # 未分区（SQLite，或尚未执行迁移 6 的 MySQL）：分批删除
+                tables[table_name] = {
+                    "droppedPartitions": [],
+                    "createdPartitions": 0,
+                    "deletedRows": self._delete_expired(db, model, model.created_at < cutoff),
+                }
+        if self.rollup_retention_days:
+            expired = or_(
+                *(
+                    and_(PlaybackRollup.granularity == granularity, PlaybackRollup.bucket_start < now - timedelta(days=days))
+                    for granularity, days in self.rollup_retention_days.items()
+                )
+            )
+            tables[PlaybackRollup.__tablename__] = {
+                "droppedPartitions": [],
+                "createdPartitions": 0,
+                "deletedRows": self._delete_expired(db, PlaybackRollup, expired),
+            }
+
+        report = {
+            "cutoff": int(cutoff.replace(tzinfo=timezone.utc).timestamp() * 1000),
+            "tables": tables,
+            "durationMs": int((time.monotonic() - started) * 1000),
+            "finishedAt": int(time.time() * 1000),
+        }
+        with self._lock:
+            self.runs += 1
+            self.total_dropped_partitions += sum(len(item["droppedPartitions"]) for item in tables.values())
+            self.total_deleted_rows += sum(item["deletedRows"] for item in tables.values())
+            self.last_run = report
+        logger.info(f"原始指标保留期清理: {report}")
+        return report
+
+    def _delete_expired(self, db: Session, model, expired) -> int:
+        """按过期条件（走时间索引）每批删除 batch_size 行，直到没有过期行"""
+        deleted = 0
+        while True:
+            ids = db.execute(select(model.id).where(expired).limit(self.batch_size)).scalars().all()
+            if not ids:
+                return deleted
+            db.execute(delete(model).where(model.id.in_(ids)))
+            db.commit()
+            deleted += len(ids)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "retentionDays": self.retention_days,
+                "rollupRetentionDays": dict(self.rollup_retention_days),
+                "totalDroppedPartitions": self.total_dropped_partitions,
+                "totalDeletedRows": self.total_deleted_rows,
+                "lastRun": self.last_run,
+            }
+
+
+# 全局保留期清理任务（单例模式）
+_metrics_retention: Optional[MetricsRetention] = None
+
+
+def get_metrics_retention() -> MetricsRetention:
+    global _metrics_retention
+    if _metrics_retention is None:
+        _metrics_retention = MetricsRetention(
+            retention_days=settings.metrics_retention_days,
+            days_ahead=settings.metrics_partition_days_ahead,
+            batch_size=settings.metrics_retention_batch_size,
+            rollup_retention_days={
+                "minute": settings.playback_rollup_minute_retention_days,
+                "hour": settings.playback_rollup_hour_retention_days,
+            },
+        )
+    return _metrics_retention
+
+
+async def run_metrics_retention(interval_seconds: float | None = None) -> None:
+    """后台周期性清理过期的原始指标，由应用 lifespan 启动、关闭时取消。"""
+    from fastapi.concurrency import run_in_threadpool
+
+    from database.connection import SessionLocal
+
+    interval = interval_seconds or settings.metrics_retention_interval_seconds
+    retention = get_metrics_retention()
+
+    def _run_once() -> dict:
+        with SessionLocal() as db:
+            return retention.run(db)
+
+    while True:
+        try:
+            await run_in_threadpool(_run_once)
+        except Exception as e:
+            logger.warning(f"原始指标保留期清理失败（下个周期重试）: {e}")
+        await asyncio.sleep(interval)
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+from datetime import datetime
+
+from core.config import settings
 from database.models import InteractionMetric, PlaybackMetric
-from schemas.api import MetricsInteraction, MetricsPlayback
+from schemas.api import MetricsInteraction, MetricsPlayback, PlaybackRollupSeries, PlaybackRollupStats
+from services.playback_rollups import GRANULARITIES, PlaybackAggregate, from_epoch_ms, get_playback_rollups, to_epoch_ms
+from services.quality_engine import get_quality_engine
 from sqlalchemy.orm import Session
 
 
@@ -17,9 +22,23 @@ class MetricsService:
             rebuffer_count=payload.rebuffer_count,
             memory_mb=payload.memory_mb,
             channel=payload.channel,
+            created_at=datetime.utcnow(),
         )
         self.db.add(entity)
         self.db.commit()
+        # ✅ 新增：同时计入分钟/小时预聚合，监控查询不再扫描原始行
+        get_playback_rollups().observe(
+            payload.video_id,
+            payload.channel,
+            entity.created_at,
+            fps=payload.fps,
+            start_up_ms=payload.start_up_ms,
+            rebuffer_count=payload.rebuffer_count,
+            memory_mb=payload.memory_mb,
+        )
+        get_quality_engine().observe_playback(
+            payload.channel, payload.device_class, payload.rebuffer_count, payload.start_up_ms
+        )
 
     def record_interaction(self, payload: MetricsInteraction) -> None:
         entity = InteractionMetric(
@@ -31,5 +50,36 @@ class MetricsService:
         self.db.add(entity)
         self.db.commit()
 
+    def playback_rollups(
+        self,
+        granularity: str,
+        dimension: str,
+        key: str,
+        start_ms: int | None = None,
+        end_ms: int | None = None,
+    ) -> PlaybackRollupSeries:
+        """
+        查询播放 QoE 预聚合：按分钟/小时、按频道或视频。
+        默认返回最近 settings.playback_rollup_default_buckets 个时间桶，单次最多 playback_rollup_max_buckets 个。
+        """
+        step = GRANULARITIES[granularity]
+        end = from_epoch_ms(end_ms) if end_ms is not None else datetime.utcnow()
+        start = from_epoch_ms(start_ms) if start_ms is not None else end - step * settings.playback_rollup_default_buckets
+        if start > end:
+            raise ValueError("start 不能晚于 end")
+        if (end - start) / step > settings.playback_rollup_max_buckets:
+            raise ValueError(f"查询范围过大，最多 {settings.playback_rollup_max_buckets} 个时间桶")
 
-
+        buckets = get_playback_rollups().query(self.db, granularity, dimension, key, start, end)
+        total = PlaybackAggregate()
+        for _, aggregate in buckets:
+            total.merge(aggregate)
+        return PlaybackRollupSeries(
+            granularity=granularity,
+            dimension=dimension,
+            key=key,
+            buckets=[
+                PlaybackRollupStats(bucket_start=to_epoch_ms(at), **aggregate.summary()) for at, aggregate in buckets
+            ],
+            summary=PlaybackRollupStats(**total.summary()),
+        )
@@ -0,0 +1,335 @@
+"""播放 QoE 预聚合
+
+原始播放指标（beatu_metrics_playback）只追加不查询；监控起播耗时等指标走预聚合表
+beatu_metrics_playback_rollup，查询时不扫描原始行：
+
+1. 上报时在进程内增量聚合：每条样本落入 (粒度, 桶起始, 维度, 维度值) 三个桶
+   （频道的分钟/小时桶 + 视频的小时桶），累加样本数、各指标的和与非空计数；
+   视频维度基数大，只按小时聚合，频道只接受 KNOWN_CHANNELS，其余归入 unknown
+2. 起播耗时用固定边界直方图（STARTUP_BUCKETS_MS）近似分位数：直方图可直接相加，
+   多个实例、多个时间桶合并后仍可估算 p50/p95（t-digest 需要额外依赖且合并后误差不固定）
+3. 后台任务周期性地把增量合并进预聚合表：一条 SELECT ... FOR UPDATE 取出已有行，
+   累加后与新行一起提交；失败时增量放回内存，下个周期重试
+4. 查询读取预聚合行，并叠加尚未落库（含正在落库、尚未提交）的内存增量
+5. 过期的预聚合行由 services.metrics_retention 按粒度分别清理
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import PlaybackRollup
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES: Dict[str, timedelta] = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1)}
+UNKNOWN_CHANNEL = "unknown"
+
+# 频道取值有限（推荐/关注），任意上报字符串不能各自生成一组预聚合行
+KNOWN_CHANNELS = frozenset({"recommend", "follow"})
+
+# 各维度维护的粒度：视频维度每个视频一行，只按小时聚合
+DIMENSION_GRANULARITIES: Dict[str, Tuple[str, ...]] = {"channel": ("minute", "hour"), "video": ("hour",)}
+
+# 起播耗时直方图的桶上界（毫秒），最后一个桶收纳超过 10s 的样本
+STARTUP_BUCKETS_MS: Tuple[int, ...] = (50, 100, 150, 200, 300, 400, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+
+# (粒度, 桶起始, 维度, 维度值)
+RollupKey = Tuple[str, datetime, str, str]
+
+# 除直方图外可直接相加的字段
+_SUM_FIELDS = (
+    "sample_count",
+    "fps_sum",
+    "fps_count",
+    "startup_sum",
+    "startup_count",
+    "rebuffer_sum",
+    "memory_sum",
+    "memory_count",
+)
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    """UTC 时间向下取整到分钟/小时"""
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(second=0, microsecond=0)
+
+
+def to_epoch_ms(at: datetime) -> int:
+    return int(at.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+# 9999-12-31T23:59:59.999Z：datetime 可表示的最大毫秒时间戳
+MAX_EPOCH_MS = 253402300799999
+
+
+def from_epoch_ms(value: int) -> datetime:
+    """毫秒时间戳转 UTC naive datetime；超出可表示范围时抛 ValueError（接口返回 400）"""
+    try:
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).replace(tzinfo=None)
+    except (OverflowError, OSError) as e:
+        raise ValueError(f"时间戳超出范围: {value}") from e
+
+
+def channel_key(channel: Optional[str]) -> str:
+    """上报的频道归一化为预聚合维度值：未知或缺省的频道归入 unknown"""
+    return channel if channel in KNOWN_CHANNELS else UNKNOWN_CHANNEL
+
+
+def _empty_hist() -> List[int]:
+    return [0] * (len(STARTUP_BUCKETS_MS) + 1)
+
+
+def _percentile(hist: List[int], count: int, q: float) -> Optional[float]:
+    """在直方图上估算分位数：定位到所在桶后按桶内均匀分布线性插值"""
+    if count <= 0:
+        return None
+    rank = q * count
+    seen = 0
+    for index, bin_count in enumerate(hist):
+        if bin_count and seen + bin_count >= rank:
+            if index == len(STARTUP_BUCKETS_MS):
+                return float(STARTUP_BUCKETS_MS[-1])
+            lower = STARTUP_BUCKETS_MS[index - 1] if index else 0
+            upper = STARTUP_BUCKETS_MS[index]
+            return lower + (upper - lower) * (rank - seen) / bin_count
+        seen += bin_count
+    return float(STARTUP_BUCKETS_MS[-1])
+
+
+def _avg(total: float, count: int) -> Optional[float]:
+    return round(total / count, 2) if count else None
+
+
+@dataclass
+class PlaybackAggregate:
+    """一个时间桶内的播放指标聚合，可相加"""
+
+    sample_count: int = 0
+    fps_sum: float = 0.0
+    fps_count: int = 0
+    startup_sum: float = 0.0
+    startup_count: int = 0
+    startup_hist: List[int] = field(default_factory=_empty_hist)
+    rebuffer_sum: int = 0
+    memory_sum: float = 0.0
+    memory_count: int = 0
+
+    def observe(
+        self,
+        fps: Optional[float],
+        start_up_ms: Optional[int],
+        rebuffer_count: Optional[int],
+        memory_mb: Optional[float],
+    ) -> None:
+        self.sample_count += 1
+        if fps is not None:
+            self.fps_sum += fps
+            self.fps_count += 1
+        if start_up_ms is not None:
+            self.startup_sum += start_up_ms
+            self.startup_count += 1
+            self.startup_hist[bisect_left(STARTUP_BUCKETS_MS, start_up_ms)] += 1
+        if rebuffer_count:
+            self.rebuffer_sum += rebuffer_count
+        if memory_mb is not None:
+            self.memory_sum += memory_mb
+            self.memory_count += 1
+
+    def merge(self, other: "PlaybackAggregate") -> None:
+        for name in _SUM_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.startup_hist = [a + b for a, b in zip(self.startup_hist, other.startup_hist)]
+
+    @classmethod
+    def from_row(cls, row: PlaybackRollup) -> "PlaybackAggregate":
+        return cls(
+            startup_hist=list(row.startup_hist or _empty_hist()),
+            **{name: getattr(row, name) for name in _SUM_FIELDS},
+        )
+
+    def apply_to(self, row: PlaybackRollup) -> None:
+        """把增量累加到预聚合行上（直方图整体替换，JSON 列才会被标记为已修改）"""
+        merged = PlaybackAggregate.from_row(row)
+        merged.merge(self)
+        for name in (*_SUM_FIELDS, "startup_hist"):
+            setattr(row, name, getattr(merged, name))
+
+    def summary(self) -> dict:
+        return {
+            "count": self.sample_count,
+            "fps_avg": _avg(self.fps_sum, self.fps_count),
+            "start_up_ms_avg": _avg(self.startup_sum, self.startup_count),
+            "start_up_ms_p50": _percentile(self.startup_hist, self.startup_count, 0.5),
+            "start_up_ms_p95": _percentile(self.startup_hist, self.startup_count, 0.95),
+            "rebuffer_avg": _avg(self.rebuffer_sum, self.sample_count),
+            "memory_mb_avg": _avg(self.memory_sum, self.memory_count),
+        }
+
+
+def _new_row(key: RollupKey) -> PlaybackRollup:
+    granularity, start, dimension, dimension_key = key
+    return PlaybackRollup(
+        granularity=granularity,
+        bucket_start=start,
+        dimension=dimension,
+        dimension_key=dimension_key,
+        startup_hist=_empty_hist(),
+        **{name: 0 for name in _SUM_FIELDS},
+    )
+
+
+class PlaybackRollups:
+    def __init__(self) -> None:
+        self._pending: Dict[RollupKey, PlaybackAggregate] = defaultdict(PlaybackAggregate)
+        # 已从 _pending 取出、尚未提交的批次：查询时照常叠加，避免落库期间数据短暂“消失”
+        self._in_flight: List[Dict[RollupKey, PlaybackAggregate]] = []
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        video_id: int,
+        channel: Optional[str],
+        at: datetime,
+        fps: Optional[float] = None,
+        start_up_ms: Optional[int] = None,
+        rebuffer_count: Optional[int] = None,
+        memory_mb: Optional[float] = None,
+    ) -> None:
+        """上报时调用：样本计入频道的分钟/小时桶与视频的小时桶"""
+        dimension_keys = (("channel", channel_key(channel)), ("video", str(video_id)))
+        with self._lock:
+            for dimension, dimension_key in dimension_keys:
+                for granularity in DIMENSION_GRANULARITIES[dimension]:
+                    start = bucket_start(at, granularity)
+                    self._pending[(granularity, start, dimension, dimension_key)].observe(
+                        fps, start_up_ms, rebuffer_count, memory_mb
+                    )
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def flush(self, db: Session) -> int:
+        """把内存中的增量合并进预聚合表，返回写入的桶数"""
+        with self._lock:
+            pending = dict(self._pending)
+            self._pending = defaultdict(PlaybackAggregate)
+            if not pending:
+                return 0
+            self._in_flight.append(pending)
+        try:
+            existing = self._load_rows(db, list(pending))
+            for key, aggregate in pending.items():
+                row = existing.get(key)
+                if row is None:
+                    row = _new_row(key)
+                    db.add(row)
+                aggregate.apply_to(row)
+            db.commit()
+        except Exception:
+            # 并发实例同时插入同一个桶时唯一约束冲突：增量放回，下个周期按已有行累加
+            db.rollback()
+            with self._lock:
+                self._in_flight.remove(pending)
+                for key, aggregate in pending.items():
+                    self._pending[key].merge(aggregate)
+            raise
+        with self._lock:
+            self._in_flight.remove(pending)
+        return len(pending)
+
+    def _load_rows(self, db: Session, keys: List[RollupKey]) -> Dict[RollupKey, PlaybackRollup]:
+        """一条查询锁定本批次涉及的已有行：按 (粒度, 桶起始, 维度) 分组，维度值用 IN"""
+        groups: Dict[Tuple[str, datetime, str], List[str]] = defaultdict(list)
+        for granularity, start, dimension, dimension_key in keys:
+            groups[(granularity, start, dimension)].append(dimension_key)
+        condition = or_(
+            *(
+                and_(
+                    PlaybackRollup.granularity == granularity,
+                    PlaybackRollup.bucket_start == start,
+                    PlaybackRollup.dimension == dimension,
+                    PlaybackRollup.dimension_key.in_(dimension_keys),
+                )
+                for (granularity, start, dimension), dimension_keys in groups.items()
+            )
+        )
+        rows = db.execute(select(PlaybackRollup).where(condition).with_for_update()).scalars()
+        return {(row.granularity, row.bucket_start, row.dimension, row.dimension_key): row for row in rows}
+
+    def query(
+        self,
+        db: Session,
+        granularity: str,
+        dimension: str,
+        dimension_key: str,
+        start: datetime,
+        end: datetime,
+    ) -> List[Tuple[datetime, PlaybackAggregate]]:
+        """[start, end] 范围内的各时间桶（按时间升序），含尚未落库的增量"""
+        if granularity not in DIMENSION_GRANULARITIES[dimension]:
+            raise ValueError(f"{dimension} 维度只支持 {'/'.join(DIMENSION_GRANULARITIES[dimension])} 粒度")
+        start = bucket_start(start, granularity)
+        rows = db.execute(
+            select(PlaybackRollup).where(
+                PlaybackRollup.granularity == granularity,
+                PlaybackRollup.dimension == dimension,
+                PlaybackRollup.dimension_key == dimension_key,
+                PlaybackRollup.bucket_start.between(start, end),
+            )
+        ).scalars()
+        buckets: Dict[datetime, PlaybackAggregate] = {row.bucket_start: PlaybackAggregate.from_row(row) for row in rows}
+        with self._lock:
+            for batch in (*self._in_flight, self._pending):
+                for (g, at, d, k), aggregate in batch.items():
+                    if g == granularity and d == dimension and k == dimension_key and start <= at <= end:
+                        buckets.setdefault(at, PlaybackAggregate()).merge(aggregate)
+        return sorted(buckets.items())
+
+
+# 全局播放指标预聚合（单例模式）
+_playback_rollups: Optional[PlaybackRollups] = None
+
+
+def get_playback_rollups() -> PlaybackRollups:
+    global _playback_rollups
+    if _playback_rollups is None:
+        _playback_rollups = PlaybackRollups()
+    return _playback_rollups
+
+
+async def run_playback_rollup_flusher(interval_seconds: float | None = None) -> None:
+    """后台周期性地把播放指标增量合并进预聚合表，由应用 lifespan 启动；关闭时取消前会再合并一次。"""
+    from fastapi.concurrency import run_in_threadpool
+
+    from database.connection import SessionLocal
+
+    interval = interval_seconds or settings.playback_rollup_flush_seconds
+    rollups = get_playback_rollups()
+
+    def _flush_once() -> int:
+        with SessionLocal() as db:
+            return rollups.flush(db)
+
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(_flush_once)
+            except Exception as e:
+                logger.warning(f"播放指标预聚合落库失败（下个周期重试）: {e}")
+    finally:
+        await run_in_threadpool(_flush_once)
@@ -0,0 +1,247 @@
+"""自适应清晰度决策（/ai/quality）
+
+不再按上报带宽的三个固定阈值映射清晰度，而是综合：
+
+1. 吞吐估计：按用户对上报的 bandwidthKbps 做 EWMA，平滑单次测速的抖动
+2. 近期播放质量：播放指标上报时按 (频道, 设备档位) 在内存中维护卡顿次数/起播耗时的 EWMA，
+   卡顿多、起播慢的组合会收紧可用码率
+3. 设备状态：CPU 负载高、温度高或电量低的设备（constrained）限制最高码率；
+   频道与设备档位都归一到固定取值（见 DEVICE_CLASSES、playback_rollups.KNOWN_CHANNELS），
+   客户端上报的任意字符串不会撑大内存中的统计
+4. 视频可用的清晰度档位：在按码率升序的档位上二分，选不超过可用码率的最高一档
+
+可用码率按 (用户, 网络档位, 设备档位, 频道) 短时缓存：网络档位不变时复用上次的决策，
+避免测速的小幅波动导致清晰度来回切换；整个决策只有字典查找与少量算术，不访问数据库。
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+from core.config import settings
+from core.responses import TTLCache
+from services.playback_rollups import channel_key
+
+
+@dataclass(frozen=True)
+class Rendition:
+    label: str
+    bitrate_kbps: int
+    resolution: Optional[str] = None
+    url: Optional[str] = None
+
+
+# 视频没有登记清晰度档位时使用的默认码率阶梯（按码率升序）
+DEFAULT_LADDER: Tuple[Rendition, ...] = (
+    Rendition("360P", 600, "640x360"),
+    Rendition("480P", 1200, "854x480"),
+    Rendition("720P", 2500, "1280x720"),
+    Rendition("1080P", 5000, "1920x1080"),
+    Rendition("4K", 8000, "3840x2160"),
+)
+
+# 网络档位：按估计吞吐（kbps）划分，上界开区间
+NETWORK_CLASSES: Tuple[Tuple[str, float], ...] = (("poor", 1500), ("fair", 4000), ("good", 10000), ("excellent", float("inf")))
+
+# 受限设备的最高码率（kbps）
+CONSTRAINED_MAX_KBPS = 2500
+# 播放质量 EWMA 的平滑系数与判定阈值
+QOE_ALPHA = 0.05
+STARTUP_TARGET_MS = 1000.0
+MIN_QOE_FACTOR = 0.5
+# 设备档位的合法取值；客户端声明其他档位时按设备状态重新判断
+DEVICE_CLASSES = frozenset({"normal", "constrained"})
+
+
+def network_class(kbps: float) -> str:
+    for name, upper in NETWORK_CLASSES:
+        if kbps < upper:
+            return name
+    return NETWORK_CLASSES[-1][0]
+
+
+def _as_float(value) -> Optional[float]:
+    """设备状态由客户端上报，可能是 "85%" 之类的字符串：无法解析时视为未上报"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def device_class(device_stats: Mapping) -> str:
+    """客户端可直接上报 deviceClass（仅限 DEVICE_CLASSES）；否则按 CPU 负载、温度、电量判断是否受限"""
+    declared = device_stats.get("deviceClass")
+    if isinstance(declared, str) and declared in DEVICE_CLASSES:
+        return declared
+    cpu_load = _as_float(device_stats.get("cpuLoad"))
+    temperature = _as_float(device_stats.get("temperature"))
+    battery = _as_float(device_stats.get("batteryLevel"))
+    if (
+        (cpu_load is not None and cpu_load > 0.85)
+        or (temperature is not None and temperature >= 42)
+        or (battery is not None and battery < 0.15)
+    ):
+        return "constrained"
+    return "normal"
+
+
+@dataclass(frozen=True)
+class QualityDecision:
+    rendition: Optional[Rendition]  # None 表示没有可用的吞吐估计，交给客户端 ABR（AUTO）
+    budget_kbps: Optional[float]
+    reason: str
+
+    @property
+    def label(self) -> str:
+        return self.rendition.label if self.rendition else "AUTO"
+
+
+class ThroughputEstimator:
+    """按用户的带宽 EWMA（LRU 限制用户数）"""
+
+    def __init__(self, alpha: float, max_users: int) -> None:
+        self.alpha = alpha
+        self.max_users = max_users
+        self._estimates: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def update(self, user_id: str, kbps: Optional[float]) -> Optional[float]:
+        """记录一次测速并返回最新估计；未上报带宽时只返回已有估计"""
+        with self._lock:
+            previous = self._estimates.get(user_id)
+            if kbps is None or kbps <= 0:
+                return previous
+            estimate = kbps if previous is None else previous + self.alpha * (kbps - previous)
+            self._estimates[user_id] = estimate
+            self._estimates.move_to_end(user_id)
+            while len(self._estimates) > self.max_users:
+                self._estimates.popitem(last=False)
+            return estimate
+
+
+class QoEStats:
+    """按 (频道, 设备档位) 的卡顿次数/起播耗时 EWMA（LRU 限制组合数）"""
+
+    def __init__(self, alpha: float = QOE_ALPHA, max_keys: int = 64) -> None:
+        self.alpha = alpha
+        self.max_keys = max_keys
+        self._stats: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, channel: str, device: str, rebuffer_count: Optional[int], start_up_ms: Optional[int]) -> None:
+        key = (channel, device)
+        with self._lock:
+            rebuffer, startup = self._stats.get(key, (0.0, STARTUP_TARGET_MS))
+            if rebuffer_count is not None:
+                rebuffer += self.alpha * (rebuffer_count - rebuffer)
+            if start_up_ms is not None:
+                startup += self.alpha * (start_up_ms - startup)
+            self._stats[key] = (rebuffer, startup)
+            self._stats.move_to_end(key)
+            while len(self._stats) > self.max_keys:
+                self._stats.popitem(last=False)
+
+    def get(self, channel: str, device: str) -> Tuple[float, float]:
+        return self._stats.get((channel, device), (0.0, STARTUP_TARGET_MS))
+
+    def factor(self, channel: str, device: str) -> float:
+        """码率收紧系数：每播放平均卡顿 r 次时乘 1/(1+r)，起播慢于目标时再按比例收紧"""
+        rebuffer, startup = self.get(channel, device)
+        factor = 1.0 / (1.0 + rebuffer)
+        if startup > STARTUP_TARGET_MS:
+            factor *= STARTUP_TARGET_MS / startup
+        return max(factor, MIN_QOE_FACTOR)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                f"{channel}/{device}": {"rebufferEwma": round(rebuffer, 3), "startUpMsEwma": round(startup, 1)}
+                for (channel, device), (rebuffer, startup) in self._stats.items()
+            }
+
+
+class QualityEngine:
+    def __init__(
+        self,
+        bandwidth_alpha: float = 0.3,
+        safety_factor: float = 0.8,
+        cache_ttl_seconds: float = 30.0,
+        max_users: int = 100000,
+    ) -> None:
+        self.safety_factor = safety_factor
+        self.throughput = ThroughputEstimator(bandwidth_alpha, max_users)
+        self.qoe = QoEStats()
+        self.budgets = TTLCache(ttl_seconds=cache_ttl_seconds, max_entries=max_users)
+        self.decisions = 0
+
+    def observe_playback(
+        self, channel: Optional[str], device: Optional[str], rebuffer_count: Optional[int], start_up_ms: Optional[int]
+    ) -> None:
+        """播放指标上报时调用"""
+        self.qoe.observe(channel_key(channel), device if device in DEVICE_CLASSES else "normal", rebuffer_count, start_up_ms)
+
+    def decide(
+        self,
+        user_id: str,
+        network_stats: Mapping,
+        device_stats: Mapping,
+        renditions: Sequence[Rendition] = DEFAULT_LADDER,
+        channel: Optional[str] = None,
+    ) -> QualityDecision:
+        """renditions 需按码率升序"""
+        self.decisions += 1
+        reported = network_stats.get("bandwidthKbps")
+        estimate = self.throughput.update(user_id, float(reported) if isinstance(reported, (int, float)) else None)
+        if estimate is None:
+            return QualityDecision(None, None, "暂无带宽数据，交给播放器自适应（AUTO）")
+
+        channel = channel_key(channel)
+        net = network_class(estimate)
+        device = device_class(device_stats)
+        key = (user_id, net, device, channel)
+        budget = self.budgets.get(key)
+        if budget is None:
+            budget = estimate * self.safety_factor * self.qoe.factor(channel, device)
+            if device == "constrained":
+                budget = min(budget, CONSTRAINED_MAX_KBPS)
+            self.budgets.set(key, budget)
+
+        ladder = renditions or DEFAULT_LADDER
+        index = bisect_right(ladder, budget, key=lambda item: item.bitrate_kbps) - 1
+        rendition = ladder[max(index, 0)]
+        rebuffer, startup = self.qoe.get(channel, device)
+        reason = (
+            f"带宽估计 {estimate:.0f}kbps（{net}），{channel} 频道 {device} 设备近期卡顿 {rebuffer:.2f} 次/播放、"
+            f"起播 {startup:.0f}ms，可用码率 {budget:.0f}kbps，选择 {rendition.label}"
+        )
+        return QualityDecision(rendition, budget, reason)
+
+    def stats(self) -> dict:
+        return {
+            "decisions": self.decisions,
+            "budgetCacheHits": self.budgets.hits,
+            "budgetCacheMisses": self.budgets.misses,
+            "qoe": self.qoe.snapshot(),
+        }
+
+
+# 全局清晰度决策引擎（单例模式）
+_quality_engine: Optional[QualityEngine] = None
+
+
+def get_quality_engine() -> QualityEngine:
+    global _quality_engine
+    if _quality_engine is None:
+        _quality_engine = QualityEngine(
+            bandwidth_alpha=settings.quality_bandwidth_ewma_alpha,
+            safety_factor=settings.quality_safety_factor,
+            cache_ttl_seconds=settings.quality_cache_ttl_seconds,
+            max_users=settings.quality_max_users,
+        )
+    return _quality_engine
@@ -0,0 +1,209 @@
+"""热度排行榜
+
+后台周期性地按 videoId 分块扫描视频计数（播放/点赞/收藏/评论），
+对“自上次刷新以来的增量”加权累加，并对历史分数按半衰期做指数衰减，维护 Top-K 列表。
+推荐接口只需 O(K) 读取榜单、剔除当前视频与已看视频，不再每次 ORDER BY viewCount 全表排序。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import Video
+
+logger = logging.getLogger(__name__)
+
+# 各类互动在热度分中的权重：越“重”的行为权重越高
+SCORE_WEIGHTS = {
+    "view": 1.0,
+    "like": 5.0,
+    "favorite": 8.0,
+    "comment": 10.0,
+}
+
+REDIS_RANKING_KEY = "beatu:ranking:popular"
+
+
+class MemoryRankingStore:
+    """进程内榜单存储：整体替换列表引用，读写无需加锁。"""
+
+    def __init__(self) -> None:
+        self._entries: List[Tuple[int, float]] = []
+
+    def replace(self, entries: List[Tuple[int, float]]) -> None:
+        self._entries = entries
+
+    def read(self) -> List[Tuple[int, float]]:
+        return self._entries
+
+
+class RedisRankingStore:
+    """Redis 有序集合榜单存储，多实例部署时共享同一份榜单。"""
+
+    def __init__(self, redis, key: str = REDIS_RANKING_KEY) -> None:
+        self.redis = redis
+        self.key = key
+
+    def replace(self, entries: List[Tuple[int, float]]) -> None:
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(self.key)
+        if entries:
+            pipe.zadd(self.key, {str(video_id): score for video_id, score in entries})
+        pipe.execute()
+
+    def read(self) -> List[Tuple[int, float]]:
+        return [(int(member), float(score)) for member, score in self.redis.zrevrange(self.key, 0, -1, withscores=True)]
+
+
+class PopularityRanking:
+    """Top-K 热度榜：后台增量刷新，请求侧 O(K) 读取。"""
+
+    def __init__(
+        self,
+        top_k: int = 200,
+        half_life_hours: float = 24.0,
+        store: MemoryRankingStore | RedisRankingStore | None = None,
+        chunk_size: int = 1000,
+    ) -> None:
+        self.top_k = top_k
+        self.half_life_seconds = half_life_hours * 3600
+        self.store = store or MemoryRankingStore()
+        self.chunk_size = chunk_size
+        self._scores: Dict[int, float] = {}
+        self._last_raw: Dict[int, float] = {}
+        self._refreshed_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._refreshed_at is not None
+
+    def refresh(self, db: Session, now: float | None = None) -> int:
+        """
+        增量刷新榜单，返回扫描的视频数。
+
+        score = 旧分数 * 0.5^(距上次刷新时长 / 半衰期) + 本次计数增量的加权和
+        首次刷新时“增量”即为全部历史计数。
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            decay = 1.0
+            if self._refreshed_at is not None and self.half_life_seconds > 0:
+                decay = 0.5 ** ((now - self._refreshed_at) / self.half_life_seconds)
+
+            scanned = 0
+            seen: set[int] = set()
+            for video_id, raw in self._scan_raw_scores(db):
+                scanned += 1
+                seen.add(video_id)
+                delta = raw - self._last_raw.get(video_id, 0.0)
+                self._last_raw[video_id] = raw
+                self._scores[video_id] = max(0.0, self._scores.get(video_id, 0.0) * decay + delta)
+
+            # 已删除的视频不再参与排名
+            for video_id in set(self._scores) - seen:
+                self._scores.pop(video_id, None)
+                self._last_raw.pop(video_id, None)
+
+            top = heapq.nlargest(self.top_k, self._scores.items(), key=lambda entry: (entry[1], entry[0]))
+            self.store.replace(top)
+            self._refreshed_at = now
+            return scanned
+
+    def top(self, limit: int, exclude: Iterable[int] = ()) -> List[int]:
+        """按热度返回至多 limit 个视频 ID，跳过 exclude 中的视频。"""
+        excluded = set(exclude)
+        result: List[int] = []
+        for video_id, _ in self.store.read():
+            if video_id in excluded:
+                continue
+            result.append(video_id)
+            if len(result) >= limit:
+                break
+        return result
+
+    def scores(self, video_ids: Iterable[int]) -> Dict[int, float]:
+        """给定视频中位于榜单内的热度分（榜单外的视频不出现）。"""
+        wanted = set(video_ids)
+        return {video_id: score for video_id, score in self.store.read() if video_id in wanted}
+
+    def _scan_raw_scores(self, db: Session) -> Iterable[Tuple[int, float]]:
+        """按 videoId 键集分页扫描计数列，避免一次性加载整表 ORM 对象。"""
+        last_id: Optional[int] = None
+        while True:
+            query = (
+                select(
+                    Video.videoId,
+                    Video.viewCount,
+                    Video.likeCount,
+                    Video.favoriteCount,
+                    Video.commentCount,
+                )
+                .order_by(Video.videoId)
+                .limit(self.chunk_size)
+            )
+            if last_id is not None:
+                query = query.where(Video.videoId > last_id)
+            rows: Sequence = db.execute(query).all()
+            if not rows:
+                return
+            for video_id, views, likes, favorites, comments in rows:
+                yield video_id, (
+                    SCORE_WEIGHTS["view"] * (views or 0)
+                    + SCORE_WEIGHTS["like"] * (likes or 0)
+                    + SCORE_WEIGHTS["favorite"] * (favorites or 0)
+                    + SCORE_WEIGHTS["comment"] * (comments or 0)
+                )
+            last_id = rows[-1][0]
+
+
+# 全局热度榜实例（单例模式）
+_popularity_ranking: Optional[PopularityRanking] = None
+
+
+def get_popularity_ranking() -> PopularityRanking:
+    """获取热度榜实例（延迟初始化，按配置选择内存或 Redis 存储）"""
+    global _popularity_ranking
+    if _popularity_ranking is None:
+        store = None
+        if settings.ranking_store == "redis":
+            from database.connection import get_redis
+
+            store = RedisRankingStore(get_redis())
+        _popularity_ranking = PopularityRanking(
+            top_k=settings.ranking_top_k,
+            half_life_hours=settings.ranking_half_life_hours,
+            store=store,
+        )
+    return _popularity_ranking
+
+
+async def run_ranking_refresher(interval_seconds: float | None = None) -> None:
+    """后台循环刷新热度榜，由应用 lifespan 启动、关闭时取消；启动后立即刷新一次完成预热。"""
+    from fastapi.concurrency import run_in_threadpool
+
+    from database.connection import SessionLocal
+
+    interval = interval_seconds or settings.ranking_refresh_seconds
+    ranking = get_popularity_ranking()
+
+    def _refresh_once() -> int:
+        with SessionLocal() as db:
+            return ranking.refresh(db)
+
+    while True:
+        try:
+            scanned = await run_in_threadpool(_refresh_once)
+            logger.debug(f"热度榜刷新完成: 扫描视频数={scanned}")
+        except Exception as e:
+            logger.warning(f"热度榜刷新失败（下个周期重试）: {e}")
+        await asyncio.sleep(interval)
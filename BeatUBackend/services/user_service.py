@@ -4,10 +4,17 @@ import logging
 from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from core.config import settings
+from core.responses import EncodedCache, PreEncoded
 from database.models import User, UserFollow, Video, VideoInteraction
 from schemas.api import UserItem
+from services.follow_service import FollowService
 from services.helpers import parse_bool_map
 
+# /users 全量列表的预编码缓存：关注/取关会改变粉丝数，写路径上主动失效
+ALL_USERS_CACHE_KEY = "all_users"
+all_users_cache = EncodedCache(ttl_seconds=settings.users_cache_ttl_seconds, max_entries=1)
+
 
 class UserService:
     def __init__(self, db: Session) -> None:
@@ -52,9 +59,10 @@ class UserService:
             name=user.userName,  # ✅ 修改：字段名从 nickname 改为 userName
             avatar_url=user.avatarUrl,  # ✅ 修改：字段名从 avatar 改为 avatarUrl
             bio=user.bio,
-            likes_count=0,  # ✅ 修改：新表结构中没有 likes_received 字段，可以通过视频聚合计算
+            likes_count=int(user.receivedLikeCount or 0),  # ✅ 修改：读取增量维护的累计获赞数，不再按视频聚合
             following_count=int(followings),  # ✅ 修改：字段名从 followings 改为 followingCount
             followers_count=int(followers),  # ✅ 修改：字段名从 followers 改为 followerCount
+            video_count=int(user.videoCount or 0),
         )
 
     def get_user_by_name(self, user_name: str, current_user_id: str | None = None) -> UserItem:
@@ -96,82 +104,23 @@ class UserService:
             name=user.userName,  # ✅ 修改：字段名从 nickname 改为 userName
             avatar_url=user.avatarUrl,  # ✅ 修改：字段名从 avatar 改为 avatarUrl
             bio=user.bio,
-            likes_count=0,  # ✅ 修改：新表结构中没有 likes_received 字段，可以通过视频聚合计算
+            likes_count=int(user.receivedLikeCount or 0),
             following_count=int(user.followingCount),  # ✅ 修改：字段名从 followings 改为 followingCount
             followers_count=int(user.followerCount),  # ✅ 修改：字段名从 followers 改为 followerCount
+            video_count=int(user.videoCount or 0),
         )
 
     def follow_user(self, user_id: str, target_user_id: str) -> dict:
         """关注用户"""
-        # ✅ 修改：使用新的 UserFollow 表
-        follow = (
-            self.db.query(UserFollow)
-            .filter(
-                UserFollow.userId == user_id,
-                UserFollow.authorId == target_user_id,
-            )
-            .one_or_none()
-        )
-        
-        if follow and follow.isFollowed:
-            return {"success": True, "message": "已关注"}
-        
-        if follow:
-            # 更新现有记录
-            follow.isFollowed = True
-            follow.isPending = False
-        else:
-            # 创建新记录
-            entity = UserFollow(
-                userId=user_id,
-                authorId=target_user_id,
-                isFollowed=True,
-                isPending=False,
-            )
-            self.db.add(entity)
-        
-        # ✅ 修改：更新用户的关注数
-        user = self.db.get(User, user_id)
-        if user:
-            user.followingCount += 1
-        
-        # ✅ 修改：更新被关注用户的粉丝数
-        target_user = self.db.get(User, target_user_id)
-        if target_user:
-            target_user.followerCount += 1
-        
-        self.db.commit()
-        return {"success": True, "message": "关注成功"}
+        # ✅ 修改：统一走 FollowService 的单一事务写路径
+        if FollowService(self.db).set_follow(user_id, target_user_id, followed=True):
+            return {"success": True, "message": "关注成功"}
+        return {"success": True, "message": "已关注"}
 
     def unfollow_user(self, user_id: str, target_user_id: str) -> dict:
         """取消关注用户"""
-        # ✅ 修改：使用新的 UserFollow 表
-        follow = (
-            self.db.query(UserFollow)
-            .filter(
-                UserFollow.userId == user_id,
-                UserFollow.authorId == target_user_id,
-            )
-            .one_or_none()
-        )
-        
-        if follow and follow.isFollowed:
-            follow.isFollowed = False
-            follow.isPending = False
-            
-            # ✅ 修改：更新用户的关注数
-            user = self.db.get(User, user_id)
-            if user and user.followingCount > 0:
-                user.followingCount -= 1
-            
-            # ✅ 修改：更新被关注用户的粉丝数
-            target_user = self.db.get(User, target_user_id)
-            if target_user and target_user.followerCount > 0:
-                target_user.followerCount -= 1
-            
-            self.db.commit()
+        if FollowService(self.db).set_follow(user_id, target_user_id, followed=False):
             return {"success": True, "message": "已取消关注"}
-        
         return {"success": True, "message": "未关注"}
 
     def get_all_users(self) -> list[UserItem]:
@@ -185,13 +134,20 @@ class UserService:
                 name=user.userName,
                 avatar_url=user.avatarUrl,
                 bio=user.bio,
-                likes_count=0,
+                likes_count=int(user.receivedLikeCount or 0),
                 following_count=int(user.followingCount if user.followingCount is not None else self._count_followings(user.userId)),
                 followers_count=int(user.followerCount if user.followerCount is not None else self._count_followers(user.userId)),
+                video_count=int(user.videoCount or 0),
             )
             for user in users
         ]
 
+    def get_all_users_payload(self) -> PreEncoded:
+        """获取所有用户信息的预编码 JSON 片段（TTL 缓存，关注关系变化时失效）"""
+        return all_users_cache.get_or_encode(
+            ALL_USERS_CACHE_KEY, lambda: [user.to_payload() for user in self.get_all_users()]
+        )
+
     def get_all_user_follows(self, user_id: str) -> list[dict]:
         """获取指定用户的所有关注关系"""
         follows = (
@@ -213,7 +169,8 @@ class UserService:
     def _count_followers(self, user_id: str) -> int:
         """统计粉丝数"""
         return (
-            self.db.query(func.count(UserFollow.userId))
+            self.db.query(func.count())
+            .select_from(UserFollow)
             .filter(UserFollow.authorId == user_id, UserFollow.isFollowed.is_(True))
             .scalar()
             or 0
@@ -222,7 +179,8 @@ class UserService:
     def _count_followings(self, user_id: str) -> int:
         """统计关注数"""
         return (
-            self.db.query(func.count(UserFollow.userId))
+            self.db.query(func.count())
+            .select_from(UserFollow)
             .filter(UserFollow.userId == user_id, UserFollow.isFollowed.is_(True))
             .scalar()
             or 0
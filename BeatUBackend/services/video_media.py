@@ -0,0 +1,102 @@
+"""视频清晰度档位与标签
+
+beatu_video_rendition / beatu_video_tag 与视频一对多，按页批量读取：无论一页多少条视频，各只发起一条 IN 查询。
+
+- VideoItem.qualities：同一视频的全部档位（含各编码），按码率升序，客户端无需额外请求即可切换码率
+- VideoItem.tags：按 position 排序
+- /ai/quality：从该视频的档位中选择；档位按视频短时缓存，决策路径命中缓存时不访问数据库
+"""
+
+from __future__ import annotations
+
+from typing import Collection, Dict, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.responses import TTLCache
+from database.models import VideoRendition, VideoTag
+from schemas.api import VideoQuality
+from services.quality_engine import DEFAULT_LADDER, Rendition
+
+# 设备未上报解码能力时只考虑 h264（所有客户端都能硬解）
+DEFAULT_CODECS: Tuple[str, ...] = ("h264",)
+
+# 清晰度档位缓存：videoId -> 按码率升序的 (codec, Rendition) 元组（可能为空，表示视频未登记档位）
+rendition_cache = TTLCache(
+    ttl_seconds=settings.rendition_cache_ttl_seconds,
+    max_entries=settings.rendition_cache_max_videos,
+)
+
+
+def _rendition_rows(db: Session, video_ids: Collection[int]) -> List[VideoRendition]:
+    if not video_ids:
+        return []
+    query = (
+        select(VideoRendition)
+        .where(VideoRendition.videoId.in_(video_ids))
+        .order_by(VideoRendition.videoId, VideoRendition.bitrateKbps)
+    )
+    return list(db.execute(query).scalars())
+
+
+def load_qualities(db: Session, video_ids: Collection[int]) -> Dict[int, List[VideoQuality]]:
+    """一条 IN 查询读取多个视频的档位，返回 videoId -> 按码率升序的 VideoQuality 列表"""
+    qualities: Dict[int, List[VideoQuality]] = {}
+    for row in _rendition_rows(db, video_ids):
+        # 数据库行视为可信数据，跳过 URL 校验
+        qualities.setdefault(row.videoId, []).append(
+            VideoQuality.trusted(
+                label=row.label,
+                bitrate=row.bitrateKbps,
+                resolution=row.resolution,
+                url=row.url,
+                codec=row.codec,
+            )
+        )
+    return qualities
+
+
+def load_tags(db: Session, video_ids: Collection[int]) -> Dict[int, List[str]]:
+    """一条 IN 查询读取多个视频的标签，返回 videoId -> 按 position 排序的标签列表"""
+    if not video_ids:
+        return {}
+    query = (
+        select(VideoTag.videoId, VideoTag.tag)
+        .where(VideoTag.videoId.in_(video_ids))
+        .order_by(VideoTag.videoId, VideoTag.position, VideoTag.tag)
+    )
+    tags: Dict[int, List[str]] = {}
+    for video_id, tag in db.execute(query):
+        tags.setdefault(video_id, []).append(tag)
+    return tags
+
+
+def supported_codecs(codecs: object) -> Tuple[str, ...]:
+    """
+    设备上报的 codecs 来自客户端：只接受列表/元组中的字符串项，
+    其他形式（单个字符串、数字、嵌套对象）或过滤后为空时使用 DEFAULT_CODECS。
+    """
+    if isinstance(codecs, (list, tuple)):
+        valid = tuple(codec for codec in codecs if isinstance(codec, str))
+        if valid:
+            return valid
+    return DEFAULT_CODECS
+
+
+def rendition_ladder(db: Session, video_id: int, codecs: object = None) -> Tuple[Rendition, ...]:
+    """
+    清晰度决策使用的码率阶梯（按码率升序）：仅包含设备支持的编码；
+    视频未登记档位、或没有设备支持的编码时返回默认阶梯。
+    """
+    renditions = rendition_cache.get(video_id)
+    if renditions is None:
+        renditions = tuple(
+            (row.codec, Rendition(row.label, row.bitrateKbps, row.resolution, row.url))
+            for row in _rendition_rows(db, (video_id,))
+        )
+        rendition_cache.set(video_id, renditions)
+    supported = set(supported_codecs(codecs))
+    ladder = tuple(rendition for codec, rendition in renditions if codec in supported)
+    return ladder or DEFAULT_LADDER
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import List, Sequence
+
+from sqlalchemy.orm import Session
+
+from database.models import User, Video, VideoInteraction
+from schemas.api import VideoItem
+from services.follow_service import FollowService
+from services.video_media import load_qualities, load_tags
+from services.view_counter import get_share_counter, get_view_counter
+
+
+class VideoRenderer:
+    """
+    批量把 Video 行渲染为 VideoItem。
+
+    无论一页有多少条视频，固定只发起五条 IN 查询：
+    - 当前用户对这些视频的互动（点赞/收藏）
+    - 当前用户对这些作者的关注
+    - 作者信息（昵称/头像）
+    - 清晰度档位（按码率升序）
+    - 标签
+    Feed、搜索、详情、AI 推荐共用此组件，保证个性化字段一致且查询数恒定。
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def render(
+        self,
+        videos: Sequence[Video],
+        user_id: str | None,
+        channel: str | None = None,
+    ) -> List[VideoItem]:
+        if not videos:
+            return []
+
+        video_ids = [video.videoId for video in videos]
+        author_ids = {video.authorId for video in videos}
+
+        interaction_map = self._load_interactions(user_id, video_ids)
+        follow_map = self._load_follows(user_id, author_ids)
+        author_map = self._load_authors(author_ids)
+        quality_map = load_qualities(self.db, video_ids)
+        tag_map = load_tags(self.db, video_ids)
+        views = get_view_counter()
+        shares = get_share_counter()
+
+        items: List[VideoItem] = []
+        for video in videos:
+            interaction = interaction_map.get(video.videoId, {})
+            author = author_map.get(video.authorId)
+            author_name = author.userName if author else video.authorId
+            author_avatar = author.avatarUrl if author else None  # 使用用户的 avatarUrl 而不是 video.authorAvatar
+
+            # 数据库行视为可信数据，跳过逐字段校验（URL/别名），由 to_payload() 直接输出
+            items.append(
+                VideoItem.trusted(
+                    id=video.videoId,
+                    play_url=video.playUrl,
+                    cover_url=video.coverUrl,
+                    title=video.title,
+                    tags=tag_map.get(video.videoId, []),
+                    duration_ms=video.durationMs,
+                    orientation=str(video.orientation).lower() if video.orientation else "portrait",
+                    author_id=video.authorId,
+                    author_name=author_name,
+                    author_avatar=author_avatar,
+                    like_count=video.likeCount,
+                    comment_count=video.commentCount,
+                    favorite_count=video.favoriteCount,
+                    share_count=video.shareCount + shares.pending(video.videoId),
+                    view_count=video.viewCount + views.pending(video.videoId),  # 含尚未落库的播放增量
+                    is_liked=interaction.get("isLiked", False),
+                    is_favorited=interaction.get("isFavorited", False),
+                    is_followed_author=follow_map.get(video.authorId, False),
+                    qualities=quality_map.get(video.videoId, []),
+                    # 现有表中仅存储视频内容，统一标记为 VIDEO；图文卡片在后续注入时单独构造
+                    contentType="VIDEO",
+                    imageUrls=[],
+                    bgmUrl=None,
+                )
+            )
+        return items
+
+    def _load_interactions(self, user_id: str | None, video_ids: List[int]) -> dict:
+        if not user_id or not video_ids:
+            return {}
+        interactions = (
+            self.db.query(VideoInteraction)
+            .filter(VideoInteraction.userId == user_id, VideoInteraction.videoId.in_(video_ids))
+            .all()
+        )
+        return {
+            interaction.videoId: {
+                "isLiked": interaction.isLiked,
+                "isFavorited": interaction.isFavorited,
+            }
+            for interaction in interactions
+        }
+
+    def _load_follows(self, user_id: str | None, author_ids: set) -> dict:
+        return dict.fromkeys(FollowService(self.db).following_ids(user_id, author_ids), True)
+
+    def _load_authors(self, author_ids: set) -> dict:
+        if not author_ids:
+            return {}
+        authors = self.db.query(User).filter(User.userId.in_(author_ids)).all()
+        return {author.userId: author for author in authors}
@@ -2,19 +2,27 @@ from __future__ import annotations
 
 from typing import List, Sequence
 
-from sqlalchemy import func, select
+from sqlalchemy import func, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from database.models import VideoInteraction, UserFollow, Video, User, WatchHistory
+from core.config import settings
+from database.models import VideoInteraction, Video, User, WatchHistory
 from schemas.api import (
     FollowRequest,
     InteractionRequest,
     OperationResult,
+    PrefetchHint,
+    VideoCursorPage,
     VideoItem,
     VideoList,
 )
-from services.helpers import parse_bool_map, parse_quality_list, parse_tag_list
+from services.feed_cache import invalidate_feed_pages
+from services.follow_service import FollowService
+from services.helpers import parse_bool_map
+from services.image_post_service import get_image_post_catalog, interleave
+from services.video_renderer import VideoRenderer
+from services.view_counter import get_share_counter, get_view_recorder
 
 
 class VideoService:
@@ -49,6 +57,44 @@ class VideoService:
         items = self._build_video_items(records, user_id=user_id, channel=channel)
         return VideoList.create(items=items, total=total, page=page, limit=limit)
 
+    def list_author_videos(self, author_id: str, *, limit: int, cursor: int | None, user_id: str) -> VideoCursorPage:
+        """作者主页视频（按 videoId 倒序的游标分页）：WHERE authorId = ? AND videoId < ? 命中 authorId 索引"""
+        query = select(Video).where(Video.authorId == author_id).order_by(Video.videoId.desc()).limit(limit + 1)
+        if cursor is not None:
+            query = query.where(Video.videoId < cursor)
+        records = self.db.execute(query).scalars().all()
+        has_next = len(records) > limit
+        records = records[:limit]
+        return VideoCursorPage(
+            items=self._build_video_items(records, user_id=user_id),
+            next_cursor=records[-1].videoId if has_next else None,
+            has_next=has_next,
+        )
+
+    def get_prefetch_hints(self, *, page: int, limit: int, orientation: str | None) -> List[PrefetchHint]:
+        """第 page 页的封面/播放地址（只查三列，不做渲染），供客户端预加载"""
+        query = select(Video.videoId, Video.coverUrl, Video.playUrl).order_by(Video.videoId.desc())
+        if orientation:
+            query = query.where(Video.orientation == orientation.upper())
+        rows = self.db.execute(query.offset((page - 1) * limit).limit(limit)).all()
+        return [
+            PrefetchHint.trusted(id=video_id, cover_url=cover_url, play_url=play_url)
+            for video_id, cover_url, play_url in rows
+        ]
+
+    def get_watched_video_ids(self, user_id: str, video_ids: Sequence[int]) -> set[int]:
+        """在给定视频中筛出用户已看过的（单条 IN 查询）"""
+        if not user_id or not video_ids:
+            return set()
+        return set(
+            self.db.execute(
+                select(WatchHistory.videoId).where(
+                    WatchHistory.userId == user_id,
+                    WatchHistory.videoId.in_(video_ids),
+                )
+            ).scalars()
+        )
+
     def search_videos(
         self,
         *,
@@ -95,78 +141,31 @@ class VideoService:
 
     def share_video(self, video_id: int) -> OperationResult:  # ✅ 修改：video_id 从 str 改为 int
         """
-        记录一次分享行为：将对应视频的 shareCount 自增 1。
+        记录一次分享行为：对应视频的 shareCount 自增 1（异步批量落库）。
         客户端负责实际的系统分享逻辑，这里只做统计。
         """
         video = self.db.get(Video, video_id)
         if not video:
             raise ValueError("视频不存在")
 
-        # ✅ 修改：新表结构中没有 shareCount 字段，暂时不处理
-        # 如果需要统计分享，可以单独创建分享统计表
-        self.db.commit()
+        # ✅ 优化：不在请求内写库，增量在内存中聚合后由后台计数刷新任务批量写入
+        get_share_counter().add(video_id)
 
         return OperationResult(success=True, message="OK")
 
-    def follow_author(self, payload: FollowRequest, user_id: str) -> OperationResult:
-        author_id = payload.author_id
-        # ✅ 修改：使用新的 UserFollow 表
-        follow = (
-            self.db.query(UserFollow)
-            .filter(
-                UserFollow.userId == user_id,
-                UserFollow.authorId == author_id,
-            )
-            .one_or_none()
-        )
+    def record_view(self, video_id: int, user_id: str) -> bool:
+        """记录一次播放（去重窗口内同一用户只计一次），返回是否计数；视频不存在时抛出 ValueError"""
+        if self.db.scalar(select(Video.videoId).where(Video.videoId == video_id)) is None:
+            raise ValueError("视频不存在")
+        return get_view_recorder().record(video_id, user_id)
 
-        if payload.action == "FOLLOW":
-            if follow and follow.isFollowed:
-                return OperationResult(success=True, message="已关注")
-            if follow:
-                # 更新现有记录
-                follow.isFollowed = True
-                follow.isPending = False
-            else:
-                # 创建新记录
-                entity = UserFollow(
-                    userId=user_id,
-                    authorId=author_id,
-                    isFollowed=True,
-                    isPending=False,
-                )
-                self.db.add(entity)
-            
-            # ✅ 修改：更新用户的关注数
-            user = self.db.get(User, user_id)
-            if user:
-                user.followingCount += 1
-            
-            # ✅ 修改：更新被关注用户的粉丝数
-            target_user = self.db.get(User, author_id)
-            if target_user:
-                target_user.followerCount += 1
-            
-            self.db.commit()
-            return OperationResult(success=True, message="关注成功")
-        else:
-            # 取消关注
-            if follow and follow.isFollowed:
-                follow.isFollowed = False
-                follow.isPending = False
-                
-                # ✅ 修改：更新用户的关注数
-                user = self.db.get(User, user_id)
-                if user and user.followingCount > 0:
-                    user.followingCount -= 1
-                
-                # ✅ 修改：更新被关注用户的粉丝数
-                target_user = self.db.get(User, author_id)
-                if target_user and target_user.followerCount > 0:
-                    target_user.followerCount -= 1
-                
-                self.db.commit()
-            return OperationResult(success=True, message="已取消关注")
+    def follow_author(self, payload: FollowRequest, user_id: str) -> OperationResult:
+        # ✅ 修改：旧 /follow 接口与 /users/{id}/follow 共用 FollowService 的写路径
+        followed = payload.action == "FOLLOW"
+        changed = FollowService(self.db).set_follow(user_id, payload.author_id, followed=followed)
+        if followed:
+            return OperationResult(success=True, message="关注成功" if changed else "已关注")
+        return OperationResult(success=True, message="已取消关注")
 
     def _handle_interaction(
         self,
@@ -265,6 +264,8 @@ class VideoService:
                     self._bump_counter(video, "FAVORITE", delta_fav)
 
                 self.db.commit()
+                # 预物化的 Feed 页面中的点赞/收藏状态已过期
+                invalidate_feed_pages(user_id)
                 return OperationResult(success=True, message="OK")
 
             except IntegrityError as exc:
@@ -276,7 +277,19 @@ class VideoService:
 
     def _bump_counter(self, video: Video, interaction_type: str, delta: int) -> None:
         if interaction_type == "LIKE":
-            video.likeCount = max(0, video.likeCount + delta)  # ✅ 修改：字段名从 like_count 改为 likeCount
+            like_count = max(0, video.likeCount + delta)
+            # ✅ 新增：作者累计获赞数随视频点赞数同步增量更新（原子 SET x = x + delta），主页不再 SUM 全部视频
+            applied = like_count - video.likeCount
+            if applied:
+                statement = (
+                    update(User)
+                    .where(User.userId == video.authorId)
+                    .values(receivedLikeCount=User.receivedLikeCount + applied)
+                )
+                if applied < 0:
+                    statement = statement.where(User.receivedLikeCount >= -applied)
+                self.db.execute(statement)
+            video.likeCount = like_count  # ✅ 修改：字段名从 like_count 改为 likeCount
         elif interaction_type == "FAVORITE":
             video.favoriteCount = max(0, video.favoriteCount + delta)  # ✅ 修改：字段名从 favorite_count 改为 favoriteCount
 
@@ -286,85 +299,8 @@ class VideoService:
         user_id: str,
         channel: str | None = None,
     ) -> List[VideoItem]:
-        video_ids = [video.videoId for video in videos]  # ✅ 修改：字段名从 id 改为 videoId
-        author_ids = {video.authorId for video in videos}  # ✅ 修改：字段名从 author_id 改为 authorId
-
-        # ✅ 修改：使用新的 VideoInteraction 表
-        interactions = []
-        if user_id:
-            interactions = (
-                self.db.query(VideoInteraction)
-                .filter(VideoInteraction.userId == user_id, VideoInteraction.videoId.in_(video_ids))
-                .all()
-            )
-        
-        # ✅ 修改：使用新的 UserFollow 表
-        follow_map = {}
-        if user_id and author_ids:
-            follows = (
-                self.db.query(UserFollow)
-                .filter(
-                    UserFollow.userId == user_id,
-                    UserFollow.authorId.in_(author_ids),
-                    UserFollow.isFollowed == True,
-                )
-                .all()
-            )
-            follow_map = {follow.authorId: True for follow in follows}
-
-        # ✅ 修改：构建互动映射
-        interaction_map = {}
-        for interaction in interactions:
-            key = f"{interaction.videoId}"
-            interaction_map[key] = {
-                "isLiked": interaction.isLiked,
-                "isFavorited": interaction.isFavorited,
-            }
-
-        # ✅ 优化：批量获取所有作者信息，避免 N+1 查询
-        author_map = {}
-        if author_ids:
-            authors = self.db.query(User).filter(User.userId.in_(author_ids)).all()
-            author_map = {author.userId: author for author in authors}
-
-        items: List[VideoItem] = []
-        for video in videos:
-            video_key = f"{video.videoId}"
-            interaction = interaction_map.get(video_key, {})
-            
-            # ✅ 优化：从批量查询的 author_map 中获取作者信息
-            author = author_map.get(video.authorId)
-            author_name = author.userName if author else video.authorId
-            author_avatar = author.avatarUrl if author else None  # ✅ 修复：使用用户的 avatarUrl 而不是 video.authorAvatar
-            
-            items.append(
-                VideoItem(
-                    id=video.videoId,  # ✅ 修改：字段名从 id 改为 videoId
-                    play_url=video.playUrl,  # ✅ 修改：字段名从 play_url 改为 playUrl
-                    cover_url=video.coverUrl,  # ✅ 修改：字段名从 cover_url 改为 coverUrl
-                    title=video.title,
-                    tags=[],  # ✅ 修改：新表结构中没有 tags 字段
-                    duration_ms=video.durationMs,  # ✅ 修改：字段名从 duration_ms 改为 durationMs
-                    orientation=str(video.orientation).lower() if video.orientation else "portrait",
-                    author_id=video.authorId,  # ✅ 修改：字段名从 author_id 改为 authorId
-                    author_name=author_name,  # ✅ 修改：通过 authorId 查询 User 获取 userName
-                    author_avatar=author_avatar,  # ✅ 修复：使用用户的 avatarUrl
-                    like_count=video.likeCount,  # ✅ 修改：字段名从 like_count 改为 likeCount
-                    comment_count=video.commentCount,  # ✅ 修改：字段名从 comment_count 改为 commentCount
-                    favorite_count=video.favoriteCount,  # ✅ 修改：字段名从 favorite_count 改为 favoriteCount
-                    share_count=0,  # ✅ 修改：新表结构中没有 share_count 字段
-                    view_count=video.viewCount,  # ✅ 修改：字段名从 view_count 改为 viewCount
-                    is_liked=interaction.get("isLiked", False),
-                    is_favorited=interaction.get("isFavorited", False),
-                    is_followed_author=follow_map.get(video.authorId, False),
-                    qualities=[],  # ✅ 修改：新表结构中没有 qualities 字段
-                    # 现有表中仅存储视频内容，统一标记为 VIDEO；图文卡片在后续注入时单独构造
-                    contentType="VIDEO",
-                    imageUrls=[],
-                    bgmUrl=None,
-                )
-            )
-        return items
+        # 批量渲染（作者/互动/关注各一条 IN 查询），与 AI 推荐共用同一组件
+        return VideoRenderer(self.db).render(videos, user_id=user_id, channel=channel)
 
     def get_all_video_interactions(self, user_id: str) -> list[dict]:
         """获取指定用户的所有视频交互"""
@@ -512,6 +448,7 @@ class VideoService:
                     continue
             
             self.db.commit()
+            invalidate_feed_pages(user_id)
             self.logger.info(f"观看历史同步完成：成功={success_count}, 失败={error_count}")
             return OperationResult(success=True, message=f"同步成功：成功={success_count}, 失败={error_count}")
         except Exception as e:
@@ -521,162 +458,12 @@ class VideoService:
     def build_mixed_feed(self, *, page: int, items: List[VideoItem]) -> List[VideoItem]:
         """
         根据页码对视频流做"图文+视频"混编：
-        - 当前实现：在每一页中插入多条静态图文+BGM 卡片，便于前端体验图文页面
-        - 后续如接入真实图文数据，可改为从数据库/推荐系统读取
+        - 图文来自启动时缓存的图文目录（beatu_image_post），按页轮换选取并复制模板
+        - 插入位置以页码为种子确定性生成，一次遍历完成合并
         """
         if not items:
             return items
 
-        from random import Random
-
-        rng = Random()
-        rng.seed(page)
-
-        mixed: List[VideoItem] = list(items)
-        
-        # 获取所有可用的图文内容模板
-        image_posts = self._get_all_mock_image_posts()
-        
-        # 根据页码选择要插入的图文内容（确保每页都有不同的图文）
-        # 每页插入 1-2 条图文内容
-        num_posts = min(2, len(image_posts))
-        posts_to_insert = image_posts[:num_posts]
-        
-        # 随机插入位置，确保图文内容分散在视频流中
-        for post in posts_to_insert:
-            # 为每条图文生成唯一的ID（基于页码和索引）
-            # 统计当前列表中已有的图文内容数量
-            existing_image_posts = [x for x in mixed if x.content_type == "IMAGE_POST"]
-            post_id = 900000 + page * 100 + len(existing_image_posts)
-            post.id = post_id
-            post.title = f"{post.title}（第 {page} 页）"
-            
-            # 在 [0, len(mixed)] 区间内随机选择插入位置（包括尾部）
-            insert_index = rng.randint(0, len(mixed))
-            mixed.insert(insert_index, post)
-        
-        return mixed
-
-    def _get_all_mock_image_posts(self) -> List[VideoItem]:
-        """
-        获取所有写死的图文内容模板。
-        返回多条不同主题的图文内容，用于混编到视频流中。
-        """
-        # 统一使用 HTTPS 可直连的公共资源，避免明文 HTTP 或被墙导致的加载超时
-        # 图片使用 picsum.photos，BGM 使用 samplelib（HTTPS）
-        return [
-            self._create_mock_image_post(
-                title="🌅 日出东方，新的一天开始了",
-                image_urls=[
-                    "https://picsum.photos/seed/beatu-sunrise-1/720/1280",
-                    "https://picsum.photos/seed/beatu-sunrise-2/720/1280",
-                    "https://picsum.photos/seed/beatu-sunrise-3/720/1280",
-                ],
-                bgm_url="https://samplelib.com/lib/preview/mp3/sample-6s.mp3",
-                like_count=1314,
-                comment_count=99,
-                favorite_count=520,
-            ),
-            self._create_mock_image_post(
-                title="🌸 春天的花海，美不胜收",
-                image_urls=[
-                    "https://picsum.photos/seed/beatu-flower-1/720/1280",
-                    "https://picsum.photos/seed/beatu-flower-2/720/1280",
-                    "https://picsum.photos/seed/beatu-flower-3/720/1280",
-                ],
-                bgm_url="https://samplelib.com/lib/preview/mp3/sample-6s.mp3",
-                like_count=888,
-                comment_count=66,
-                favorite_count=333,
-            ),
-            self._create_mock_image_post(
-                title="🏔️ 雪山之巅，一览众山小",
-                image_urls=[
-                    "https://picsum.photos/seed/beatu-mountain-1/720/1280",
-                    "https://picsum.photos/seed/beatu-mountain-2/720/1280",
-                    "https://picsum.photos/seed/beatu-mountain-3/720/1280",
-                ],
-                bgm_url="https://samplelib.com/lib/preview/mp3/sample-6s.mp3",
-                like_count=2024,
-                comment_count=168,
-                favorite_count=666,
-            ),
-            self._create_mock_image_post(
-                title="🌊 海浪拍岸，心旷神怡",
-                image_urls=[
-                    "https://picsum.photos/seed/beatu-sea-1/720/1280",
-                    "https://picsum.photos/seed/beatu-sea-2/720/1280",
-                    "https://picsum.photos/seed/beatu-sea-3/720/1280",
-                ],
-                bgm_url="https://samplelib.com/lib/preview/mp3/sample-6s.mp3",
-                like_count=999,
-                comment_count=88,
-                favorite_count=444,
-            ),
-            self._create_mock_image_post(
-                title="🌙 夜晚的城市，灯火通明",
-                image_urls=[
-                    "https://picsum.photos/seed/beatu-night-1/720/1280",
-                    "https://picsum.photos/seed/beatu-night-2/720/1280",
-                    "https://picsum.photos/seed/beatu-night-3/720/1280",
-                ],
-                bgm_url="https://samplelib.com/lib/preview/mp3/sample-6s.mp3",
-                like_count=777,
-                comment_count=55,
-                favorite_count=222,
-            ),
-        ]
-
-    def _create_mock_image_post(
-        self,
-        title: str,
-        image_urls: List[str],
-        bgm_url: str,
-        like_count: int = 0,
-        comment_count: int = 0,
-        favorite_count: int = 0,
-        index: int = 0,
-    ) -> VideoItem:
-        """
-        构造一条示例"图文+音乐"内容，由后端统一注入到推荐流中。
-        
-        参数：
-        - title: 图文标题
-        - image_urls: 图片URL列表（至少1张）
-        - bgm_url: 背景音乐URL
-        - like_count: 点赞数
-        - comment_count: 评论数
-        - favorite_count: 收藏数
-        - index: 索引（用于生成唯一ID）
-        
-        说明：
-        - id 使用 900000 + index 作为整数 ID，区分不同页的示例卡片
-        - play_url 虽然必填，但在 IMAGE_POST 下前端不会使用，只要是合法 URL 即可
-        """
-        # 使用第一张图片作为封面
-        cover_url = image_urls[0] if image_urls else "https://images.pexels.com/photos/572897/pexels-photo-572897.jpeg"
-        
-        return VideoItem(
-            id=900000 + index,  # ✅ 修改：从字符串改为整数 ID（使用 900000+ 范围避免与真实视频 ID 冲突）
-            play_url="https://samplelib.com/lib/preview/mp4/sample-5s.mp4",
-            cover_url=cover_url,
-            title=title,
-            tags=[],
-            duration_ms=0,
-            orientation="portrait",
-            author_id="beatu-official",
-            author_name="BeatU 官方",
-            author_avatar=None,
-            like_count=like_count,
-            comment_count=comment_count,
-            favorite_count=favorite_count,
-            share_count=66,
-            view_count=0,
-            is_liked=False,
-            is_favorited=False,
-            is_followed_author=False,
-            qualities=[],
-            contentType="IMAGE_POST",
-            imageUrls=image_urls,
-            bgmUrl=bgm_url,
-        )
+        catalog = get_image_post_catalog(self.db)
+        posts = catalog.for_page(page, settings.feed_image_posts_per_page)
+        return interleave(items, posts, seed=page)
@@ -0,0 +1,115 @@
+"""播放量统计
+
+客户端每次开始播放调用 POST /videos/{id}/view，这里不直接写库：
+
+1. 去重：同一用户在同一时间窗口（VIEW_DEDUP_WINDOW_SECONDS，按窗口切分）内重复播放同一视频只计一次
+   - memory：进程内按窗口保存 (videoId, userId) 集合，进入新窗口时整体丢弃旧窗口
+   - redis：每个 (videoId, 窗口) 一个 HyperLogLog，PFADD 返回 1 表示新观众；内存固定约 12KB/键，
+     多实例共享去重结果，代价是极少量的误判（少计）
+2. 计数：通过 CounterBuffer 聚合到 beatu_video.viewCount，由后台计数刷新任务批量落库
+
+分享数（beatu_video.shareCount）不去重，计数缓冲区同样在这里定义。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import Video
+from services.counter_buffer import CounterBuffer, get_counter
+
+REDIS_VIEW_KEY_PREFIX = "beatu:views"
+
+
+class MemoryViewDedup:
+    """进程内去重：只保留当前窗口的 (videoId, userId) 集合。"""
+
+    def __init__(self, window_seconds: int) -> None:
+        self.window_seconds = window_seconds
+        self._bucket: Optional[int] = None
+        self._seen: Set[Tuple[int, str]] = set()
+        self._lock = threading.Lock()
+
+    def first_view(self, video_id: int, user_id: str, now: Optional[float] = None) -> bool:
+        bucket = int((now if now is not None else time.time()) // self.window_seconds)
+        key = (video_id, user_id)
+        with self._lock:
+            if bucket != self._bucket:
+                self._bucket = bucket
+                self._seen = set()
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            return True
+
+
+class RedisViewDedup:
+    """Redis HyperLogLog 去重，多实例部署时共享。"""
+
+    def __init__(self, redis, window_seconds: int, prefix: str = REDIS_VIEW_KEY_PREFIX) -> None:
+        self.redis = redis
+        self.window_seconds = window_seconds
+        self.prefix = prefix
+
+    def first_view(self, video_id: int, user_id: str, now: Optional[float] = None) -> bool:
+        bucket = int((now if now is not None else time.time()) // self.window_seconds)
+        key = f"{self.prefix}:{video_id}:{bucket}"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.pfadd(key, user_id)
+        pipe.expire(key, self.window_seconds * 2)
+        added, _ = pipe.execute()
+        return bool(added)
+
+
+def get_view_counter() -> CounterBuffer:
+    """播放量的聚合写入缓冲区"""
+    return get_counter("video_views", Video.__table__.c.videoId, Video.__table__.c.viewCount)
+
+
+def get_share_counter() -> CounterBuffer:
+    """分享数的聚合写入缓冲区（分享接口只累加，后台批量写入 beatu_video.shareCount）"""
+    return get_counter("video_shares", Video.__table__.c.videoId, Video.__table__.c.shareCount)
+
+
+class ViewRecorder:
+    def __init__(self, dedup: MemoryViewDedup | RedisViewDedup) -> None:
+        self.dedup = dedup
+        self.recorded = 0
+        self.deduplicated = 0
+
+    def record(self, video_id: int, user_id: str) -> bool:
+        """记录一次播放，返回是否计入播放量。"""
+        if not self.dedup.first_view(video_id, user_id):
+            self.deduplicated += 1
+            return False
+        get_view_counter().add(video_id)
+        self.recorded += 1
+        return True
+
+    def view_count(self, db: Session, video_id: int) -> int:
+        """含尚未落库增量的播放量"""
+        video = db.get(Video, video_id)
+        return (video.viewCount if video else 0) + get_view_counter().pending(video_id)
+
+
+# 全局播放量记录器（单例模式）
+_view_recorder: Optional[ViewRecorder] = None
+
+
+def get_view_recorder() -> ViewRecorder:
+    """获取播放量记录器（延迟初始化，按配置选择内存或 Redis 去重）"""
+    global _view_recorder
+    if _view_recorder is None:
+        if settings.view_dedup_store == "redis":
+            from database.connection import get_redis
+
+            dedup = RedisViewDedup(get_redis(), settings.view_dedup_window_seconds)
+        else:
+            dedup = MemoryViewDedup(settings.view_dedup_window_seconds)
+        _view_recorder = ViewRecorder(dedup)
+    return _view_recorder
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database.models import Base, Comment, User, UserFollow, Video, VideoInteraction
+from database.query_counter import install_query_counter, track_queries
+
+
+@pytest.fixture(autouse=True)
+def reset_singletons(monkeypatch):
+    """进程级单例（热度榜等）在用例之间互不影响。"""
+    monkeypatch.setattr("services.ranking_service._popularity_ranking", None)
+    monkeypatch.setattr("services.item_cf_service._item_cf_table", None)
+    monkeypatch.setattr("services.image_post_service._image_post_catalog", None)
+    monkeypatch.setattr("services.feed_cache._feed_page_cache", None)
+    monkeypatch.setattr("services.counter_buffer._counters", {})
+    monkeypatch.setattr("services.ai_comment_queue._ai_comment_queue", None)
+    monkeypatch.setattr("services.follow_counts._follow_count_reconciler", None)
+    monkeypatch.setattr("services.view_counter._view_recorder", None)
+    monkeypatch.setattr("services.playback_rollups._playback_rollups", None)
+    monkeypatch.setattr("services.metrics_retention._metrics_retention", None)
+    monkeypatch.setattr("services.metrics_export._metrics_exporter", None)
+    monkeypatch.setattr("services.quality_engine._quality_engine", None)
+    from services.comment_service import hot_comments_cache
+    from services.following_feed import author_videos_cache
+    from services.user_service import all_users_cache
+    from services.video_media import rendition_cache
+
+    all_users_cache.invalidate()
+    hot_comments_cache.invalidate()
+    author_videos_cache.invalidate()
+    rendition_cache.invalidate()
+
+
+@pytest.fixture()
+def db_engine():
+    # StaticPool + check_same_thread=False：路由在线程池中执行时仍访问同一个内存库
+    engine = create_engine(
+        "sqlite:///:memory:",
+        future=True,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(engine)
+    install_query_counter(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def db_session(db_engine) -> Session:
+    TestingSession = sessionmaker(bind=db_engine)
+    with TestingSession() as session:
+        yield session
+
+
+@pytest.fixture()
+def seeded_session(db_session: Session) -> Session:
+    """3 位作者、6 条视频、若干互动/关注/评论的小型数据集，当前用户为 user_a。"""
+    db_session.add(User(userId="user_a", userName="Viewer", followerCount=0, followingCount=1))
+    for index in range(1, 4):
+        db_session.add(
+            User(
+                userId=f"author_{index}",
+                userName=f"Author {index}",
+                avatarUrl=f"https://cdn.beatu.com/avatar_{index}.jpg",
+                followerCount=1 if index == 1 else 0,
+                followingCount=0,
+            )
+        )
+    for video_id in range(1, 7):
+        db_session.add(
+            Video(
+                videoId=video_id,
+                playUrl=f"https://cdn.beatu.com/video_{video_id}.mp4",
+                coverUrl=f"https://cdn.beatu.com/video_{video_id}.jpg",
+                title=f"测试视频 {video_id}",
+                durationMs=1000 * video_id,
+                orientation="PORTRAIT" if video_id % 2 else "LANDSCAPE",
+                authorId=f"author_{(video_id - 1) % 3 + 1}",
+                likeCount=video_id,
+                commentCount=8 if video_id == 1 else 0,
+                favoriteCount=0,
+                viewCount=video_id * 100,
+            )
+        )
+    db_session.add(VideoInteraction(videoId=1, userId="user_a", isLiked=True, isFavorited=False))
+    db_session.add(VideoInteraction(videoId=2, userId="user_a", isLiked=False, isFavorited=True))
+    db_session.add(UserFollow(userId="user_a", authorId="author_1", isFollowed=True))
+    for index in range(8):
+        db_session.add(
+            Comment(
+                commentId=f"comment_{index}",
+                videoId=1,
+                authorId=f"author_{index % 3 + 1}",
+                content=f"评论 {index}",
+                createdAt=1_700_000_000_000 + index,
+                likeCount=0,
+            )
+        )
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture()
+def api_client(seeded_session: Session, monkeypatch):
+    """挂载 videos/users/metrics 路由、使用种子数据库的测试客户端（不加载 AI/MCP 路由）。"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from core.responses import ORJSONResponse
+    from database.connection import get_db
+    from routes.metrics import router as metrics_router
+    from routes.users import router as user_router
+    from routes.videos import router as video_router
+
+    # 后台任务（如 Feed 下一页预物化）自行打开会话，同样指向测试库
+    monkeypatch.setattr("database.connection.SessionLocal", sessionmaker(bind=seeded_session.get_bind(), future=True))
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(video_router, prefix="/api")
+    app.include_router(user_router, prefix="/api")
+    app.include_router(metrics_router, prefix="/api")
+    app.dependency_overrides[get_db] = lambda: seeded_session
+    return TestClient(app)
+
+
+@pytest.fixture()
+def query_budget():
+    """
+    断言代码块内的 SQL 查询预算：
+
+        with query_budget(5):
+            service.list_videos(...)
+
+    超过 max_queries 条，或任一语句形状重复超过 max_repeats 次（疑似 N+1）即失败。
+    """
+
+    @contextmanager
+    def _budget(max_queries: int, *, max_repeats: int = 1):
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= max_queries, f"查询预算 {max_queries} 被突破：{stats.describe()}"
+        repeated = stats.repeated_shapes(max_repeats)
+        assert not repeated, f"疑似 N+1（同一语句重复超过 {max_repeats} 次）：{stats.describe()}"
+
+    return _budget
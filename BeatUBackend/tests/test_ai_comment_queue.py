@@ -0,0 +1,199 @@
+import asyncio
+import json
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from database.models import Base, Comment
+from schemas.api import CommentAIRequest
+from services import ai_comment_queue
+from services.ai_comment_queue import AI_COMMENT_FALLBACK, AICommentJob, AICommentQueue
+from services.comment_service import AI_COMMENT_PLACEHOLDER, CommentService
+
+
+@pytest.fixture()
+def db_engine(tmp_path):
+    """
+    覆盖 conftest 中共用单个连接的内存库：worker 与流式接口各自打开 SessionLocal() 会话，
+    与生产一致地从连接池取得独立连接（文件库 + WAL，读写互不阻塞）。
+    """
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'beatu.db'}",
+        future=True,
+        connect_args={"check_same_thread": False, "timeout": 10},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, _record):
+        dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def worker_sessions(seeded_session: Session, monkeypatch):
+    """worker 在独立会话中回填评论，指向测试库；关闭重试退避等待"""
+    monkeypatch.setattr("database.connection.SessionLocal", sessionmaker(bind=seeded_session.get_bind(), future=True))
+    monkeypatch.setattr(ai_comment_queue, "RETRY_BACKOFF_SECONDS", 0)
+    return seeded_session
+
+
+def _placeholder(session: Session) -> str:
+    item = CommentService(session).create_ai_comment(1, CommentAIRequest(question="结局是什么？"), user_name="@元宝", pending=True)
+    assert item.is_pending and item.content == AI_COMMENT_PLACEHOLDER
+    return item.id
+
+
+def _run_jobs(queue: AICommentQueue, jobs):
+    async def _main():
+        for job in jobs:
+            queue.submit(job)
+        await queue._queue.join()
+        await queue.stop()
+
+    asyncio.run(_main())
+
+
+def test_worker_retries_and_fills_placeholder(worker_sessions: Session):
+    comment_id = _placeholder(worker_sessions)
+    calls = []
+
+    async def flaky(job: AICommentJob) -> str:
+        calls.append(job.comment_id)
+        if len(calls) == 1:
+            raise RuntimeError("model unavailable")
+        return f"回答：{job.question}"
+
+    queue = AICommentQueue(workers=1, max_pending=10, timeout_seconds=1, max_retries=2, generator=flaky)
+    _run_jobs(queue, [AICommentJob(comment_id=comment_id, video_id=1, question="结局是什么？")])
+
+    worker_sessions.expire_all()
+    comment = worker_sessions.get(Comment, comment_id)
+    assert comment.content == "回答：结局是什么？"
+    assert comment.isPending is False
+    assert queue.stats() == {
+        "workers": 1,
+        "queued": 0,
+        "pending": 0,
+        "submitted": 1,
+        "completed": 1,
+        "failed": 0,
+        "retries": 1,
+        "recovered": 0,
+    }
+
+
+def test_timeout_exhausts_retries_and_writes_fallback(worker_sessions: Session):
+    comment_id = _placeholder(worker_sessions)
+
+    async def slow(job: AICommentJob) -> str:
+        await asyncio.sleep(1)
+        return "太迟了"
+
+    queue = AICommentQueue(workers=1, max_pending=10, timeout_seconds=0.01, max_retries=1, generator=slow)
+    _run_jobs(queue, [AICommentJob(comment_id=comment_id, video_id=1, question="?")])
+
+    worker_sessions.expire_all()
+    comment = worker_sessions.get(Comment, comment_id)
+    assert comment.content == AI_COMMENT_FALLBACK
+    assert comment.isPending is False
+    assert (queue.failed, queue.retries) == (1, 1)
+
+
+def test_concurrency_is_bounded_by_worker_count(worker_sessions: Session):
+    comment_ids = [_placeholder(worker_sessions) for _ in range(5)]
+    active, peak = 0, 0
+
+    async def tracked(job: AICommentJob) -> str:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return "ok"
+
+    queue = AICommentQueue(workers=2, max_pending=10, timeout_seconds=1, max_retries=0, generator=tracked)
+    _run_jobs(queue, [AICommentJob(comment_id=cid, video_id=1, question="?") for cid in comment_ids])
+
+    assert peak == 2
+    assert queue.completed == 5
+
+
+def test_stop_drains_queued_jobs_within_bound(worker_sessions: Session):
+    comment_ids = [_placeholder(worker_sessions) for _ in range(3)]
+
+    async def quick(job: AICommentJob) -> str:
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def hung(job: AICommentJob) -> str:
+        await asyncio.sleep(10)
+        return "太迟了"
+
+    async def _main():
+        drained = AICommentQueue(workers=1, max_pending=10, timeout_seconds=1, max_retries=0, generator=quick)
+        for cid in comment_ids[:2]:
+            drained.submit(AICommentJob(comment_id=cid, video_id=1, question="?"))
+        await drained.stop(drain_seconds=5)
+        # 关闭中不再接收新任务
+        assert drained.busy()
+
+        stuck = AICommentQueue(workers=1, max_pending=10, timeout_seconds=30, max_retries=0, generator=hung)
+        stuck.submit(AICommentJob(comment_id=comment_ids[2], video_id=1, question="?"))
+        await asyncio.wait_for(stuck.stop(drain_seconds=0.05), 1)
+        return drained
+
+    drained = asyncio.run(_main())
+
+    assert drained.completed == 2
+    worker_sessions.expire_all()
+    assert [worker_sessions.get(Comment, cid).isPending for cid in comment_ids] == [False, False, True]
+
+
+def test_recover_orphans_only_fills_placeholders_past_max_job_age(worker_sessions: Session):
+    placeholder = _placeholder(worker_sessions)
+    created_at = worker_sessions.get(Comment, placeholder).createdAt
+    queue = AICommentQueue(
+        workers=1, max_pending=10, timeout_seconds=1, max_retries=1, drain_seconds=2, stream_timeout_seconds=5
+    )
+    # 2 次尝试 × 1s + 退避 0（测试中关闭）+ 流式等待 5s + 排空 2s
+    assert queue.orphan_age_seconds == 9
+
+    # 仍可能由存活的实例（滚动发布中的旧进程、其他 worker）在生成：不覆盖
+    assert asyncio.run(queue.recover_orphans(now_ms=created_at + 8000)) == 0
+    assert worker_sessions.get(Comment, placeholder).isPending is True
+
+    recovered = asyncio.run(queue.recover_orphans(now_ms=created_at + 10000))
+
+    worker_sessions.expire_all()
+    comment = worker_sessions.get(Comment, placeholder)
+    assert (recovered, comment.content, comment.isPending) == (1, AI_COMMENT_FALLBACK, False)
+    assert queue.stats()["recovered"] == 1
+
+
+def test_endpoint_returns_placeholder_and_stream_pushes_answer(api_client):
+    with api_client as client:
+        response = client.post("/api/videos/1/comments/ai", json={"question": "主角是谁？"})
+        placeholder = response.json()["data"]
+        assert placeholder["isPending"] is True
+        assert placeholder["content"] == AI_COMMENT_PLACEHOLDER
+
+        stream = client.get(f"/api/comments/{placeholder['id']}/stream")
+        assert stream.headers["content-type"].startswith("text/event-stream")
+        pushed = json.loads(stream.text.removeprefix("data: ").strip())
+
+    assert pushed["id"] == placeholder["id"]
+    assert pushed["isPending"] is False
+    assert "主角是谁？" in pushed["content"]
+
+
+def test_endpoint_rejects_unknown_video_and_busy_queue(api_client, monkeypatch):
+    with api_client as client:
+        assert client.post("/api/videos/999/comments/ai", json={"question": "?"}).status_code == 400
+        assert client.get("/api/comments/missing/stream").status_code == 404
+
+        monkeypatch.setattr(AICommentQueue, "busy", lambda self: True)
+        assert client.post("/api/videos/1/comments/ai", json={"question": "?"}).status_code == 503
@@ -0,0 +1,17 @@
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.bench_video_items import build_rows
+from schemas.api import VideoItem, VideoList, VideoQuality
+
+
+def test_trusted_payload_matches_validated_dump():
+    rows = build_rows(3)
+    rows[0]["qualities"] = [VideoQuality(label="720P", url="https://cdn.beatu.com/720.m3u8")]
+    rows[1]["imageUrls"] = ["https://cdn.beatu.com/image.jpg"]
+
+    validated = VideoList.create(items=[VideoItem(**row) for row in rows], total=3, page=1, limit=10)
+    trusted = VideoList.create(items=[VideoItem.trusted(**row) for row in rows], total=3, page=1, limit=10)
+
+    expected = jsonable_encoder(validated.model_dump(by_alias=True))
+    assert trusted.to_payload() == expected
+    assert validated.to_payload() == expected
@@ -0,0 +1,70 @@
+from sqlalchemy.orm import Session
+
+from database.init_db import MIGRATIONS
+from database.models import User
+from schemas.api import InteractionRequest
+from services.user_service import UserService
+from services.video_service import VideoService
+
+
+def _stats(session: Session, user_id: str):
+    session.expire_all()
+    user = session.get(User, user_id)
+    return user.videoCount, user.receivedLikeCount
+
+
+def _backfill(session: Session) -> None:
+    migration = next(m for m in MIGRATIONS if m.version == 4)
+    with session.get_bind().begin() as conn:
+        migration.upgrade(conn)
+
+
+def test_migration_backfills_author_aggregates(seeded_session: Session):
+    _backfill(seeded_session)
+
+    # author_1 发布视频 1、4（点赞 1 + 4），author_3 发布视频 3、6
+    assert _stats(seeded_session, "author_1") == (2, 5)
+    assert _stats(seeded_session, "author_3") == (2, 9)
+    assert _stats(seeded_session, "user_a") == (0, 0)
+
+
+def test_likes_update_author_aggregate_incrementally(seeded_session: Session):
+    _backfill(seeded_session)
+    service = VideoService(seeded_session)
+
+    service.like_video(3, InteractionRequest(action="LIKE"), user_id="user_a")
+    service.like_video(3, InteractionRequest(action="LIKE"), user_id="user_a")
+    assert _stats(seeded_session, "author_3") == (2, 10)
+
+    service.like_video(3, InteractionRequest(action="UNLIKE"), user_id="user_a")
+    assert _stats(seeded_session, "author_3") == (2, 9)
+
+    # 视频 1 已被 user_a 点赞：取消点赞时作者获赞数同步减少
+    service.like_video(1, InteractionRequest(action="UNLIKE"), user_id="user_a")
+    assert _stats(seeded_session, "author_1") == (2, 4)
+
+    item = UserService(seeded_session).get_user("author_1")
+    assert (item.video_count, item.likes_count) == (2, 4)
+
+
+def test_author_videos_page_by_cursor(seeded_session: Session, query_budget):
+    service = VideoService(seeded_session)
+
+    with query_budget(6):
+        first = service.list_author_videos("author_3", limit=1, cursor=None, user_id="user_a")
+    second = service.list_author_videos("author_3", limit=1, cursor=first.next_cursor, user_id="user_a")
+
+    assert [item.id for item in first.items] == [6]
+    assert (first.next_cursor, first.has_next) == (6, True)
+    assert [item.id for item in second.items] == [3]
+    assert second.next_cursor is None
+
+
+def test_user_videos_endpoint(api_client):
+    data = api_client.get("/api/users/author_1/videos", params={"limit": 5}, headers={"X-User-Id": "user_a"}).json()["data"]
+
+    assert [item["id"] for item in data["items"]] == [4, 1]
+    assert data["items"][1]["isLiked"] is True
+    assert data["hasNext"] is False
+
+    assert api_client.get("/api/users/nobody/videos").json()["data"]["items"] == []
@@ -0,0 +1,190 @@
+from sqlalchemy.orm import Session
+
+from database.models import Comment, CommentInteraction
+from database.query_counter import track_queries
+from schemas.api import CommentCreate
+from services.comment_service import CommentService, hot_comments_cache
+from services.counter_buffer import flush_counters
+
+
+def test_cursor_pages_walk_all_comments_in_order(seeded_session: Session):
+    service = CommentService(seeded_session)
+    seen, cursor = [], None
+    while True:
+        page = service.list_comments(1, limit=3, cursor=cursor)
+        seen.extend(item.id for item in page.items)
+        assert page.total == 8
+        if not page.has_next:
+            assert page.next_cursor is None
+            break
+        cursor = page.next_cursor
+
+    assert seen == [f"comment_{index}" for index in range(7, -1, -1)]
+
+
+def test_cursor_breaks_created_at_ties_by_comment_id(seeded_session: Session):
+    seeded_session.add_all(
+        [
+            Comment(commentId=f"tie_{suffix}", videoId=2, authorId="author_1", content="同一毫秒", createdAt=1, likeCount=0)
+            for suffix in "abc"
+        ]
+    )
+    seeded_session.commit()
+    service = CommentService(seeded_session)
+
+    first = service.list_comments(2, limit=2)
+    second = service.list_comments(2, limit=2, cursor=first.next_cursor)
+
+    assert [item.id for item in first.items + second.items] == ["tie_c", "tie_b", "tie_a"]
+
+
+def test_list_comments_does_not_count_rows(seeded_session: Session):
+    with track_queries() as stats:
+        CommentService(seeded_session).list_comments(1, limit=5)
+
+    assert stats.count == 3
+    assert not any("count(" in shape.lower() for shape in stats.shapes)
+
+
+def test_hot_first_page_is_cached_until_new_comment(seeded_session: Session, monkeypatch):
+    monkeypatch.setattr("core.config.settings.hot_comments_min_count", 5)
+    service = CommentService(seeded_session)
+
+    service.list_comments_payload(1, user_id="user_a")
+    with track_queries() as stats:
+        service.list_comments_payload(1, user_id="user_a")
+    # 命中缓存后只查询当前用户的点赞状态与本页最新点赞数
+    assert stats.count == 2 and hot_comments_cache.hits == 1
+
+    service.create_comment(1, CommentCreate(content="新评论"), user_id="user_a", user_name="Viewer")
+    payload = service.list_comments_payload(1)
+    assert payload["total"] == 9
+    assert payload["items"][0]["content"] == "新评论"
+
+
+def test_cached_hot_page_keeps_flushed_likes(seeded_session: Session, monkeypatch):
+    monkeypatch.setattr("core.config.settings.hot_comments_min_count", 5)
+    service = CommentService(seeded_session)
+    service.list_comments_payload(1)
+    hits = hot_comments_cache.hits
+
+    service.like_comment("comment_7", user_id="user_a", liked=True)
+    assert service.list_comments_payload(1)["items"][0]["likeCount"] == 1
+    # 增量落库后 pending 归零：缓存页仍按库中最新值展示，不回退到缓存时的 0
+    flush_counters(seeded_session)
+    assert service.list_comments_payload(1)["items"][0]["likeCount"] == 1
+    assert hot_comments_cache.hits == hits + 2
+
+
+def test_invalid_cursor_is_rejected(api_client):
+    response = api_client.get("/api/videos/1/comments", params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
+
+
+def _reply(service: CommentService, parent_id: str, content: str):
+    item = service.create_comment(1, CommentCreate(content=content, replyTo=parent_id), user_id="user_a", user_name="Viewer")
+    # 同一毫秒内创建的回复按随机 ID 排序，这里拉开时间保证断言顺序稳定
+    comment = service.db.get(Comment, item.id)
+    comment.createdAt = 1_800_000_000_000 + len(service.db.query(Comment).all())
+    service.db.commit()
+    return item
+
+
+def test_replies_are_threaded_under_root(seeded_session: Session, monkeypatch):
+    monkeypatch.setattr("core.config.settings.comment_reply_preview_size", 2)
+    service = CommentService(seeded_session)
+    first = _reply(service, "comment_7", "回复 1")
+    nested = _reply(service, first.id, "回复 2")
+    _reply(service, "comment_7", "回复 3")
+    _reply(service, "comment_5", "回复 4")
+
+    with track_queries() as stats:
+        page = service.list_comments(1, limit=3)
+
+    assert stats.count == 4
+    assert [item.id for item in page.items] == ["comment_7", "comment_6", "comment_5"]
+    root = page.items[0]
+    assert root.reply_count == 3
+    assert [reply.content for reply in root.replies] == ["回复 1", "回复 2"]
+    assert root.replies[1].parent_id == first.id and nested.root_id == "comment_7"
+    assert [reply.content for reply in page.items[2].replies] == ["回复 4"]
+    assert page.total == 12
+
+
+def test_list_replies_pages_forward(seeded_session: Session):
+    service = CommentService(seeded_session)
+    for index in range(5):
+        _reply(service, "comment_3", f"回复 {index}")
+
+    first = service.list_replies("comment_3", limit=3)
+    second = service.list_replies("comment_3", limit=3, cursor=first.next_cursor)
+
+    assert first.total == 5
+    assert [item.content for item in first.items + second.items] == [f"回复 {index}" for index in range(5)]
+    assert second.next_cursor is None
+
+
+def test_reply_to_unknown_comment_is_rejected(api_client):
+    response = api_client.post(
+        "/api/videos/1/comments",
+        json={"content": "hi", "replyTo": "missing"},
+        headers={"X-User-Id": "user_a"},
+    )
+
+    assert response.status_code == 400
+
+
+def test_comment_likes_are_idempotent_and_buffered(seeded_session: Session):
+    service = CommentService(seeded_session)
+    service.like_comment("comment_7", user_id="user_a", liked=True)
+    service.like_comment("comment_7", user_id="user_a", liked=True)
+
+    page = service.list_comments(1, limit=2, user_id="user_a")
+    assert [(item.id, item.is_liked, item.like_count) for item in page.items] == [
+        ("comment_7", True, 1),
+        ("comment_6", False, 0),
+    ]
+    # 增量尚未落库
+    assert seeded_session.get(Comment, "comment_7").likeCount == 0
+
+    flush_counters(seeded_session)
+    seeded_session.expire_all()
+    assert seeded_session.get(Comment, "comment_7").likeCount == 1
+    assert service.list_comments(1, limit=1, user_id="user_a").items[0].like_count == 1
+
+    service.like_comment("comment_7", user_id="user_a", liked=False)
+    assert service.list_comments(1, limit=1, user_id="user_a").items[0].like_count == 0
+
+
+def test_like_over_existing_unliked_row_sets_state(seeded_session: Session):
+    # 客户端同步来的待同步行：存在但未点赞
+    seeded_session.add(CommentInteraction(commentId="comment_7", userId="user_a", isLiked=False, isPending=True))
+    seeded_session.commit()
+    service = CommentService(seeded_session)
+
+    service.like_comment("comment_7", user_id="user_a", liked=True)
+    service.like_comment("comment_7", user_id="user_a", liked=True)
+
+    interaction = seeded_session.get(CommentInteraction, ("comment_7", "user_a"))
+    assert (interaction.isLiked, interaction.isPending) == (True, False)
+    item = service.list_comments(1, limit=1, user_id="user_a").items[0]
+    assert (item.id, item.is_liked, item.like_count) == ("comment_7", True, 1)
+
+    service.like_comment("comment_7", user_id="user_a", liked=False)
+    service.like_comment("comment_7", user_id="user_a", liked=False)
+    assert seeded_session.get(CommentInteraction, ("comment_7", "user_a")).isLiked is False
+    assert service.list_comments(1, limit=1, user_id="user_a").items[0].like_count == 0
+
+
+def test_like_endpoints_update_viewer_state(api_client):
+    headers = {"X-User-Id": "user_a"}
+    assert api_client.post("/api/comments/comment_6/like", headers=headers).status_code == 200
+    assert api_client.post("/api/comments/missing/like", headers=headers).status_code == 400
+
+    items = api_client.get("/api/videos/1/comments", params={"limit": 3}, headers=headers).json()["data"]["items"]
+    other = api_client.get("/api/videos/1/comments", params={"limit": 3}, headers={"X-User-Id": "author_1"}).json()["data"]["items"]
+
+    assert [item["isLiked"] for item in items] == [False, True, False]
+    assert [item["likeCount"] for item in items] == [0, 1, 0]
+    assert not any(item["isLiked"] for item in other)
@@ -0,0 +1,52 @@
+from sqlalchemy.orm import Session
+
+from database.models import Video
+from database.query_counter import track_queries
+from services.counter_buffer import flush_counters, get_counter
+
+
+def test_deltas_for_same_row_collapse_into_one_update(seeded_session: Session):
+    likes = get_counter("video_likes", Video.__table__.c.videoId, Video.__table__.c.likeCount)
+    for _ in range(5):
+        likes.add(1)
+    likes.add(2, 3)
+    likes.add(3, 1)
+    likes.add(3, -1)
+
+    assert likes.pending(1) == 5
+    with track_queries() as stats:
+        assert flush_counters(seeded_session) == 2
+
+    # 一次 executemany（不同 key 的参数在同一条语句中），外加提交
+    assert len([shape for shape in stats.shapes if shape.startswith("UPDATE")]) == 1
+    seeded_session.expire_all()
+    assert [seeded_session.get(Video, video_id).likeCount for video_id in (1, 2, 3)] == [6, 5, 3]
+    assert likes.pending(1) == 0
+
+
+def test_failed_flush_keeps_deltas_for_retry():
+    likes = get_counter("video_likes", Video.__table__.c.videoId, Video.__table__.c.likeCount)
+    likes.add(1, 2)
+
+    # 未绑定数据库的会话：执行失败，增量应放回缓冲区
+    flush_counters(Session(bind=None))
+
+    assert likes.pending(1) == 2
+
+
+def test_flushing_deltas_stay_visible_until_commit(seeded_session: Session, monkeypatch):
+    likes = get_counter("video_likes", Video.__table__.c.videoId, Video.__table__.c.likeCount)
+    likes.add(1, 2)
+    seen = []
+    commit = seeded_session.commit
+
+    def observed_commit():
+        # 已取出但尚未提交的增量仍计入 pending()
+        seen.append(likes.pending(1))
+        commit()
+
+    monkeypatch.setattr(seeded_session, "commit", observed_commit)
+    flush_counters(seeded_session)
+
+    assert seen == [2]
+    assert likes.pending(1) == 0
@@ -0,0 +1,73 @@
+import asyncio
+
+from core.responses import pre_encode
+from database.query_counter import track_queries
+from services.feed_cache import (
+    CachedFeedPage,
+    FeedPageCache,
+    FeedPageKey,
+    get_feed_page_cache,
+    materialize_next_page,
+)
+
+KEY = FeedPageKey("user_a", None, None, 2, 3)
+
+
+def test_take_is_one_shot_and_tracks_hit_ratio():
+    cache = FeedPageCache(ttl_seconds=60)
+    cache.put(KEY, CachedFeedPage(total=6, payload=pre_encode({"page": 2})))
+
+    assert cache.take(KEY).total == 6
+    assert cache.take(KEY) is None
+    assert cache.stats()["hitRatio"] == 0.5
+
+
+def test_expired_pages_are_misses():
+    cache = FeedPageCache(ttl_seconds=-1)
+    cache.put(KEY, CachedFeedPage(total=6, payload=pre_encode({})))
+
+    assert cache.take(KEY) is None
+
+
+def test_invalidation_discards_in_flight_materialization():
+    cache = FeedPageCache(ttl_seconds=60)
+    assert cache.claim(KEY)
+    assert not cache.claim(KEY)
+
+    cache.invalidate_user("user_a")
+    cache.put(KEY, CachedFeedPage(total=6, payload=pre_encode({})))
+    cache.release(KEY)
+
+    assert cache.take(KEY) is None
+
+
+def test_last_page_is_not_materialized():
+    asyncio.run(materialize_next_page(FeedPageKey("user_a", None, None, 2, 3), total=6))
+
+    assert get_feed_page_cache().materialized == 0
+
+
+def test_next_page_is_served_from_memory(api_client):
+    headers = {"X-User-Id": "user_a"}
+    first = api_client.get("/api/videos", params={"page": 1, "limit": 3}, headers=headers).json()["data"]
+
+    with track_queries() as stats:
+        second = api_client.get("/api/videos", params={"page": 2, "limit": 3}, headers=headers).json()["data"]
+
+    assert [hint["id"] for hint in first["prefetch"]] == [3, 2, 1]
+    assert [item["id"] for item in second["items"] if item["id"] < 900000] == [3, 2, 1]
+    # 命中预物化页面，不再查库；第 2 页已是最后一页，不会继续物化
+    assert stats.count == 0
+    assert api_client.get("/api/metrics/feed-cache").json()["data"]["hits"] == 1
+
+
+def test_interaction_invalidates_materialized_pages(api_client):
+    headers = {"X-User-Id": "user_a"}
+    api_client.get("/api/videos", params={"page": 1, "limit": 3}, headers=headers)
+    api_client.post("/api/videos/3/like", headers=headers)
+
+    second = api_client.get("/api/videos", params={"page": 2, "limit": 3}, headers=headers).json()["data"]
+
+    assert next(item for item in second["items"] if item["id"] == 3)["isLiked"] is True
+    stats = api_client.get("/api/metrics/feed-cache").json()["data"]
+    assert stats["hits"] == 0 and stats["misses"] == 2
@@ -0,0 +1,87 @@
+import asyncio
+
+from sqlalchemy.orm import Session
+
+from database.models import Video, WatchHistory
+from services.feed_pipeline import (
+    FeedContext,
+    FeedPipeline,
+    annotate_prefetch,
+    build_default_feed_pipeline,
+    filter_watched,
+    rank_by,
+    video_source,
+)
+from services.image_post_service import IMAGE_POST_ID_BASE
+from services.ranking_service import get_popularity_ranking
+from services.video_service import VideoService
+
+
+def run(pipeline: FeedPipeline, ctx: FeedContext):
+    return asyncio.run(pipeline.run(ctx))
+
+
+def test_source_fills_total_and_stages_compose(seeded_session: Session):
+    service = VideoService(seeded_session)
+    ctx = FeedContext(page=1, limit=4, user_id="user_a")
+    pipeline = FeedPipeline(video_source(service)).then(rank_by(lambda item: item.like_count))
+
+    items = run(pipeline, ctx)
+
+    assert ctx.total == 6
+    assert [item.id for item in items] == [3, 4, 5, 6]
+
+
+def test_filter_watched_drops_seen_videos(seeded_session: Session):
+    seeded_session.add_all(
+        [
+            WatchHistory(videoId=6, userId="user_a", lastPlayPositionMs=0, watchedAt=1),
+            WatchHistory(videoId=4, userId="user_a", lastPlayPositionMs=0, watchedAt=2),
+        ]
+    )
+    seeded_session.commit()
+    service = VideoService(seeded_session)
+    pipeline = FeedPipeline(video_source(service)).then(filter_watched(service))
+
+    items = run(pipeline, FeedContext(page=1, limit=4, user_id="user_a"))
+
+    assert [item.id for item in items] == [5, 3]
+
+
+def test_prefetch_lists_next_page_only_when_it_exists(seeded_session: Session):
+    service = VideoService(seeded_session)
+    pipeline = FeedPipeline(video_source(service)).then(annotate_prefetch(service))
+
+    first = FeedContext(page=1, limit=4, user_id="user_a")
+    run(pipeline, first)
+    last = FeedContext(page=2, limit=4, user_id="user_a")
+    run(pipeline, last)
+
+    assert [hint.id for hint in first.prefetch] == [2, 1]
+    assert last.prefetch == []
+
+
+def test_default_pipeline_ranks_by_popularity_and_filters_prefetch(seeded_session: Session, monkeypatch):
+    monkeypatch.setattr("services.feed_pipeline.settings.feed_filter_watched", True)
+    seeded_session.get(Video, 3).viewCount = 100000
+    seeded_session.add(WatchHistory(videoId=1, userId="user_a", lastPlayPositionMs=0, watchedAt=1))
+    seeded_session.commit()
+    get_popularity_ranking().refresh(seeded_session)
+    service = VideoService(seeded_session)
+    ctx = FeedContext(page=1, limit=4, user_id="user_a")
+
+    items = run(build_default_feed_pipeline(service), ctx)
+
+    assert [item.id for item in items if item.id < IMAGE_POST_ID_BASE] == [3, 6, 5, 4]
+    # 下一页的 1 已看过，会被过滤掉，预加载提示同样不包含
+    assert [hint.id for hint in ctx.prefetch] == [2]
+
+
+def test_videos_endpoint_returns_prefetch_section(api_client):
+    response = api_client.get("/api/videos", params={"page": 1, "limit": 3}, headers={"X-User-Id": "user_a"})
+    data = response.json()["data"]
+
+    video_ids = [item["id"] for item in data["items"] if item["id"] < IMAGE_POST_ID_BASE]
+    assert video_ids == [6, 5, 4]
+    assert [hint["id"] for hint in data["prefetch"]] == [3, 2, 1]
+    assert set(data["prefetch"][0]) == {"id", "coverUrl", "playUrl"}
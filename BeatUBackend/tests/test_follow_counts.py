@@ -0,0 +1,77 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from database.models import User, UserFollow
+from schemas.api import FollowRequest
+from services.follow_counts import FollowCountReconciler, count_follows
+from services.user_service import UserService
+from services.video_service import VideoService
+
+
+def _counts(session: Session, user_id: str):
+    session.expire_all()
+    user = session.get(User, user_id)
+    return user.followerCount, user.followingCount
+
+
+def test_follow_paths_update_counts_atomically(seeded_session: Session):
+    service = UserService(seeded_session)
+
+    service.follow_user("user_a", "author_2")
+    assert _counts(seeded_session, "author_2") == (1, 0)
+    assert _counts(seeded_session, "user_a") == (0, 2)
+
+    VideoService(seeded_session).follow_author(FollowRequest(authorId="author_2", action="UNFOLLOW"), user_id="user_a")
+    assert _counts(seeded_session, "author_2") == (0, 0)
+    assert _counts(seeded_session, "user_a") == (0, 1)
+
+    # 计数已是 0 的一方不会被减成负数
+    seeded_session.add(UserFollow(userId="author_3", authorId="author_1", isFollowed=True))
+    seeded_session.commit()
+    service.unfollow_user("author_3", "author_1")
+    assert _counts(seeded_session, "author_3") == (0, 0)
+    assert _counts(seeded_session, "author_1") == (0, 0)
+
+
+def test_count_follows_uses_one_grouped_aggregate(seeded_session: Session, query_budget):
+    seeded_session.add(UserFollow(userId="author_2", authorId="author_1", isFollowed=True))
+    seeded_session.add(UserFollow(userId="author_3", authorId="author_1", isFollowed=False))
+    seeded_session.commit()
+
+    with query_budget(1):
+        counts = count_follows(seeded_session, ["user_a", "author_1", "author_2", "author_3"])
+
+    assert counts == {"user_a": (0, 1), "author_1": (2, 0), "author_2": (0, 1)}
+
+
+def test_reconciler_fixes_drift_in_chunks_and_reports_it(seeded_session: Session):
+    seeded_session.execute(update(User).where(User.userId == "author_1").values(followerCount=5))
+    seeded_session.execute(update(User).where(User.userId == "author_3").values(followingCount=2))
+    seeded_session.execute(update(User).where(User.userId == "user_a").values(followingCount=0))
+    seeded_session.commit()
+    reconciler = FollowCountReconciler(chunk_size=2)
+
+    report = reconciler.run(seeded_session)
+
+    assert _counts(seeded_session, "author_1") == (1, 0)
+    assert _counts(seeded_session, "author_3") == (0, 0)
+    assert _counts(seeded_session, "user_a") == (0, 1)
+    assert report["scannedUsers"] == 4
+    assert report["driftedUsers"] == report["fixedUsers"] == 3
+    assert (report["followerDrift"], report["followingDrift"], report["maxDrift"]) == (4, 3, 4)
+
+    # 再跑一轮已无漂移
+    assert reconciler.run(seeded_session)["driftedUsers"] == 0
+    assert reconciler.stats()["runs"] == 2
+    assert reconciler.stats()["totalFixed"] == 3
+
+
+def test_reconciler_skips_rows_changed_since_read(seeded_session: Session):
+    """条件更新：读取后计数被并发修改的行不会被旧的聚合结果覆盖"""
+    reconciler = FollowCountReconciler()
+    corrections = [
+        {"b_user_id": "author_1", "b_old_followers": 7, "b_old_followings": 0, "b_followers": 1, "b_followings": 0}
+    ]
+
+    assert reconciler._apply(seeded_session, corrections) == 0
+    assert _counts(seeded_session, "author_1") == (1, 0)
@@ -0,0 +1,87 @@
+from sqlalchemy.orm import Session
+
+from database.models import User, UserFollow
+from services.follow_service import FollowService
+
+
+def _counts(session: Session, user_id: str):
+    session.expire_all()
+    user = session.get(User, user_id)
+    return user.followerCount, user.followingCount
+
+
+def test_set_follow_is_idempotent_and_reuses_existing_row(seeded_session: Session):
+    service = FollowService(seeded_session)
+
+    assert service.set_follow("user_a", "author_2", followed=True) is True
+    assert service.set_follow("user_a", "author_2", followed=True) is False
+    assert _counts(seeded_session, "author_2") == (1, 0)
+
+    assert service.set_follow("user_a", "author_2", followed=False) is True
+    assert service.set_follow("user_a", "author_2", followed=False) is False
+    assert service.set_follow("user_a", "author_3", followed=False) is False
+    assert _counts(seeded_session, "author_2") == (0, 0)
+
+    # 取关后再关注：切换已有行，不新增
+    assert service.set_follow("user_a", "author_2", followed=True) is True
+    assert seeded_session.query(UserFollow).filter(UserFollow.userId == "user_a").count() == 2
+    assert _counts(seeded_session, "user_a") == (0, 2)
+
+
+def test_following_ids_is_one_query(seeded_session: Session, query_budget):
+    service = FollowService(seeded_session)
+
+    with query_budget(1):
+        followed = service.following_ids("user_a", ["author_1", "author_2", "author_3"])
+
+    assert followed == {"author_1"}
+    assert service.following_ids(None, ["author_1"]) == set()
+
+
+def test_follower_list_pages_by_cursor_with_viewer_state(seeded_session: Session, query_budget):
+    seeded_session.add_all(
+        [
+            UserFollow(userId="author_2", authorId="author_1", isFollowed=True),
+            UserFollow(userId="author_3", authorId="author_1", isFollowed=False),
+            UserFollow(userId="user_a", authorId="author_2", isFollowed=True),
+        ]
+    )
+    seeded_session.commit()
+    service = FollowService(seeded_session)
+
+    with query_budget(3):
+        first = service.list_followers("author_1", limit=1, viewer_id="user_a")
+    second = service.list_followers("author_1", limit=1, cursor=first.next_cursor, viewer_id="user_a")
+
+    assert [(item.id, item.is_followed) for item in first.items] == [("author_2", True)]
+    assert first.has_next is True
+    assert [item.id for item in second.items] == ["user_a"]
+    assert second.next_cursor is None and second.has_next is False
+
+    followings = service.list_followings("user_a", viewer_id="user_a")
+    assert [item.id for item in followings.items] == ["author_1", "author_2"]
+    assert followings.items[0].followers_count == 1  # User 表中的冗余计数
+
+
+def test_follow_list_endpoints(api_client):
+    response = api_client.get("/api/users/author_1/followers", params={"limit": 5}, headers={"X-User-Id": "user_a"})
+    data = response.json()["data"]
+
+    assert [item["id"] for item in data["items"]] == ["user_a"]
+    assert data["items"][0]["isFollowed"] is False
+    assert data["nextCursor"] is None and data["hasNext"] is False
+
+    followings = api_client.get("/api/users/user_a/followings", headers={"X-User-Id": "user_a"}).json()["data"]
+    assert [(item["id"], item["isFollowed"]) for item in followings["items"]] == [("author_1", True)]
+
+    assert api_client.get("/api/users/author_1/followers", params={"cursor": "%%%"}).status_code == 400
+
+
+def test_legacy_and_user_follow_endpoints_share_one_path(api_client, seeded_session: Session):
+    api_client.post("/api/users/author_2/follow", headers={"X-User-Id": "user_a"})
+    legacy = api_client.post(
+        "/api/follow", json={"authorId": "author_2", "action": "FOLLOW"}, headers={"X-User-Id": "user_a"}
+    ).json()["data"]
+
+    assert legacy["message"] == "已关注"
+    assert _counts(seeded_session, "author_2") == (1, 0)
@@ -0,0 +1,73 @@
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import UserFollow
+from services.following_feed import FollowingFeedService, author_videos_cache
+
+
+def _follow_author_2(session: Session) -> None:
+    # 种子数据中 user_a 已关注 author_1（视频 1、4），再关注 author_2（视频 2、5）
+    session.add(UserFollow(userId="user_a", authorId="author_2", isFollowed=True))
+    session.add(UserFollow(userId="user_a", authorId="author_3", isFollowed=False))
+    session.commit()
+
+
+def _walk(service: FollowingFeedService, limit: int):
+    pages, cursor = [], None
+    while True:
+        page = service.list_following_videos("user_a", limit=limit, cursor=cursor)
+        pages.append([item.id for item in page.items])
+        if not page.has_next:
+            return pages
+        cursor = page.next_cursor
+
+
+def test_merges_followed_authors_by_video_id(seeded_session: Session, query_budget):
+    _follow_author_2(seeded_session)
+    service = FollowingFeedService(seeded_session)
+
+    with query_budget(8):
+        page = service.list_following_videos("user_a", limit=3)
+
+    assert [item.id for item in page.items] == [5, 4, 2]
+    assert all(item.is_followed_author for item in page.items)
+    assert (page.next_cursor, page.has_next) == (2, True)
+    assert _walk(service, limit=3) == [[5, 4, 2], [1]]
+
+
+def test_author_windows_are_cached(seeded_session: Session, query_budget):
+    _follow_author_2(seeded_session)
+    service = FollowingFeedService(seeded_session)
+    service.list_following_videos("user_a", limit=2)
+
+    assert author_videos_cache.get("author_1") == [4, 1]
+    # 作者窗口命中缓存：关注列表 + 视频行 + 渲染五条 IN 查询
+    with query_budget(7):
+        service.list_following_videos("user_a", limit=2)
+
+
+def test_pages_past_cached_window_fall_back_to_cursor_query(seeded_session: Session, monkeypatch):
+    _follow_author_2(seeded_session)
+    monkeypatch.setattr(settings, "following_feed_author_window", 1)
+
+    assert _walk(FollowingFeedService(seeded_session), limit=1) == [[5], [4], [2], [1]]
+
+
+def test_unknown_user_gets_empty_page(seeded_session: Session):
+    page = FollowingFeedService(seeded_session).list_following_videos("nobody", limit=5)
+
+    assert page.items == [] and page.next_cursor is None
+
+
+def test_following_endpoint(api_client):
+    response = api_client.get("/api/videos/following", params={"limit": 1}, headers={"X-User-Id": "user_a"})
+    data = response.json()["data"]
+
+    assert [item["id"] for item in data["items"]] == [4]
+    assert data["nextCursor"] == 4
+
+    data = api_client.get(
+        "/api/videos/following", params={"limit": 1, "cursor": 4}, headers={"X-User-Id": "user_a"}
+    ).json()["data"]
+    assert [item["id"] for item in data["items"]] == [1]
+    assert data["hasNext"] is False
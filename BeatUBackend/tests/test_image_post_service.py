@@ -0,0 +1,49 @@
+from sqlalchemy.orm import Session
+
+from database.models import ImagePost
+from services.image_post_service import IMAGE_POST_ID_BASE, ImagePostCatalog, interleave
+from services.video_service import VideoService
+
+
+def test_interleave_is_deterministic_and_keeps_order():
+    items = list(range(10))
+    mixed = interleave(items, ["a", "b"], seed=3)
+    assert mixed == interleave(items, ["a", "b"], seed=3)
+    assert len(mixed) == 12
+    assert [x for x in mixed if isinstance(x, int)] == items
+    assert [x for x in mixed if isinstance(x, str)] == ["a", "b"]
+
+
+def test_for_page_rotates_and_copies_templates():
+    catalog = ImagePostCatalog.defaults()
+    page_1 = catalog.for_page(1, 2)
+    page_2 = catalog.for_page(2, 2)
+
+    assert [post.id for post in page_1] == [IMAGE_POST_ID_BASE + 100, IMAGE_POST_ID_BASE + 101]
+    assert {post.title for post in page_1}.isdisjoint({post.title for post in page_2})
+    # 复制而非修改模板：再次取第 1 页结果不受第 2 页影响
+    assert [post.id for post in catalog.for_page(1, 2)] == [post.id for post in page_1]
+    assert catalog.for_page(3, 2)[1].title == catalog.for_page(1, 1)[0].title
+
+
+def test_catalog_loads_active_posts_from_table(db_session: Session):
+    db_session.add(ImagePost(postId=1, title="上架", imageUrls=["https://cdn.beatu.com/1.jpg"], isActive=True))
+    db_session.add(ImagePost(postId=2, title="下架", imageUrls=["https://cdn.beatu.com/2.jpg"], isActive=False))
+    db_session.commit()
+
+    catalog = ImagePostCatalog.from_db(db_session)
+    assert len(catalog) == 1
+    post = catalog.for_page(1, 2)[0]
+    assert post.title == "上架"
+    assert post.content_type == "IMAGE_POST"
+    assert post.to_payload()["coverUrl"] == "https://cdn.beatu.com/1.jpg"
+
+
+def test_build_mixed_feed_falls_back_to_defaults(seeded_session: Session):
+    service = VideoService(seeded_session)
+    page = service.list_videos(page=1, limit=4, orientation=None, channel=None, user_id="user_a")
+    mixed = service.build_mixed_feed(page=1, items=page.items)
+
+    assert len(mixed) == 6
+    assert [item.id for item in mixed if item.content_type == "VIDEO"] == [6, 5, 4, 3]
+    assert sum(item.content_type == "IMAGE_POST" for item in mixed) == 2
@@ -0,0 +1,117 @@
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.orm import Session
+
+from database.init_db import MIGRATIONS, migrate
+from database.models import Base
+from services.comment_service import CommentService
+from services.user_service import UserService
+from services.video_service import VideoService
+
+COMPOSITE_INDEXES = {
+    "idx_video_orientation_videoId",
+    "idx_comment_video_root_cursor",
+    "idx_comment_root_cursor",
+    "idx_follow_authorId_isFollowed",
+    "idx_follow_userId_isFollowed",
+}
+
+
+@contextmanager
+def captured_statements(engine):
+    """记录代码块内执行的 (SQL, 参数)，用于对真实查询做 EXPLAIN。"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def query_plans(session: Session, statements, predicate: str):
+    """对包含 predicate 条件的语句执行 EXPLAIN QUERY PLAN。"""
+    plans = []
+    for statement, parameters in statements:
+        if predicate in statement:
+            rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.append(" | ".join(row[-1] for row in rows))
+    return plans
+
+
+def test_migrations_add_indexes_to_existing_schema(db_engine):
+    with db_engine.begin() as conn:
+        for name in COMPOSITE_INDEXES:
+            conn.execute(text(f"DROP INDEX {name}"))
+
+    applied = migrate(db_engine)
+
+    indexes = {
+        index["name"]
+        for table in ("beatu_video", "beatu_comment", "beatu_user_follow")
+        for index in inspect(db_engine).get_indexes(table)
+    }
+    assert [version for version, _ in applied] == [m.version for m in MIGRATIONS]
+    assert COMPOSITE_INDEXES <= indexes
+    assert not {"idx_comment_videoId_createdAt", "idx_comment_video_cursor"} & indexes
+    assert migrate(db_engine) == []
+
+
+def test_migrations_add_reply_columns_to_legacy_comment_table():
+    engine = create_engine("sqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine, tables=[t for t in Base.metadata.sorted_tables if t.name != "beatu_comment"])
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                'CREATE TABLE beatu_comment ("commentId" VARCHAR(64) PRIMARY KEY, "videoId" BIGINT NOT NULL, '
+                '"authorId" VARCHAR(64) NOT NULL, content TEXT NOT NULL, "createdAt" BIGINT NOT NULL, '
+                '"likeCount" BIGINT NOT NULL, "isLiked" BOOLEAN NOT NULL, "isPending" BOOLEAN NOT NULL, '
+                '"authorAvatar" VARCHAR(500))'
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO beatu_comment VALUES ('c1', 1, 'author_1', 'old', 1, 0, 0, 0, NULL)"
+            )
+        )
+
+    migrate(engine)
+
+    columns = {column["name"] for column in inspect(engine).get_columns("beatu_comment")}
+    assert {"parentId", "rootId", "replyCount"} <= columns
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT "replyCount", "rootId" FROM beatu_comment')).one() == (0, None)
+
+
+def test_feed_query_uses_orientation_index(seeded_session: Session):
+    with captured_statements(seeded_session.get_bind()) as statements:
+        VideoService(seeded_session).list_videos(page=1, limit=3, orientation="portrait", channel=None, user_id="user_a")
+
+    plans = query_plans(seeded_session, statements, "beatu_video.orientation = ?")
+    assert plans and all("idx_video_orientation_videoId" in plan for plan in plans)
+    assert not any("TEMP B-TREE" in plan for plan in plans)
+
+
+def test_comment_list_uses_cursor_index(seeded_session: Session):
+    with captured_statements(seeded_session.get_bind()) as statements:
+        CommentService(seeded_session).list_comments(video_id=1, page=1, limit=5)
+
+    plans = query_plans(seeded_session, statements, "beatu_comment.\"videoId\" = ?")
+    assert plans and all("idx_comment_video_root_cursor" in plan for plan in plans)
+    assert not any("TEMP B-TREE" in plan for plan in plans)
+
+
+def test_follower_counts_use_covering_indexes(seeded_session: Session):
+    service = UserService(seeded_session)
+    with captured_statements(seeded_session.get_bind()) as statements:
+        service._count_followers("author_1")
+        service._count_followings("user_a")
+
+    plans = query_plans(seeded_session, statements, "beatu_user_follow.\"isFollowed\"")
+    assert len(plans) == 2
+    assert "COVERING INDEX idx_follow_authorId_isFollowed" in plans[0]
+    assert "COVERING INDEX idx_follow_userId_isFollowed" in plans[1]
@@ -0,0 +1,67 @@
+from sqlalchemy.orm import Session
+
+from database.models import WatchHistory
+from schemas.api import AIRecommendRequest
+from services import item_cf_service
+from services.ai_service import AIService
+from services.item_cf_service import ItemNeighbourTable, train_item_cf
+from services.ranking_service import get_popularity_ranking
+
+
+def seed_histories(session: Session) -> None:
+    watches = {
+        "u1": [1, 2],
+        "u2": [1, 2, 3],
+        "u3": [4, 5],
+        "u4": [4, 5],
+    }
+    for user_id, video_ids in watches.items():
+        for index, video_id in enumerate(video_ids):
+            session.add(WatchHistory(videoId=video_id, userId=user_id, lastPlayPositionMs=0, watchedAt=index))
+    session.commit()
+
+
+def test_train_builds_cosine_neighbours(seeded_session: Session):
+    seed_histories(seeded_session)
+    table = train_item_cf(seeded_session, top_n=2)
+
+    # 1、2 被同一批用户观看（user_a 还点赞 1、收藏 2），互为最近邻
+    assert table.neighbours(1)[0][0] == 2
+    assert [video_id for video_id, _ in table.neighbours(4)] == [5]
+    assert all(len(table.neighbours(video_id)) <= 2 for video_id in range(1, 7))
+    assert table.duration_ms(3) == 3000
+
+
+def test_table_roundtrip(seeded_session: Session, tmp_path):
+    seed_histories(seeded_session)
+    table = train_item_cf(seeded_session)
+    path = tmp_path / "item_cf.npz"
+    table.save(path)
+
+    loaded = ItemNeighbourTable.load(path)
+    assert len(loaded) == len(table)
+    assert [v for v, _ in loaded.neighbours(1)] == [v for v, _ in table.neighbours(1)]
+    assert loaded.duration_ms(6) == 6000
+
+
+def test_score_sums_weighted_similarity():
+    table = ItemNeighbourTable({1: [(2, 0.9), (3, 0.1)], 4: [(3, 0.8)]})
+    assert table.score({1: 1.0}, limit=2) == [2, 3]
+    assert table.score({1: 1.0, 4: 1.5}, limit=1) == [3]
+    assert table.score({1: 1.0}, exclude={2}) == [3]
+
+
+def test_recommend_uses_neighbours_then_popularity(seeded_session: Session, monkeypatch):
+    seed_histories(seeded_session)
+    monkeypatch.setattr(item_cf_service, "_item_cf_table", train_item_cf(seeded_session))
+    get_popularity_ranking().refresh(seeded_session)
+
+    payload = AIRecommendRequest(video_id=4, dwell_ms=5000, consumed_duration_ms=4000)
+    response = AIService(seeded_session).recommend(payload, user_id="viewer_new")
+
+    ids = [item.id for item in response.next_videos]
+    assert ids[0] == 5
+    assert 4 not in ids
+    # 近邻不足 5 条时由热度榜补齐
+    assert len(ids) == 5
+    assert "观看历史" in response.reason
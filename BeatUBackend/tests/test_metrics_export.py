@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy.orm import Session
+
+from database.models import InteractionMetric, PlaybackMetric
+from services.metrics_export import MetricsExporter, resolve_format
+
+DAY = date(2025, 3, 9)
+
+
+@pytest.fixture()
+def exporter(tmp_path, monkeypatch) -> MetricsExporter:
+    # 固定走 .npz，结果不依赖环境中是否安装 pyarrow
+    monkeypatch.setattr("services.metrics_export.pq", None)
+    return MetricsExporter(tmp_path, chunk_size=2)
+
+
+def _seed(session: Session) -> None:
+    start = datetime(2025, 3, 9, 23, 59, 58)
+    for index in range(5):
+        session.add(
+            PlaybackMetric(
+                video_id=index,
+                fps=None if index == 1 else 60.0,
+                start_up_ms=100 * index,
+                channel="recommend" if index % 2 else None,
+                created_at=start + timedelta(milliseconds=500 * index),
+            )
+        )
+    session.add(InteractionMetric(event="like", video_id=None, latency_ms=12, created_at=start))
+    session.commit()
+
+
+def _load(parts):
+    chunks = [np.load(path) for path in parts]
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0].files}
+
+
+def test_format_falls_back_to_npz_without_pyarrow(monkeypatch):
+    monkeypatch.setattr("services.metrics_export.pq", None)
+
+    assert resolve_format("auto") == "npz"
+    with pytest.raises(ValueError):
+        resolve_format("parquet")
+
+
+def test_export_day_writes_one_part_per_chunk(db_session: Session, exporter: MetricsExporter):
+    _seed(db_session)
+
+    assert exporter.export_day(db_session, "beatu_metrics_playback", DAY) == 4
+
+    parts = sorted(exporter.day_dir("beatu_metrics_playback", DAY).glob("part-*.npz"))
+    assert [path.name for path in parts] == ["part-00000.npz", "part-00001.npz"]
+    data = _load(parts)
+    assert data["video_id"].tolist() == [0, 1, 2, 3]
+    assert data["fps__null"].tolist() == [False, True, False, False]
+    assert data["channel"].tolist() == ["", "recommend", "", "recommend"]
+    assert data["channel__null"].tolist() == [True, False, True, False]
+    assert data["created_at"].dtype == np.dtype("datetime64[ms]")
+
+    # 第 5 条落在次日分区
+    next_day = exporter.export_day(db_session, "beatu_metrics_playback", DAY + timedelta(days=1))
+    assert next_day == 1
+
+
+def test_export_range_skips_finished_days(db_session: Session, exporter: MetricsExporter):
+    _seed(db_session)
+
+    first = exporter.export_range(db_session, DAY, DAY)
+    second = exporter.export_range(db_session, DAY, DAY)
+
+    assert first["tables"] == {"beatu_metrics_playback": {"2025-03-09": 4}, "beatu_metrics_interaction": {"2025-03-09": 1}}
+    assert second["tables"] == {"beatu_metrics_playback": {}, "beatu_metrics_interaction": {}}
+    assert exporter.stats()["exportedRows"] == 5
+    assert not list(exporter.output_dir.glob("*/.*.tmp"))
+
+    interaction = _load(exporter.day_dir("beatu_metrics_interaction", DAY).glob("part-*.npz"))
+    assert interaction["video_id__null"].tolist() == [True]
+
+    rerun = exporter.export_range(db_session, DAY, DAY, tables=["beatu_metrics_interaction"], overwrite=True)
+    assert rerun["tables"] == {"beatu_metrics_interaction": {"2025-03-09": 1}}
+
+
+def test_failed_overwrite_keeps_previous_export(db_session: Session, exporter: MetricsExporter, monkeypatch):
+    _seed(db_session)
+    exporter.export_day(db_session, "beatu_metrics_playback", DAY)
+    target = exporter.day_dir("beatu_metrics_playback", DAY)
+    before = sorted(path.name for path in target.iterdir())
+
+    def broken(path, columns, arrays):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("services.metrics_export._write_npz", broken)
+    with pytest.raises(OSError):
+        exporter.export_day(db_session, "beatu_metrics_playback", DAY, overwrite=True)
+
+    # 新数据写入失败：已完成的旧导出原样保留，不残留 staging/备份目录
+    assert sorted(path.name for path in target.iterdir()) == before
+    assert [path.name for path in target.parent.iterdir()] == [target.name]
+
+    monkeypatch.undo()
+    monkeypatch.setattr("services.metrics_export.pq", None)
+    assert exporter.export_day(db_session, "beatu_metrics_playback", DAY, overwrite=True) == 4
+    assert [path.name for path in target.parent.iterdir()] == [target.name]
@@ -0,0 +1,71 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from database.init_db import migrate
+from database.models import InteractionMetric, PlaybackMetric, PlaybackRollup
+from database.partitions import day_partitions_sql, to_days
+from services.metrics_retention import MetricsRetention
+from services.playback_rollups import _new_row
+
+NOW = datetime(2025, 3, 10, 12, 0, 0)
+
+
+def test_to_days_matches_mysql():
+    # SELECT TO_DAYS('2000-01-01') => 730485
+    assert to_days(date(2000, 1, 1)) == 730485
+    assert day_partitions_sql(date(2025, 3, 10), date(2025, 3, 11)) == [
+        f"PARTITION p20250310 VALUES LESS THAN ({to_days(date(2025, 3, 11))})",
+        f"PARTITION p20250311 VALUES LESS THAN ({to_days(date(2025, 3, 12))})",
+    ]
+    assert day_partitions_sql(date(2025, 3, 12), date(2025, 3, 11)) == []
+
+
+def test_expired_rows_are_deleted_in_batches_without_partitions(db_session: Session):
+    for days_ago in (40, 35, 31, 29, 1):
+        created_at = NOW - timedelta(days=days_ago)
+        db_session.add(PlaybackMetric(video_id=1, start_up_ms=100, created_at=created_at))
+        db_session.add(InteractionMetric(event="like", video_id=1, created_at=created_at))
+    db_session.commit()
+    retention = MetricsRetention(retention_days=30, batch_size=2)
+
+    report = retention.run(db_session, now=NOW)
+
+    assert report["tables"]["beatu_metrics_playback"]["deletedRows"] == 3
+    assert report["tables"]["beatu_metrics_interaction"]["deletedRows"] == 3
+    assert db_session.query(PlaybackMetric).count() == 2
+    assert retention.stats()["totalDeletedRows"] == 6
+    assert retention.run(db_session, now=NOW)["tables"]["beatu_metrics_playback"]["deletedRows"] == 0
+
+
+def test_expired_rollups_are_deleted_per_granularity(db_session: Session):
+    for granularity, days_ago in (("minute", 8), ("minute", 6), ("hour", 91), ("hour", 8)):
+        db_session.add(_new_row((granularity, NOW - timedelta(days=days_ago), "channel", "recommend")))
+    db_session.commit()
+    retention = MetricsRetention(retention_days=30, rollup_retention_days={"minute": 7, "hour": 90})
+
+    report = retention.run(db_session, now=NOW)
+
+    assert report["tables"]["beatu_metrics_playback_rollup"]["deletedRows"] == 2
+    remaining = {(row.granularity, (NOW - row.bucket_start).days) for row in db_session.query(PlaybackRollup)}
+    assert remaining == {("minute", 6), ("hour", 8)}
+
+
+def test_migration_adds_created_at_indexes(db_engine):
+    with db_engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_metric_playback_created_at"))
+        conn.execute(text("DROP INDEX idx_metric_interaction_created_at"))
+
+    migrate(db_engine)
+
+    assert "idx_metric_playback_created_at" in {i["name"] for i in inspect(db_engine).get_indexes("beatu_metrics_playback")}
+    assert "idx_metric_interaction_created_at" in {
+        i["name"] for i in inspect(db_engine).get_indexes("beatu_metrics_interaction")
+    }
+
+
+def test_retention_stats_endpoint(api_client):
+    data = api_client.get("/api/metrics/retention").json()["data"]
+
+    assert data["runs"] == 0 and data["retentionDays"] == 30
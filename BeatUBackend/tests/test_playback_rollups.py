@@ -0,0 +1,121 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import Session
+
+from database.models import PlaybackRollup
+from services.playback_rollups import PlaybackAggregate, PlaybackRollups, from_epoch_ms, get_playback_rollups, to_epoch_ms
+
+T0 = datetime(2025, 1, 1, 8, 0, 10)
+
+
+def _observe(rollups: PlaybackRollups, minute: int, start_up_ms: int, channel: str = "recommend") -> None:
+    rollups.observe(7, channel, T0.replace(minute=minute), fps=60, start_up_ms=start_up_ms, rebuffer_count=1, memory_mb=100)
+
+
+def test_histogram_percentiles():
+    aggregate = PlaybackAggregate()
+    for value in [80] * 50 + [450] * 45 + [4000] * 5:
+        aggregate.observe(None, value, None, None)
+
+    stats = aggregate.summary()
+    assert 50 <= stats["start_up_ms_p50"] <= 100
+    assert 400 <= stats["start_up_ms_p95"] <= 500
+    assert stats["start_up_ms_avg"] == 442.5
+    assert stats["fps_avg"] is None
+
+
+def test_flush_merges_into_existing_rows(db_session: Session, query_budget):
+    rollups = PlaybackRollups()
+    _observe(rollups, 0, 100)
+    _observe(rollups, 1, 300)
+
+    # 频道：分钟 ×2、小时 ×1；视频只有小时 ×1
+    assert rollups.flush(db_session) == 4
+    _observe(rollups, 1, 500)
+    with query_budget(3):
+        assert rollups.flush(db_session) == 3
+
+    assert db_session.query(PlaybackRollup).count() == 4
+    hour = rollups.query(db_session, "hour", "video", "7", T0.replace(minute=0), T0.replace(minute=59))
+    assert [(at, aggregate.sample_count) for at, aggregate in hour] == [(T0.replace(second=0), 3)]
+    assert hour[0][1].summary()["start_up_ms_avg"] == 300.0
+
+
+def test_query_includes_pending_increments(db_session: Session):
+    rollups = PlaybackRollups()
+    _observe(rollups, 0, 100)
+    rollups.flush(db_session)
+    _observe(rollups, 0, 200)
+    _observe(rollups, 0, 200, channel="follow")
+
+    minutes = rollups.query(db_session, "minute", "channel", "recommend", T0.replace(minute=0), T0.replace(minute=5))
+
+    assert len(minutes) == 1
+    assert minutes[0][1].sample_count == 2
+    assert minutes[0][1].rebuffer_sum == 2
+
+
+def test_unknown_channels_and_video_minutes_are_not_rolled_up(db_session: Session):
+    rollups = PlaybackRollups()
+    for channel in ("recommend", "spam-1", "spam-2", None):
+        _observe(rollups, 0, 100, channel=channel)
+    rollups.flush(db_session)
+
+    keys = {(row.granularity, row.dimension, row.dimension_key) for row in db_session.query(PlaybackRollup)}
+    assert keys == {
+        ("minute", "channel", "recommend"),
+        ("hour", "channel", "recommend"),
+        ("minute", "channel", "unknown"),
+        ("hour", "channel", "unknown"),
+        ("hour", "video", "7"),
+    }
+    unknown = rollups.query(db_session, "minute", "channel", "unknown", T0.replace(minute=0), T0.replace(minute=5))
+    assert unknown[0][1].sample_count == 3
+    with pytest.raises(ValueError):
+        rollups.query(db_session, "minute", "video", "7", T0.replace(minute=0), T0.replace(minute=5))
+
+
+def test_query_includes_batch_being_flushed(db_session: Session):
+    seen = []
+
+    class QueryDuringFlush(PlaybackRollups):
+        def _load_rows(self, db, keys):
+            # 增量已从 _pending 取出、尚未提交：查询结果不应出现空洞
+            seen.append(self.query(db, "hour", "video", "7", T0.replace(minute=0), T0.replace(minute=59)))
+            return super()._load_rows(db, keys)
+
+    rollups = QueryDuringFlush()
+    _observe(rollups, 0, 100)
+    rollups.flush(db_session)
+
+    assert [(at, aggregate.sample_count) for at, aggregate in seen[0]] == [(T0.replace(second=0), 1)]
+    assert rollups._in_flight == []
+
+
+def test_playback_ingestion_feeds_rollups_and_query_endpoint(api_client, db_session: Session):
+    for start_up_ms in (120, 180, 900):
+        api_client.post("/api/metrics/playback", json={"videoId": 3, "startUpMs": start_up_ms, "fps": 30, "channel": "recommend"})
+
+    data = api_client.get("/api/metrics/playback/rollups", params={"key": "recommend"}).json()["data"]
+    assert data["summary"]["count"] == 3
+    assert data["summary"]["startUpMsAvg"] == 400.0
+    assert len(data["buckets"]) in (1, 2)  # 跨分钟边界时分布在相邻两个桶
+
+    get_playback_rollups().flush(db_session)
+    data = api_client.get(
+        "/api/metrics/playback/rollups", params={"key": "3", "dimension": "video", "granularity": "hour"}
+    ).json()["data"]
+    assert data["summary"]["count"] == 3
+    assert data["summary"]["fpsAvg"] == 30.0
+
+    too_wide = {"key": "recommend", "start": 0, "end": to_epoch_ms(T0)}
+    assert api_client.get("/api/metrics/playback/rollups", params=too_wide).status_code == 400
+
+
+def test_out_of_range_timestamps_are_rejected(api_client):
+    for params in ({"start": 10**20}, {"end": -1}, {"start": 10**20, "end": 10**20 + 1}):
+        response = api_client.get("/api/metrics/playback/rollups", params={"key": "recommend", **params})
+        assert response.status_code in (400, 422)
+    with pytest.raises(ValueError):
+        from_epoch_ms(10**20)
@@ -0,0 +1,86 @@
+import time
+
+from sqlalchemy.orm import Session
+
+from schemas.api import AIQualityRequest
+from services.ai_service import AIService
+from services.quality_engine import DEFAULT_LADDER, QoEStats, QualityEngine, Rendition, device_class, get_quality_engine
+
+NORMAL_DEVICE = {"cpuLoad": 0.3, "temperature": 35, "batteryLevel": 0.8}
+
+
+def test_bandwidth_is_smoothed_per_user():
+    engine = QualityEngine(bandwidth_alpha=0.5, safety_factor=1.0, cache_ttl_seconds=0)
+
+    assert engine.decide("u1", {"bandwidthKbps": 6000}, NORMAL_DEVICE).label == "1080P"
+    # 单次测速骤降只把估计拉到一半：6000 -> 3500
+    decision = engine.decide("u1", {"bandwidthKbps": 1000}, NORMAL_DEVICE)
+    assert (decision.label, decision.budget_kbps) == ("720P", 3500)
+    # 其他用户互不影响；没有任何带宽数据时交给播放器
+    assert engine.decide("u2", {}, NORMAL_DEVICE).label == "AUTO"
+
+
+def test_recent_rebuffers_and_constrained_devices_tighten_budget():
+    engine = QualityEngine(safety_factor=1.0, cache_ttl_seconds=0)
+    for _ in range(100):
+        engine.observe_playback("recommend", None, rebuffer_count=2, start_up_ms=800)
+
+    assert engine.decide("u1", {"bandwidthKbps": 9000}, NORMAL_DEVICE, channel="follow").label == "4K"
+    # 平均每次播放卡顿约 2 次：可用码率收紧到下限 50%（4500kbps）
+    assert engine.decide("u1", {"bandwidthKbps": 9000}, NORMAL_DEVICE, channel="recommend").label == "720P"
+    assert engine.decide("u1", {"bandwidthKbps": 9000}, {"temperature": 45}).budget_kbps == 2500
+    assert device_class({"batteryLevel": 0.1}) == "constrained"
+    assert device_class({"deviceClass": "constrained"}) == "constrained"
+
+
+def test_untrusted_device_and_channel_values_are_normalized():
+    # 无法解析的设备状态视为未上报；未知的声明档位按设备状态判断
+    assert device_class({"cpuLoad": "85%", "temperature": "hot", "batteryLevel": None}) == "normal"
+    assert device_class({"cpuLoad": "0.9"}) == "constrained"
+    assert device_class({"deviceClass": "tv", "batteryLevel": 0.1}) == "constrained"
+    assert device_class({"deviceClass": ["x"]}) == "normal"
+
+    engine = QualityEngine()
+    for index in range(100):
+        engine.observe_playback(f"channel-{index}", f"device-{index}", rebuffer_count=1, start_up_ms=None)
+    assert list(engine.stats()["qoe"]) == ["unknown/normal"]
+
+    stats = QoEStats(max_keys=2)
+    for key in ("a", "b", "a", "c"):
+        stats.observe(key, "normal", 1, None)
+    assert list(stats.snapshot()) == ["a/normal", "c/normal"]
+
+
+def test_budget_is_cached_per_network_class_and_picks_from_renditions():
+    engine = QualityEngine(bandwidth_alpha=1.0, safety_factor=1.0, cache_ttl_seconds=60)
+    renditions = (Rendition("540P", 1800), Rendition("HD", 3000))
+
+    assert engine.decide("u1", {"bandwidthKbps": 5000}, NORMAL_DEVICE, renditions).label == "HD"
+    # 仍在 good 档位：复用缓存的可用码率（5000），不随测速小幅波动
+    assert engine.decide("u1", {"bandwidthKbps": 4100}, NORMAL_DEVICE).budget_kbps == 5000
+    # 降到 poor 档位：重新计算；低于最低档时取最低档
+    assert engine.decide("u1", {"bandwidthKbps": 1000}, NORMAL_DEVICE, renditions).label == "540P"
+    assert engine.stats()["budgetCacheHits"] == 1
+
+
+def test_decision_is_fast():
+    engine = QualityEngine()
+    engine.decide("u1", {"bandwidthKbps": 5000}, NORMAL_DEVICE)
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        engine.decide("u1", {"bandwidthKbps": 5000}, NORMAL_DEVICE, DEFAULT_LADDER)
+    assert (time.perf_counter() - started) / 1000 < 0.001
+
+
+def test_ai_service_and_playback_metrics_feed_the_engine(db_session: Session, api_client):
+    api_client.post("/api/metrics/playback", json={"videoId": 1, "rebufferCount": 3, "channel": "recommend"})
+    assert "recommend/normal" in get_quality_engine().stats()["qoe"]
+
+    response = AIService(db_session).quality(
+        AIQualityRequest(video_id=1, network_stats={"bandwidthKbps": 9000}, device_stats=NORMAL_DEVICE),
+        user_id="user_a",
+    )
+
+    assert (response.quality, response.bitrate, response.resolution) == ("1080P", 5000, "1920x1080")
+    assert "9000kbps" in response.reason
@@ -0,0 +1,100 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from core.middleware import QueryCountMiddleware
+from database.query_counter import QueryStats, normalize_statement, track_queries
+from schemas.api import AIRecommendRequest, CommentCreate
+from services.ai_service import AIService
+from services.comment_service import CommentService
+from services.ranking_service import get_popularity_ranking
+from services.user_service import UserService
+from services.video_service import VideoService
+
+
+def test_normalize_statement_collapses_in_lists():
+    sqlite_shape = normalize_statement("SELECT * FROM t WHERE id IN (?, ?,\n ?)")
+    mysql_shape = normalize_statement("SELECT * FROM t WHERE id IN (%(id_1_1)s, %(id_1_2)s)")
+    assert sqlite_shape == "SELECT * FROM t WHERE id IN (?)"
+    assert mysql_shape == "SELECT * FROM t WHERE id IN (?)"
+
+
+def test_repeated_shapes_flags_n_plus_one():
+    stats = QueryStats()
+    for _ in range(6):
+        stats.record("SELECT * FROM beatu_user WHERE userId = ?", 0.1)
+    stats.record("SELECT * FROM beatu_video", 0.1)
+    assert stats.count == 7
+    assert stats.repeated_shapes(5) == [("SELECT * FROM beatu_user WHERE userId = ?", 6)]
+
+
+def test_track_queries_counts_engine_statements(seeded_session: Session):
+    with track_queries() as stats:
+        UserService(seeded_session).get_all_users()
+    assert stats.count == 1
+    assert stats.total_ms >= 0
+
+
+def test_middleware_reports_query_count(seeded_session: Session):
+    app = FastAPI()
+    app.add_middleware(QueryCountMiddleware)
+
+    def get_session() -> Session:
+        return seeded_session
+
+    @app.get("/users")
+    def list_users(db: Session = Depends(get_session)):
+        return {"total": len(UserService(db).get_all_users())}
+
+    response = TestClient(app).get("/users")
+    assert response.status_code == 200
+    assert response.headers["X-Query-Count"] == "1"
+
+
+def test_list_videos_budget(seeded_session: Session, query_budget):
+    service = VideoService(seeded_session)
+    # count + 分页 + 互动 + 关注 + 作者 + 清晰度档位 + 标签
+    with query_budget(7):
+        service.list_videos(page=1, limit=10, orientation=None, channel=None, user_id="user_a")
+
+
+def test_search_videos_budget(seeded_session: Session, query_budget):
+    with query_budget(7):
+        VideoService(seeded_session).search_videos(query="测试", page=1, limit=10, user_id="user_a")
+
+
+def test_get_video_budget(seeded_session: Session, query_budget):
+    with query_budget(6):
+        VideoService(seeded_session).get_video(1, user_id="user_a")
+
+
+def test_list_comments_budget(seeded_session: Session, query_budget):
+    # count + 分页 + 作者
+    with query_budget(3):
+        CommentService(seeded_session).list_comments(video_id=1, page=1, limit=20)
+
+
+def test_create_comment_budget(seeded_session: Session, query_budget):
+    service = CommentService(seeded_session)
+    # 视频 + 作者 + INSERT + UPDATE commentCount
+    with query_budget(4):
+        service.create_comment(1, CommentCreate(content="好看"), user_id="user_a", user_name="Viewer")
+
+
+def test_get_all_users_budget(seeded_session: Session, query_budget):
+    with query_budget(1):
+        UserService(seeded_session).get_all_users()
+
+
+def test_recommend_budget(seeded_session: Session, query_budget):
+    payload = AIRecommendRequest(video_id=1, dwell_ms=1000, consumed_duration_ms=1000)
+    get_popularity_ranking().refresh(seeded_session)
+    # 最近观看种子 + 候选中已看过的 + 候选视频 + 互动 + 关注 + 作者 + 清晰度档位 + 标签，与推荐条数、观看历史长度无关
+    with query_budget(8):
+        response = AIService(seeded_session).recommend(payload, user_id="user_a")
+
+    items = {item.id: item for item in response.next_videos}
+    assert 1 not in items
+    assert items[2].is_favorited is True
+    assert items[4].is_followed_author is True
+    assert items[4].author_name == "Author 1"
@@ -0,0 +1,63 @@
+from sqlalchemy.orm import Session
+
+from database.models import Video, WatchHistory
+from schemas.api import AIRecommendRequest
+from services.ai_service import AIService
+from services.ranking_service import PopularityRanking, get_popularity_ranking
+
+
+def test_refresh_orders_by_weighted_score(seeded_session: Session):
+    ranking = PopularityRanking(top_k=3, chunk_size=2)
+    assert ranking.refresh(seeded_session, now=0) == 6
+    # viewCount = id * 100、likeCount = id，分数随 id 单调递增
+    assert ranking.top(10) == [6, 5, 4]
+
+
+def test_top_skips_excluded_videos(seeded_session: Session):
+    ranking = PopularityRanking()
+    ranking.refresh(seeded_session, now=0)
+    assert ranking.top(3, exclude={6, 4}) == [5, 3, 2]
+
+
+def test_old_scores_decay_and_new_engagement_wins(seeded_session: Session):
+    ranking = PopularityRanking(half_life_hours=1)
+    ranking.refresh(seeded_session, now=0)
+
+    seeded_session.get(Video, 1).likeCount += 200
+    seeded_session.commit()
+    # 两个半衰期后旧分数降为 1/4，新增的 200 个点赞直接计入
+    ranking.refresh(seeded_session, now=2 * 3600)
+    assert ranking.top(1) == [1]
+
+
+def test_recommend_excludes_current_and_watched(seeded_session: Session):
+    seeded_session.add(WatchHistory(videoId=5, userId="user_a", lastPlayPositionMs=0, watchedAt=1))
+    seeded_session.commit()
+    get_popularity_ranking().refresh(seeded_session)
+
+    payload = AIRecommendRequest(video_id=6, dwell_ms=1000, consumed_duration_ms=1000)
+    response = AIService(seeded_session).recommend(payload, user_id="user_a")
+    assert [item.id for item in response.next_videos] == [4, 3, 2, 1]
+
+
+def test_recommend_excludes_watched_beyond_history_seeds(seeded_session: Session, monkeypatch):
+    # 只取最近 1 条观看作为种子；更早看过的视频由候选上的 IN 查询剔除
+    monkeypatch.setattr("services.ai_service.HISTORY_SEEDS", 1)
+    seeded_session.add(WatchHistory(videoId=5, userId="user_a", lastPlayPositionMs=0, watchedAt=1))
+    seeded_session.add(WatchHistory(videoId=4, userId="user_a", lastPlayPositionMs=0, watchedAt=2))
+    seeded_session.commit()
+    get_popularity_ranking().refresh(seeded_session)
+
+    payload = AIRecommendRequest(video_id=6, dwell_ms=1000, consumed_duration_ms=1000)
+    response = AIService(seeded_session).recommend(payload, user_id="user_a")
+    assert [item.id for item in response.next_videos] == [3, 2, 1]
+
+
+def test_recommend_on_cold_ranking_does_not_build_it_inline(seeded_session: Session, query_budget):
+    # 热度榜由后台任务构建：请求路径上不扫描全部视频，榜单未就绪时退化为按主键取前几条
+    payload = AIRecommendRequest(video_id=6, dwell_ms=1000, consumed_duration_ms=1000)
+    with query_budget(8):
+        response = AIService(seeded_session).recommend(payload, user_id="user_a")
+
+    assert not get_popularity_ranking().ready
+    assert [item.id for item in response.next_videos] == [1, 2, 3, 4, 5]
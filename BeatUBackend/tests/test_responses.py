@@ -0,0 +1,70 @@
+import time
+
+import orjson
+from sqlalchemy.orm import Session
+
+from core.responses import EncodedCache, ORJSONResponse, pre_encode
+from schemas.api import UserItem, success_response
+
+
+def test_orjson_response_embeds_fragments_and_models():
+    user = UserItem(id="u1", userName="Tester", name="Tester", avatarUrl="https://cdn.beatu.com/a.jpg")
+    body = ORJSONResponse(success_response({"cached": pre_encode([1, 2]), "user": user})).body
+
+    data = orjson.loads(body)
+    assert data["data"]["cached"] == [1, 2]
+    assert data["data"]["user"]["avatarUrl"] == "https://cdn.beatu.com/a.jpg"
+
+
+def test_encoded_cache_expires_and_invalidates():
+    cache = EncodedCache(ttl_seconds=0.05)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cache.get_or_encode("k", build) is cache.get_or_encode("k", build)
+    assert len(calls) == 1
+    cache.invalidate("k")
+    cache.get_or_encode("k", build)
+    time.sleep(0.06)
+    cache.get_or_encode("k", build)
+    assert len(calls) == 3
+    assert cache.hits == 1
+
+
+def test_encoded_cache_with_zero_ttl_always_rebuilds():
+    cache = EncodedCache(ttl_seconds=0)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return len(calls)
+
+    cache.get_or_encode("k", build)
+    cache.get_or_encode("k", build)
+    assert len(calls) == 2
+
+
+def test_users_endpoint_serves_cached_payload(api_client, seeded_session: Session):
+    first = api_client.get("/api/users").json()
+    assert first["code"] == 0
+    assert {user["id"] for user in first["data"]} == {"user_a", "author_1", "author_2", "author_3"}
+
+    followers = {user["id"]: user["followersCount"] for user in first["data"]}
+    assert followers["author_2"] == 0
+    # 关注后缓存失效，列表中的粉丝数随之更新
+    api_client.post("/api/users/author_2/follow", headers={"X-User-Id": "user_a"})
+    second = api_client.get("/api/users").json()
+    assert {user["id"]: user["followersCount"] for user in second["data"]}["author_2"] == 1
+
+
+def test_videos_endpoint_uses_orjson_payload(api_client):
+    response = api_client.get("/api/videos", params={"page": 1, "limit": 3}, headers={"X-User-Id": "user_a"})
+    assert response.status_code == 200
+    data = response.json()["data"]
+    video_items = [item for item in data["items"] if item["contentType"] == "VIDEO"]
+    assert [item["id"] for item in video_items] == [6, 5, 4]
+    assert video_items[0]["playUrl"] == "https://cdn.beatu.com/video_6.mp4"
+    assert data["pageSize"] == 3
@@ -0,0 +1,71 @@
+from sqlalchemy.orm import Session
+
+from database.models import VideoRendition, VideoTag
+from schemas.api import AIQualityRequest
+from services.ai_service import AIService
+from services.video_service import VideoService
+
+NORMAL_DEVICE = {"cpuLoad": 0.3, "temperature": 35, "batteryLevel": 0.8}
+
+
+def _seed_media(session: Session) -> None:
+    for video_id in (1, 2):
+        session.add_all(
+            [
+                VideoRendition(videoId=video_id, codec="h264", label="1080P", resolution="1920x1080", bitrateKbps=4000, url=f"https://cdn.example.com/{video_id}/1080.mp4"),
+                VideoRendition(videoId=video_id, codec="h264", label="540P", resolution="960x540", bitrateKbps=1500, url=f"https://cdn.example.com/{video_id}/540.mp4"),
+                VideoRendition(videoId=video_id, codec="h265", label="1080P", resolution="1920x1080", bitrateKbps=2500, url=f"https://cdn.example.com/{video_id}/1080.h265.mp4"),
+            ]
+        )
+    session.add_all([VideoTag(videoId=1, tag="搞笑", position=1), VideoTag(videoId=1, tag="动画", position=0), VideoTag(videoId=3, tag="音乐")])
+    session.commit()
+
+
+def test_qualities_and_tags_are_batch_loaded(seeded_session: Session, query_budget):
+    _seed_media(seeded_session)
+
+    # count + 分页 + 互动 + 关注 + 作者 + 清晰度档位 + 标签，与页大小无关
+    with query_budget(7):
+        page = VideoService(seeded_session).list_videos(page=1, limit=10, orientation=None, channel=None, user_id="user_a")
+
+    items = {item.id: item for item in page.items}
+    assert items[1].tags == ["动画", "搞笑"] and items[3].tags == ["音乐"] and items[4].tags == []
+    assert [(q.label, q.codec, q.bitrate) for q in items[2].qualities] == [("540P", "h264", 1500), ("1080P", "h265", 2500), ("1080P", "h264", 4000)]
+    assert items[5].qualities == []
+    assert items[1].to_payload()["qualities"][0] == {
+        "label": "540P",
+        "bitrate": 1500,
+        "resolution": "960x540",
+        "url": "https://cdn.example.com/1/540.mp4",
+        "codec": "h264",
+    }
+
+
+def test_quality_decision_picks_from_video_renditions(seeded_session: Session, query_budget):
+    _seed_media(seeded_session)
+    service = AIService(seeded_session)
+
+    def decide(video_id: int, **device):
+        request = AIQualityRequest(video_id=video_id, network_stats={"bandwidthKbps": 6000}, device_stats={**NORMAL_DEVICE, **device})
+        return service.quality(request, user_id="user_a")
+
+    response = decide(1)
+    assert (response.quality, response.bitrate, response.url) == ("1080P", 4000, "https://cdn.example.com/1/1080.mp4")
+    # 档位已缓存：决策不再查库；只支持 h265 的设备从 h265 档位中选择
+    with query_budget(0):
+        response = decide(1, codecs=["h265"])
+    assert (response.quality, response.bitrate) == ("1080P", 2500)
+    # 未登记档位的视频使用默认码率阶梯（可用码率 6000 * 0.8 = 4800kbps）
+    response = decide(4)
+    assert (response.quality, response.url) == ("720P", None)
+
+
+def test_malformed_codecs_fall_back_to_default(seeded_session: Session):
+    _seed_media(seeded_session)
+    service = AIService(seeded_session)
+
+    # 单个字符串、数字、含非字符串项的列表都不会过滤掉全部档位或抛出异常
+    for codecs in ("h264", 265, [{"name": "h265"}], ["h264", {"x": 1}, 7], []):
+        request = AIQualityRequest(video_id=1, network_stats={"bandwidthKbps": 6000}, device_stats={**NORMAL_DEVICE, "codecs": codecs})
+        response = service.quality(request, user_id="user_a")
+        assert (response.quality, response.bitrate) == ("1080P", 4000)
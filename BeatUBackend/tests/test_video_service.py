@@ -1,41 +1,32 @@
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session
 
-from database.models import Base, Video
+from database.models import User, Video
 from schemas.api import InteractionRequest
+from services.counter_buffer import flush_counters
 from services.video_service import VideoService
 
 
 @pytest.fixture()
-def db_session() -> Session:
-    engine = create_engine("sqlite:///:memory:", future=True)
-    Base.metadata.create_all(engine)
-    TestingSession = sessionmaker(bind=engine)
-    with TestingSession() as session:
-        seed_video(session)
-        yield session
+def db_session(db_session: Session) -> Session:
+    seed_video(db_session)
+    return db_session
 
 
 def seed_video(session: Session) -> None:
+    session.add(User(userId="author_1", userName="Tester", followerCount=0, followingCount=0))
     video = Video(
-        id="video_test",
-        play_url="https://cdn.beatu.com/video.mp4",
-        cover_url="https://cdn.beatu.com/video.jpg",
+        videoId=1,
+        playUrl="https://cdn.beatu.com/video.mp4",
+        coverUrl="https://cdn.beatu.com/video.jpg",
         title="测试视频",
-        tags=["test"],
-        duration_ms=1000,
+        durationMs=1000,
         orientation="PORTRAIT",
-        author_id="author_1",
-        author_name="Tester",
-        like_count=0,
-        comment_count=0,
-        favorite_count=0,
-        share_count=0,
-        view_count=0,
-        qualities=[
-            {"label": "720P", "url": "https://cdn.beatu.com/video720.m3u8"},
-        ],
+        authorId="author_1",
+        likeCount=0,
+        commentCount=0,
+        favoriteCount=0,
+        viewCount=0,
     )
     session.add(video)
     session.commit()
@@ -51,17 +42,35 @@ def test_list_videos_returns_items(db_session: Session):
 def test_like_video_mutates_state(db_session: Session):
     service = VideoService(db_session)
 
-    result = service.like_video("video_test", InteractionRequest(action="LIKE"), user_id="user_a")
+    result = service.like_video(1, InteractionRequest(action="LIKE"), user_id="user_a")
     assert result.success is True
 
-    video = service.get_video("video_test", user_id="user_a")
+    video = service.get_video(1, user_id="user_a")
     assert video.is_liked is True
     assert video.like_count == 1
 
-    service.like_video("video_test", InteractionRequest(action="UNLIKE"), user_id="user_a")
-    video = service.get_video("video_test", user_id="user_a")
+    service.like_video(1, InteractionRequest(action="UNLIKE"), user_id="user_a")
+    video = service.get_video(1, user_id="user_a")
     assert video.is_liked is False
     assert video.like_count == 0
 
 
+def test_share_is_buffered_until_flush(db_session: Session, query_budget):
+    service = VideoService(db_session)
+
+    # 分享只做主键读取，不产生写语句
+    with query_budget(1):
+        service.share_video(1)
+    service.share_video(1)
+
+    assert db_session.get(Video, 1).shareCount == 0
+    assert service.get_video(1, user_id="user_a").share_count == 2
+
+    with query_budget(1):
+        assert flush_counters(db_session) == 1
+    db_session.expire_all()
+    assert db_session.get(Video, 1).shareCount == 2
+    assert service.get_video(1, user_id="user_a").share_count == 2
 
+    with pytest.raises(ValueError):
+        service.share_video(404)
@@ -0,0 +1,58 @@
+from sqlalchemy.orm import Session
+
+from database.models import Video
+from services.counter_buffer import flush_counters
+from services.video_service import VideoService
+from services.view_counter import MemoryViewDedup, get_view_counter, get_view_recorder
+
+
+def _views(session: Session, video_id: int) -> int:
+    session.expire_all()
+    return session.get(Video, video_id).viewCount
+
+
+def test_dedup_per_user_video_and_window():
+    dedup = MemoryViewDedup(window_seconds=60)
+
+    assert dedup.first_view(1, "user_a", now=0) is True
+    assert dedup.first_view(1, "user_a", now=59) is False
+    assert dedup.first_view(1, "user_b", now=59) is True
+    assert dedup.first_view(2, "user_a", now=59) is True
+    # 进入下一个窗口后重新计数
+    assert dedup.first_view(1, "user_a", now=60) is True
+
+
+def test_views_are_buffered_and_flushed_in_one_batch(seeded_session: Session, query_budget):
+    recorder = get_view_recorder()
+    for user_id in ("user_a", "user_b", "user_a"):
+        recorder.record(1, user_id)
+    recorder.record(2, "user_a")
+
+    assert _views(seeded_session, 1) == 100
+    assert recorder.view_count(seeded_session, 1) == 102
+    assert VideoService(seeded_session).get_video(1, user_id="user_a").view_count == 102
+
+    with query_budget(1):
+        assert flush_counters(seeded_session) == 2
+
+    assert (_views(seeded_session, 1), _views(seeded_session, 2)) == (102, 201)
+    assert (recorder.recorded, recorder.deduplicated) == (3, 1)
+
+
+def test_view_endpoint(api_client, seeded_session: Session):
+    headers = {"X-User-Id": "user_a"}
+
+    assert api_client.post("/api/videos/3/view", headers=headers).json()["data"] == {"counted": True}
+    assert api_client.post("/api/videos/3/view", headers=headers).json()["data"] == {"counted": False}
+
+    flush_counters(seeded_session)
+    assert _views(seeded_session, 3) == 301
+
+
+def test_view_and_share_of_unknown_video_return_404(api_client):
+    headers = {"X-User-Id": "user_a"}
+
+    assert api_client.post("/api/videos/999/view", headers=headers).status_code == 404
+    assert api_client.post("/api/videos/999/share", headers=headers).status_code == 404
+    assert get_view_recorder().recorded == 0
+    assert get_view_counter().pending(999) == 0